@@ -0,0 +1,415 @@
+"""Benchmark harness driving the MCP handlers and HTTP endpoint against a fake xkcd.com.
+
+Usage:
+    python -m benchmarks.harness --requests 500 --concurrency 32 --latency-ms 80 \\
+        --image-bytes 200000 --failure-rate 0.01 --output results.json
+    python -m benchmarks.harness --baseline results.json
+
+Every scenario starts from empty caches and a throwaway comic store, so runs are
+comparable. Results are written as JSON; with ``--baseline`` the change in
+throughput and latency against an earlier run is printed as well.
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import platform
+import random
+import resource
+import sys
+import tempfile
+import time
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+import httpx
+import mcp.types as types
+
+from src.xkcd_app import config
+from src.xkcd_app.handlers import WIDGET_HTML_CACHE, handle_call_tool, handle_read_resource
+from src.xkcd_app.html_generator import ERROR_HTML_CACHE, HTML_CACHE
+from src.xkcd_app.images import variants_available
+from src.xkcd_app.search import reset_search_index
+from src.xkcd_app.store import close_comic_store, open_comic_store
+from src.xkcd_app.widgets import XKCD_VIEWER_WIDGET
+from src.xkcd_app.xkcd_client import close_http_client, open_http_client, reset_caches
+
+
+MIME_TYPE = "text/html+skybridge"
+
+SCENARIOS = ("call_tool", "read_resource", "http_call_tool")
+
+
+@dataclass(frozen=True)
+class UpstreamProfile:
+    """Behaviour of the fake upstream."""
+    latency_ms: float = 50.0
+    jitter_ms: float = 10.0
+    image_bytes: int = 100_000
+    failure_rate: float = 0.0
+    latest: int = 3000
+
+
+class FakeXKCD:
+    """In-process stand-in for xkcd.com and its image CDN with configurable latency and failures."""
+
+    def __init__(self, profile: UpstreamProfile, seed: int = 0):
+        self.profile = profile
+        self.random = random.Random(seed)
+        self.requests = 0
+        self._image = make_image(profile.image_bytes)
+
+    async def handle(self, request: httpx.Request) -> httpx.Response:
+        self.requests += 1
+        delay = self.profile.latency_ms + self.random.uniform(-1, 1) * self.profile.jitter_ms
+        await asyncio.sleep(max(0.0, delay) / 1000)
+        if self.random.random() < self.profile.failure_rate:
+            return httpx.Response(503)
+        if request.url.host == "imgs.xkcd.com":
+            return httpx.Response(200, content=self._image)
+
+        parts = request.url.path.strip("/").split("/")
+        num = int(parts[0]) if len(parts) > 1 else self.profile.latest
+        if num > self.profile.latest:
+            return httpx.Response(404)
+        return httpx.Response(200, json={
+            "num": num,
+            "title": f"Benchmark comic {num}",
+            "safe_title": f"Benchmark comic {num}",
+            "alt": f"Alt text for benchmark comic {num}",
+            "transcript": "",
+            "img": f"https://imgs.xkcd.com/comics/bench_{num}.png",
+            "year": "2020",
+            "month": "3",
+            "day": "14",
+        })
+
+
+def make_image(size: int) -> bytes:
+    """Make a PNG of roughly the given size (random noise, so it does not compress).
+
+    Without Pillow, opaque bytes with a PNG signature are used instead.
+    """
+    rng = random.Random(size)
+    if not variants_available():
+        return b"\x89PNG\r\n\x1a\n" + rng.randbytes(max(0, size - 8))
+
+    from io import BytesIO
+    from PIL import Image
+
+    side = max(1, int((size / 3) ** 0.5))
+    image = Image.frombytes("RGB", (side, side), rng.randbytes(side * side * 3))
+    output = BytesIO()
+    image.save(output, "PNG", compress_level=1)
+    return output.getvalue()
+
+
+def percentile(values: List[float], pct: float) -> float:
+    """Nearest-rank percentile of a list of values."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))]
+
+
+def peak_rss_mb() -> float:
+    """Peak resident set size of this process so far, in MiB."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and KiB elsewhere
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+async def drive(
+    request_once: Callable[[int], Awaitable[int]],
+    comic_numbers: List[int],
+    concurrency: int,
+) -> Dict[str, Any]:
+    """Issue one request per comic number with bounded concurrency and collect timings.
+
+    Args:
+        request_once: Coroutine performing a request, returning the response size in bytes
+            (or raising on error)
+        comic_numbers: Comic requested by each request
+        concurrency: Maximum requests in flight
+
+    Returns:
+        Aggregated measurements
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies: List[float] = []
+    sizes: List[int] = []
+    errors = 0
+
+    async def one(comic_number: int) -> None:
+        nonlocal errors
+        async with semaphore:
+            started = time.perf_counter()
+            try:
+                size = await request_once(comic_number)
+            except Exception:
+                errors += 1
+                return
+            latencies.append((time.perf_counter() - started) * 1000)
+            sizes.append(size)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one(num) for num in comic_numbers))
+    duration = time.perf_counter() - started
+    return {
+        "requests": len(comic_numbers),
+        "errors": errors,
+        "duration_s": round(duration, 4),
+        "throughput_rps": round(len(comic_numbers) / duration, 2) if duration else 0.0,
+        "latency_ms": {
+            "p50": round(percentile(latencies, 50), 3),
+            "p95": round(percentile(latencies, 95), 3),
+            "p99": round(percentile(latencies, 99), 3),
+            "max": round(max(latencies, default=0.0), 3),
+            "mean": round(sum(latencies) / len(latencies), 3) if latencies else 0.0,
+        },
+        "bytes_per_response": round(sum(sizes) / len(sizes)) if sizes else 0,
+    }
+
+
+def reset_state(store_dir: Path) -> None:
+    """Drop every in-memory cache and open an empty comic store."""
+    reset_caches()
+    reset_search_index()
+    WIDGET_HTML_CACHE.clear()
+    HTML_CACHE.clear()
+    ERROR_HTML_CACHE.clear()
+    open_comic_store(store_dir / f"bench-{time.monotonic_ns()}.sqlite3")
+
+
+def call_tool_request(comic_number: int, session: str) -> types.CallToolRequest:
+    """Build a viewer tool call for a comic."""
+    return types.CallToolRequest(
+        method="tools/call",
+        params=types.CallToolRequestParams(
+            name=XKCD_VIEWER_WIDGET.identifier,
+            arguments={"userQuery": f"#{comic_number}"},
+            _meta={"openai/session": session},
+        ),
+    )
+
+
+async def call_tool_once(comic_number: int) -> int:
+    """Call the viewer tool directly and serialize the result as the transport would."""
+    result = await handle_call_tool(call_tool_request(comic_number, f"bench-{comic_number}"), MIME_TYPE)
+    if "error" in (result.root.structuredContent or {}):
+        raise RuntimeError(result.root.structuredContent["error"])
+    return len(result.model_dump_json(by_alias=True, exclude_none=True))
+
+
+async def read_resource_once(comic_number: int) -> int:
+    """Read the viewer resource of a session that has just called the tool."""
+    request = types.ReadResourceRequest(
+        method="resources/read",
+        params=types.ReadResourceRequestParams(
+            uri=XKCD_VIEWER_WIDGET.template_uri,
+            _meta={"openai/session": f"bench-{comic_number}"},
+        ),
+    )
+    result = await handle_read_resource(request, MIME_TYPE)
+    return len(result.model_dump_json(by_alias=True, exclude_none=True))
+
+
+async def run_scenario(
+    scenario: str,
+    comic_numbers: List[int],
+    concurrency: int,
+    profile: UpstreamProfile,
+    store_dir: Path,
+    seed: int,
+) -> Dict[str, Any]:
+    """Run one scenario from cold caches against a fresh fake upstream.
+
+    Args:
+        scenario: One of SCENARIOS
+        comic_numbers: Comic requested by each request
+        concurrency: Maximum requests in flight
+        profile: Fake upstream behaviour
+        store_dir: Directory for throwaway comic stores
+        seed: Random seed for the fake upstream
+
+    Returns:
+        Scenario measurements
+    """
+    upstream = FakeXKCD(profile, seed)
+    reset_state(store_dir)
+
+    if scenario == "http_call_tool":
+        # Imported lazily: building the app registers the MCP handlers
+        from main import app
+
+        async with app.router.lifespan_context(app):
+            await open_http_client(httpx.AsyncClient(transport=httpx.MockTransport(upstream.handle)))
+            transport = httpx.ASGITransport(app=app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://127.0.0.1:8000") as client:
+
+                async def http_call_once(comic_number: int) -> int:
+                    response = await client.post(
+                        "/mcp",
+                        json={
+                            "jsonrpc": "2.0",
+                            "id": comic_number,
+                            "method": "tools/call",
+                            "params": {"name": XKCD_VIEWER_WIDGET.identifier, "arguments": {"userQuery": f"#{comic_number}"}},
+                        },
+                        headers={"Accept": "application/json, text/event-stream"},
+                    )
+                    response.raise_for_status()
+                    payload = json.loads(response.text.split("data: ", 1)[1])
+                    if "error" in payload or "error" in payload["result"].get("structuredContent", {}):
+                        raise RuntimeError(response.text)
+                    return len(response.content)
+
+                result = await drive(http_call_once, comic_numbers, concurrency)
+    else:
+        await open_http_client(httpx.AsyncClient(transport=httpx.MockTransport(upstream.handle)))
+        if scenario == "read_resource":
+            # Populate each session's widget first; only the reads are measured
+            await drive(call_tool_once, sorted(set(comic_numbers)), concurrency)
+            result = await drive(read_resource_once, comic_numbers, concurrency)
+        else:
+            result = await drive(call_tool_once, comic_numbers, concurrency)
+        await close_http_client()
+
+    close_comic_store()
+    return {
+        "scenario": scenario,
+        "concurrency": concurrency,
+        **result,
+        "upstream_requests": upstream.requests,
+        "peak_rss_mb": round(peak_rss_mb(), 1),
+    }
+
+
+async def run_benchmark(
+    scenarios: List[str],
+    requests: int,
+    concurrency: int,
+    comics: int,
+    profile: UpstreamProfile,
+    seed: int = 0,
+) -> Dict[str, Any]:
+    """Run the selected scenarios and collect a machine-readable report.
+
+    Args:
+        scenarios: Scenarios to run, from SCENARIOS
+        requests: Requests per scenario
+        concurrency: Maximum requests in flight
+        comics: Number of distinct comics requested (fewer means more cache hits)
+        profile: Fake upstream behaviour
+        seed: Random seed for the request mix and the fake upstream
+
+    Returns:
+        Benchmark report
+    """
+    rng = random.Random(seed)
+    comic_numbers = [rng.randint(1, min(comics, profile.latest)) for _ in range(requests)]
+    original_cache_dir, original_snapshot_path = config.CACHE_DIR, config.SNAPSHOT_PATH
+    results = []
+    with tempfile.TemporaryDirectory(prefix="xkcd-bench-") as store_dir:
+        # Keep the app lifespan away from the real on-disk cache, and start every scenario cold
+        config.CACHE_DIR = store_dir
+        config.SNAPSHOT_PATH = ""
+        try:
+            for scenario in scenarios:
+                results.append(await run_scenario(scenario, comic_numbers, concurrency, profile, Path(store_dir), seed))
+        finally:
+            config.CACHE_DIR, config.SNAPSHOT_PATH = original_cache_dir, original_snapshot_path
+            close_comic_store()
+
+    return {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "pillow": variants_available(),
+        "settings": {"requests": requests, "concurrency": concurrency, "comics": comics, "seed": seed},
+        "upstream": asdict(profile),
+        "results": results,
+    }
+
+
+def compare(report: Dict[str, Any], baseline: Dict[str, Any]) -> List[str]:
+    """Describe the change of each scenario's throughput and p50/p99 latency against a baseline."""
+    previous = {result["scenario"]: result for result in baseline.get("results", [])}
+    lines = []
+    for result in report["results"]:
+        before = previous.get(result["scenario"])
+        if before is None:
+            continue
+        changes = []
+        for label, now, then in (
+            ("throughput", result["throughput_rps"], before["throughput_rps"]),
+            ("p50", result["latency_ms"]["p50"], before["latency_ms"]["p50"]),
+            ("p99", result["latency_ms"]["p99"], before["latency_ms"]["p99"]),
+        ):
+            change = (now - then) / then * 100 if then else 0.0
+            changes.append(f"{label} {change:+.1f}%")
+        lines.append(f"{result['scenario']}: " + ", ".join(changes))
+    return lines
+
+
+def format_table(report: Dict[str, Any]) -> str:
+    """Format a report as a human-readable table."""
+    header = f"{'scenario':<16}{'rps':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'bytes':>10}{'errors':>8}{'rss MB':>9}"
+    lines = [header]
+    for result in report["results"]:
+        latency = result["latency_ms"]
+        lines.append(
+            f"{result['scenario']:<16}{result['throughput_rps']:>10.1f}{latency['p50']:>10.2f}"
+            f"{latency['p95']:>10.2f}{latency['p99']:>10.2f}{result['bytes_per_response']:>10}"
+            f"{result['errors']:>8}{result['peak_rss_mb']:>9.1f}"
+        )
+    return "\n".join(lines)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Command-line entry point."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--scenario", action="append", choices=SCENARIOS, help="Scenario to run (repeatable; default all)")
+    parser.add_argument("--requests", type=int, default=200, help="Requests per scenario")
+    parser.add_argument("--concurrency", type=int, default=16, help="Maximum requests in flight")
+    parser.add_argument("--comics", type=int, default=50, help="Number of distinct comics requested")
+    parser.add_argument("--latency-ms", type=float, default=50.0, help="Fake upstream latency")
+    parser.add_argument("--jitter-ms", type=float, default=10.0, help="Fake upstream latency jitter")
+    parser.add_argument("--image-bytes", type=int, default=100_000, help="Size of each comic image")
+    parser.add_argument("--failure-rate", type=float, default=0.0, help="Fraction of upstream requests answered with 503")
+    parser.add_argument("--seed", type=int, default=0, help="Random seed")
+    parser.add_argument("--output", type=Path, help="Write the JSON report to this file instead of stdout")
+    parser.add_argument("--baseline", type=Path, help="Earlier JSON report to compare against")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.WARNING)
+    profile = UpstreamProfile(
+        latency_ms=args.latency_ms,
+        jitter_ms=args.jitter_ms,
+        image_bytes=args.image_bytes,
+        failure_rate=args.failure_rate,
+    )
+    report = asyncio.run(run_benchmark(
+        args.scenario or list(SCENARIOS),
+        args.requests,
+        args.concurrency,
+        args.comics,
+        profile,
+        args.seed,
+    ))
+
+    print(format_table(report), file=sys.stderr)
+    if args.baseline:
+        for line in compare(report, json.loads(args.baseline.read_text())):
+            print(line, file=sys.stderr)
+    if args.output:
+        args.output.write_text(json.dumps(report, indent=2))
+    else:
+        print(json.dumps(report, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
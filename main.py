@@ -5,45 +5,53 @@ HTML via an MCP resource and structured comic data so the ChatGPT client can hyd
 the widget properly.
 """
 
-from copy import deepcopy
-from typing import Any, Dict, List
+import asyncio
+import logging
+import re
+from contextlib import asynccontextmanager
+from typing import Any, Dict, Optional, Tuple
 
+# Imported first (standard library only) so the startup timeline covers the heavy imports below
+from src.xkcd_app.startup import STARTUP
+
+import httpx
 import mcp.types as types
 from mcp.server.fastmcp import FastMCP
 from starlette.middleware.cors import CORSMiddleware
-from starlette.responses import JSONResponse
+from starlette.responses import JSONResponse, PlainTextResponse, Response
 from starlette.routing import Route
 
-from src.xkcd_app import ALL_WIDGETS, get_tool_meta, handle_call_tool, handle_read_resource
+from src.xkcd_app import ALL_WIDGETS, config, handle_call_tool, handle_read_resource
+from src.xkcd_app.catalog import TOOL_INPUT_SCHEMA, get_catalog  # noqa: F401 (schema re-exported)
+from src.xkcd_app.handlers import WIDGET_HTML_CACHE
+from src.xkcd_app.html_generator import HTML_CACHE
+from src.xkcd_app.images import ORIGINAL, VARIANT_WIDTHS
+from src.xkcd_app.metrics import STARTUP_SECONDS, MetricsMiddleware, render_metrics
+from src.xkcd_app.navigation import PREFETCHER
+from src.xkcd_app.resilience import UpstreamUnavailable
+from src.xkcd_app.background import start_background_tasks, stop_background_tasks
+from src.xkcd_app.search import load_search_index, reset_search_index
+from src.xkcd_app.snapshot import close_snapshot, load_snapshot
+from src.xkcd_app.store import close_comic_store, open_comic_store
+from src.xkcd_app.xkcd_client import (
+    close_http_client,
+    get_cache_stats,
+    get_comic_image,
+    get_comic_metadata,
+    get_comic_tile,
+    get_tile_manifest,
+    get_upstream_stats,
+    prepare_http_client,
+    save_cache_snapshot,
+)
 
+logger = logging.getLogger(__name__)
 
-# Constants
-MIME_TYPE = "text/html+skybridge"
+STARTUP.mark("imports")
 
-# Tool input schema for MCP protocol
-TOOL_INPUT_SCHEMA: Dict[str, Any] = {
-    "type": "object",
-    "properties": {
-        "userQuery": {
-            "type": "string",
-            "description": (
-                "The user's request - can be a URL, comic number, or natural language "
-                "(e.g., 'https://xkcd.com/327/', 'show comic 2000', '#327', 'show me latest')"
-            ),
-        },
-        "comicNumber": {
-            "type": "integer",
-            "description": "Specific XKCD comic number to fetch (optional)",
-        },
-        "options": {
-            "type": "object",
-            "description": "Optional parameters",
-        }
-    },
-    "required": ["userQuery"],
-    "additionalProperties": False,
-}
 
+# Constants
+MIME_TYPE = "text/html+skybridge"
 
 # Initialize FastMCP server
 mcp = FastMCP(
@@ -55,63 +63,34 @@ mcp = FastMCP(
 )
 
 
-@mcp._mcp_server.list_tools()
-async def list_tools() -> List[types.Tool]:
+async def list_tools(req: types.ListToolsRequest) -> types.ServerResult:
     """Register all available tools.
 
-    Returns a tool definition for each widget in the server's widget registry.
+    Returns the prebuilt tool definitions for every widget in the server's widget registry.
     """
-    return [
-        types.Tool(
-            name=widget.identifier,
-            title=widget.title,
-            description=widget.title,
-            inputSchema=deepcopy(TOOL_INPUT_SCHEMA),
-            _meta=get_tool_meta(widget),
-        )
-        for widget in ALL_WIDGETS
-    ]
-
-
-@mcp._mcp_server.list_resources()
-async def list_resources() -> List[types.Resource]:
+    return get_catalog(MIME_TYPE).tools
+
+
+async def list_resources(req: types.ListResourcesRequest) -> types.ServerResult:
     """Expose widgets as resources.
 
-    Returns a resource for each widget's HTML template.
+    Returns the prebuilt resource for each widget's HTML template.
     """
-    return [
-        types.Resource(
-            name=widget.title,
-            title=widget.title,
-            uri=widget.template_uri,
-            description=f"{widget.title} widget markup",
-            mimeType=MIME_TYPE,
-            _meta=get_tool_meta(widget),
-        )
-        for widget in ALL_WIDGETS
-    ]
-
-
-@mcp._mcp_server.list_resource_templates()
-async def list_resource_templates() -> List[types.ResourceTemplate]:
+    return get_catalog(MIME_TYPE).resources
+
+
+async def list_resource_templates(req: types.ListResourceTemplatesRequest) -> types.ServerResult:
     """Define resource templates.
 
-    Returns a resource template for each widget type.
+    Returns the prebuilt resource template for each widget type.
     """
-    return [
-        types.ResourceTemplate(
-            name=widget.title,
-            title=widget.title,
-            uriTemplate=widget.template_uri,
-            description=f"{widget.title} widget markup",
-            mimeType=MIME_TYPE,
-            _meta=get_tool_meta(widget),
-        )
-        for widget in ALL_WIDGETS
-    ]
+    return get_catalog(MIME_TYPE).resource_templates
 
 
 # Register request handlers
+mcp._mcp_server.request_handlers[types.ListToolsRequest] = list_tools
+mcp._mcp_server.request_handlers[types.ListResourcesRequest] = list_resources
+mcp._mcp_server.request_handlers[types.ListResourceTemplatesRequest] = list_resource_templates
 mcp._mcp_server.request_handlers[types.CallToolRequest] = lambda req: handle_call_tool(
     req, MIME_TYPE
 )
@@ -123,6 +102,45 @@ mcp._mcp_server.request_handlers[types.ReadResourceRequest] = lambda req: handle
 # Create FastAPI app
 app = mcp.streamable_http_app()
 
+# Wrap the MCP session manager lifespan so shared resources live as long as the app
+_mcp_lifespan = app.router.lifespan_context
+
+
+@asynccontextmanager
+async def lifespan(starlette_app):
+    """Open shared resources and run cache warm-up tasks for the lifetime of the app.
+
+    The cache snapshot is mapped on boot and rewritten on shutdown, so the next
+    process starts with this one's hot caches.
+    """
+    async with _mcp_lifespan(starlette_app):
+        open_comic_store()
+        load_snapshot()
+        STARTUP.mark("snapshot")
+        http_client_ready = asyncio.create_task(prepare_http_client())
+        background_tasks = start_background_tasks()
+        # The search index is only needed for descriptive queries; read it in a worker thread
+        search_index_ready = asyncio.create_task(load_search_index())
+        STARTUP.mark("ready")
+        for phase, seconds in STARTUP.phases.items():
+            STARTUP_SECONDS.set(seconds, phase=phase)
+        try:
+            yield
+        finally:
+            await stop_background_tasks([http_client_ready, search_index_ready, *background_tasks])
+            await PREFETCHER.close()
+            await close_http_client()
+            try:
+                save_cache_snapshot()
+            except OSError as exc:
+                logger.warning("Failed to write cache snapshot: %s", exc)
+            close_snapshot()
+            close_comic_store()
+            reset_search_index()
+
+
+app.router.lifespan_context = lifespan
+
 # Add CORS middleware for local testing
 app.add_middleware(
     CORSMiddleware,
@@ -132,6 +150,19 @@ app.add_middleware(
     allow_credentials=False,
 )
 
+# Count in-flight requests and response sizes for /metrics
+app.add_middleware(MetricsMiddleware)
+
+
+def collect_cache_stats() -> Dict[str, Any]:
+    """Gather hit/miss counters for every cache tier."""
+    return {
+        **get_cache_stats(),
+        "rendered_html": {**HTML_CACHE.stats.as_dict(), "bytes": HTML_CACHE.total_bytes},
+        "widget_html": WIDGET_HTML_CACHE.stats.as_dict(),
+        "prefetch": PREFETCHER.as_dict(),
+    }
+
 
 # Health check endpoints
 async def root_handler(request):
@@ -145,6 +176,10 @@ async def root_handler(request):
             "mcp": "/mcp",
             "messages": "/mcp/messages",
             "health": "/health",
+            "metrics": "/metrics",
+            "catalog": "/catalog",
+            "image": "/img/{num}",
+            "tiles": "/img/{num}/tiles",
         },
         "description": "MCP server for fetching and displaying XKCD comics",
         "auth_required": False,
@@ -157,14 +192,153 @@ async def health_handler(request):
         "status": "healthy",
         "auth_required": False,
         "widgets_count": len(ALL_WIDGETS),
+        "cache": collect_cache_stats(),
+        "upstream": get_upstream_stats(),
+        "startup": STARTUP.as_dict(),
     })
 
 
+async def metrics_handler(request):
+    """Prometheus metrics endpoint - No authentication required."""
+    return PlainTextResponse(render_metrics(collect_cache_stats()), media_type="text/plain; version=0.0.4")
+
+
+async def catalog_handler(request):
+    """Serve the pre-serialized tool and resource catalog - No authentication required.
+
+    Clients can poll cheaply with ``If-None-Match``; the ETag changes only when the
+    widget registry does.
+    """
+    catalog = get_catalog(MIME_TYPE)
+    headers = {"ETag": catalog.etag, "Cache-Control": "no-cache"}
+    if catalog.etag in request.headers.get("if-none-match", ""):
+        return Response(status_code=304, headers=headers)
+    return Response(catalog.body, media_type="application/json", headers=headers)
+
+
+def parse_byte_range(header: str, length: int) -> Optional[Tuple[int, int]]:
+    """Parse a single-range ``Range: bytes=...`` header.
+
+    Args:
+        header: Range header value
+        length: Size of the full content
+
+    Returns:
+        Inclusive (start, end) byte offsets, or None if the range is unsatisfiable
+
+    Raises:
+        ValueError: If the header is malformed or asks for several ranges
+    """
+    match = re.fullmatch(r"bytes=(\d*)-(\d*)", header.strip())
+    if match is None or not any(match.groups()):
+        raise ValueError(f"Unsupported range: {header}")
+    start, end = match.groups()
+    if not start:
+        # Suffix range: the last N bytes
+        suffix = int(end)
+        return (max(0, length - suffix), length - 1) if suffix and length else None
+    first = int(start)
+    last = min(int(end), length - 1) if end else length - 1
+    return (first, last) if first <= last else None
+
+
+def immutable_response(request, content: bytes, mime_type: str, etag: str) -> Response:
+    """Build a response for content that never changes, honouring If-None-Match and Range.
+
+    Comic images and tiles never change, so responses carry a strong ETag and may be
+    cached indefinitely by clients and proxies.
+    """
+    headers = {"ETag": etag, "Cache-Control": "public, max-age=31536000, immutable", "Accept-Ranges": "bytes"}
+    if etag in request.headers.get("if-none-match", ""):
+        return Response(status_code=304, headers=headers)
+
+    range_header = request.headers.get("range")
+    if not range_header or request.headers.get("if-range", etag) != etag:
+        return Response(content, media_type=mime_type, headers=headers)
+    try:
+        byte_range = parse_byte_range(range_header, len(content))
+    except ValueError:
+        # Malformed and multi-range requests get the whole body
+        return Response(content, media_type=mime_type, headers=headers)
+    if byte_range is None:
+        headers["Content-Range"] = f"bytes */{len(content)}"
+        return Response(status_code=416, headers=headers)
+    start, end = byte_range
+    headers["Content-Range"] = f"bytes {start}-{end}/{len(content)}"
+    return Response(content[start:end + 1], status_code=206, media_type=mime_type, headers=headers)
+
+
+def upstream_error_response(message: str, exc: Exception) -> Response:
+    """Map a failed comic, image or tile lookup to an HTTP error.
+
+    Missing comics are 404s and other upstream error statuses are 502s. An upstream
+    that is too slow, refuses connections or has its circuit open is a 503 with
+    Retry-After, so clients retry later.
+    """
+    if isinstance(exc, LookupError) or (isinstance(exc, httpx.HTTPStatusError) and exc.response.status_code == 404):
+        return JSONResponse({"error": message}, status_code=404)
+    if isinstance(exc, httpx.HTTPStatusError):
+        return JSONResponse({"error": message}, status_code=502)
+    return JSONResponse(
+        {"error": message, "detail": str(exc) or type(exc).__name__},
+        status_code=503,
+        headers={"Retry-After": str(int(config.BREAKER_RESET))},
+    )
+
+
+async def image_handler(request):
+    """Serve cached comic image bytes - No authentication required.
+
+    ``?variant=capped|thumb`` serves a resized rendition; ``Range`` requests are
+    answered with the requested slice.
+    """
+    comic_number = request.path_params["num"]
+    variant = request.query_params.get("variant", ORIGINAL)
+    if variant != ORIGINAL and variant not in VARIANT_WIDTHS:
+        return JSONResponse({"error": f"Unknown image variant: {variant}"}, status_code=400)
+    try:
+        content, mime_type, etag = await get_comic_image(comic_number, variant)
+    except (UpstreamUnavailable, LookupError, httpx.HTTPError) as exc:
+        return upstream_error_response(f"Image for XKCD #{comic_number} unavailable", exc)
+    return immutable_response(request, content, mime_type, etag)
+
+
+async def tile_manifest_handler(request):
+    """Describe a giant comic's tile pyramid - No authentication required."""
+    comic_number = request.path_params["num"]
+    try:
+        comic_data = await get_comic_metadata(comic_number)
+        manifest = await get_tile_manifest(comic_data.get("img", "")) if comic_data.get("img") else {"levels": []}
+    except (UpstreamUnavailable, httpx.HTTPError) as exc:
+        return upstream_error_response(f"XKCD #{comic_number} unavailable", exc)
+    if not manifest["levels"]:
+        return JSONResponse({"error": f"XKCD #{comic_number} is not tiled"}, status_code=404)
+    return JSONResponse(manifest, headers={"Cache-Control": "public, max-age=31536000, immutable"})
+
+
+async def tile_handler(request):
+    """Serve one tile of a giant comic's pyramid - No authentication required."""
+    params = request.path_params
+    try:
+        content, mime_type, etag = await get_comic_tile(params["num"], params["level"], params["col"], params["row"])
+    except (UpstreamUnavailable, LookupError, httpx.HTTPError) as exc:
+        return upstream_error_response(f"Tile for XKCD #{params['num']} unavailable", exc)
+    return immutable_response(request, content, mime_type, etag)
+
+
 # Add routes
 app.routes.insert(0, Route("/", root_handler))
 app.routes.insert(1, Route("/health", health_handler))
+app.routes.insert(2, Route("/metrics", metrics_handler))
+app.routes.insert(3, Route("/catalog", catalog_handler))
+app.routes.insert(4, Route("/img/{num:int}", image_handler))
+app.routes.insert(5, Route("/img/{num:int}/tiles", tile_manifest_handler))
+app.routes.insert(6, Route("/img/{num:int}/tiles/{level:int}/{col:int}_{row:int}", tile_handler))
+
+
+STARTUP.mark("app")
 
 
 if __name__ == "__main__":
-    import uvicorn
-    uvicorn.run("main:app", host="0.0.0.0", port=8000, reload=True)
+    from src.xkcd_app.server import main as serve
+    raise SystemExit(serve())
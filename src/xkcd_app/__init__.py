@@ -4,29 +4,45 @@ __version__ = "1.0.0"
 __author__ = "XKCD ChatGPT App Team"
 __description__ = "MCP server for fetching and displaying XKCD comics"
 
-from .models import AppWidget, ToolInput
-from .widgets import ALL_WIDGETS, get_widget_by_id, get_widget_by_uri
-from .handlers import handle_call_tool, handle_read_resource, get_tool_meta
-from .html_generator import generate_comic_html, generate_error_html, PLACEHOLDER_HTML
-from .xkcd_client import fetch_xkcd_comic, extract_comic_number
+import importlib
+from typing import Any
 
-__all__ = [
+# Public names and the submodule defining each. They are imported on first access,
+# so tools that only need part of the package (the mirror CLI, the server launcher)
+# don't pay for importing mcp, pydantic and httpx up front.
+_EXPORTS = {
     # Models
-    "AppWidget",
-    "ToolInput",
+    "AppWidget": "models",
+    "ToolInput": "models",
     # Widgets
-    "ALL_WIDGETS",
-    "get_widget_by_id",
-    "get_widget_by_uri",
+    "ALL_WIDGETS": "widgets",
+    "get_widget_by_id": "widgets",
+    "get_widget_by_uri": "widgets",
     # Handlers
-    "handle_call_tool",
-    "handle_read_resource",
-    "get_tool_meta",
+    "handle_call_tool": "handlers",
+    "handle_read_resource": "handlers",
+    "get_tool_meta": "handlers",
     # HTML Generation
-    "generate_comic_html",
-    "generate_error_html",
-    "PLACEHOLDER_HTML",
+    "generate_comic_html": "html_generator",
+    "generate_error_html": "html_generator",
+    "PLACEHOLDER_HTML": "html_generator",
     # XKCD Client
-    "fetch_xkcd_comic",
-    "extract_comic_number",
-]
+    "fetch_xkcd_comic": "xkcd_client",
+    "extract_comic_number": "xkcd_client",
+}
+
+__all__ = list(_EXPORTS)
+
+
+def __getattr__(name: str) -> Any:
+    """Import a public name from its submodule on first access."""
+    module_name = _EXPORTS.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(f".{module_name}", __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(list(globals()) + __all__)
@@ -0,0 +1,315 @@
+"""Compact columnar catalog of stored comic metadata, for date, range and text queries.
+
+Comic numbers and publication dates are kept in packed ``array`` columns. Dates are
+stored as ``YYYYMMDD`` integers, so a month or a year is one contiguous range.
+Titles and alt text are interned strings. A date-sorted permutation answers date
+ranges by bisection. Alt text queries scan one lowercased string holding every
+comic's alt text with ``str.find``, instead of testing comics one by one. The
+catalog is loaded from the comic store in one query and grows as new comics are
+cached.
+"""
+
+import calendar
+import re
+import sys
+from array import array
+from bisect import bisect_left, bisect_right
+from typing import Any, Dict, List, Optional, Tuple
+
+from .store import get_comic_store
+
+
+# Separates comics in the alt text haystack (never appears in alt text)
+_SEPARATOR = "\x00"
+
+_MONTHS = {
+    name.lower(): number
+    for number in range(1, 13)
+    for name in (calendar.month_name[number], calendar.month_abbr[number])
+}
+
+_MONTH_YEAR_PATTERN = re.compile(
+    r"\b(" + "|".join(sorted(_MONTHS, key=len, reverse=True)) + r")\.?,?\s+((?:19|20)\d{2})\b",
+    re.IGNORECASE,
+)
+
+# A year after a preposition, unless it starts a number range ("comics from 2000 to 2010")
+_YEAR_PATTERN = re.compile(
+    r"\b(?:in|from|of|during)\s+((?:19|20)\d{2})\b(?!\s*(?:-|–|\.\.|to\b))",
+    re.IGNORECASE,
+)
+
+_NEWEST_PATTERN = re.compile(r"\b(?:last|latest|final|newest)\b", re.IGNORECASE)
+
+_RANGE_PATTERN = re.compile(r"#?(\d+)\s*(?:-|–|\.\.|to)\s*#?(\d+)")
+
+_ALT_TEXT_PATTERN = re.compile(
+    r"\b(?:with\s+|whose\s+)?alt[\s-]*text\s+(?:that\s+)?(?:mentions|mentioning|containing|contains|about|with)\s+"
+    r"[\"'“]?(.+?)[\"'”]?\s*[.!?]*$",
+    re.IGNORECASE,
+)
+
+
+def pack_date(year: Any, month: Any, day: Any) -> int:
+    """Pack a publication date into a ``YYYYMMDD`` integer.
+
+    Args:
+        year: Year as returned by the XKCD API (a string)
+        month: Month as returned by the XKCD API (a string)
+        day: Day as returned by the XKCD API (a string)
+
+    Returns:
+        Packed date, or 0 if the date is missing
+    """
+    try:
+        return int(year) * 10000 + int(month or 1) * 100 + int(day or 1)
+    except (TypeError, ValueError):
+        return 0
+
+
+def format_date(packed: int) -> str:
+    """Format a packed ``YYYYMMDD`` date as ``YYYY-MM-DD``."""
+    return f"{packed // 10000:04d}-{packed // 100 % 100:02d}-{packed % 100:02d}"
+
+
+class ComicArchive:
+    """Columns of comic metadata, one row per comic, ordered by comic number."""
+
+    def __init__(self):
+        self.numbers = array("i")
+        self.dates = array("i")
+        self.titles: List[str] = []
+        self.alts: List[str] = []
+        # Derived from the columns on the first query after a change
+        self._by_date: Optional[array] = None
+        self._sorted_dates = array("i")
+        self._haystack = ""
+        self._offsets = array("q")
+
+    def __len__(self) -> int:
+        return len(self.numbers)
+
+    def __contains__(self, comic_number: int) -> bool:
+        return self._row(comic_number) is not None
+
+    @classmethod
+    def from_rows(cls, rows: List[Tuple[Any, ...]]) -> "ComicArchive":
+        """Build a catalog from (num, year, month, day, title, alt) rows ordered by number.
+
+        Args:
+            rows: Rows as returned by ``ComicStore.archive_rows``
+
+        Returns:
+            Catalog holding every row
+        """
+        archive = cls()
+        archive.numbers = array("i", (row[0] for row in rows))
+        archive.dates = array("i", (pack_date(row[1], row[2], row[3]) for row in rows))
+        archive.titles = [sys.intern(row[4] or "") for row in rows]
+        archive.alts = [sys.intern(row[5] or "") for row in rows]
+        return archive
+
+    def _row(self, comic_number: int) -> Optional[int]:
+        """Find the row of a comic by bisection."""
+        row = bisect_left(self.numbers, comic_number)
+        return row if row < len(self.numbers) and self.numbers[row] == comic_number else None
+
+    def add(self, comic_data: Dict[str, Any]) -> None:
+        """Add a comic, replacing any existing row for it.
+
+        Args:
+            comic_data: Comic data from the XKCD API
+        """
+        comic_number = int(comic_data["num"])
+        date = pack_date(comic_data.get("year"), comic_data.get("month"), comic_data.get("day"))
+        title = sys.intern(comic_data.get("title") or "")
+        alt = sys.intern(comic_data.get("alt") or "")
+        row = self._row(comic_number)
+        if row is None:
+            row = bisect_left(self.numbers, comic_number)
+            self.numbers.insert(row, comic_number)
+            self.dates.insert(row, date)
+            self.titles.insert(row, title)
+            self.alts.insert(row, alt)
+        else:
+            self.dates[row], self.titles[row], self.alts[row] = date, title, alt
+        self._by_date = None
+
+    def date_of(self, comic_number: int) -> Optional[str]:
+        """Get a comic's publication date as ``YYYY-MM-DD``, or None if it is not in the catalog."""
+        row = self._row(comic_number)
+        return format_date(self.dates[row]) if row is not None and self.dates[row] else None
+
+    def _build(self) -> None:
+        """Rebuild the date permutation and the alt text haystack after a change."""
+        if self._by_date is not None:
+            return
+        dates = self.dates
+        self._by_date = array("i", sorted(range(len(dates)), key=dates.__getitem__))
+        self._sorted_dates = array("i", (dates[row] for row in self._by_date))
+        # Lowercase per comic, since lowercasing can change a string's length
+        lowered = [alt.lower() for alt in self.alts]
+        self._offsets = array("q", [0])
+        for alt in lowered:
+            self._offsets.append(self._offsets[-1] + len(alt) + len(_SEPARATOR))
+        self._haystack = _SEPARATOR.join(lowered) + _SEPARATOR
+
+    def _rows_mentioning(self, text: str, start: int, stop: int) -> List[int]:
+        """Get the rows in ``[start, stop)`` whose alt text contains ``text`` (case-insensitive)."""
+        needle = text.lower()
+        if not needle or _SEPARATOR in needle:
+            return []
+        rows = []
+        end = self._offsets[stop]
+        position = self._haystack.find(needle, self._offsets[start], end)
+        while position != -1:
+            row = bisect_right(self._offsets, position) - 1
+            rows.append(row)
+            # Continue after this comic, so each comic is reported once
+            position = self._haystack.find(needle, self._offsets[row + 1], end)
+        return rows
+
+    def select(
+        self,
+        numbers: Optional[Tuple[int, int]] = None,
+        dates: Optional[Tuple[int, int]] = None,
+        alt_text: Optional[str] = None,
+        newest_first: bool = False,
+        limit: Optional[int] = None,
+    ) -> List[int]:
+        """Find comics by number range, publication date range and alt text.
+
+        Args:
+            numbers: Inclusive range of comic numbers
+            dates: Inclusive range of packed ``YYYYMMDD`` dates
+            alt_text: Text the alt text must contain (case-insensitive)
+            newest_first: Order by descending comic number
+            limit: Maximum number of comics returned
+
+        Returns:
+            Matching comic numbers, in ascending order (descending with ``newest_first``)
+        """
+        self._build()
+        start, stop = 0, len(self.numbers)
+        if numbers is not None:
+            start = bisect_left(self.numbers, numbers[0])
+            stop = bisect_right(self.numbers, numbers[1])
+        if alt_text is not None:
+            rows = self._rows_mentioning(alt_text, start, stop) if start < stop else []
+        else:
+            rows = range(start, stop)
+        if dates is not None:
+            low = bisect_left(self._sorted_dates, dates[0])
+            high = bisect_right(self._sorted_dates, dates[1])
+            in_dates = self._by_date[low:high]
+            if alt_text is None and numbers is None:
+                rows = sorted(in_dates)
+            else:
+                rows = sorted(set(in_dates).intersection(rows))
+        selected = [self.numbers[row] for row in rows]
+        if newest_first:
+            selected.reverse()
+        return selected[:limit] if limit is not None else selected
+
+    def as_dict(self) -> Dict[str, Any]:
+        """Serialize the catalog size for health endpoints."""
+        return {
+            "comics": len(self),
+            "column_bytes": (len(self.numbers) + len(self.dates)) * self.numbers.itemsize,
+        }
+
+
+def parse_archive_query(text: str) -> Optional[Dict[str, Any]]:
+    """Recognize a query the catalog can answer.
+
+    Supports months ("comics from March 2010"), years ("first comic of 2015") and alt
+    text filters, optionally within a number range ("comics 1000-1100 with alt text
+    mentioning physics").
+
+    Args:
+        text: User query
+
+    Returns:
+        Keyword arguments for ``ComicArchive.select``, or None if the query has no date or alt text filter
+    """
+    query: Dict[str, Any] = {}
+    alt_match = _ALT_TEXT_PATTERN.search(text)
+    if alt_match is not None:
+        query["alt_text"] = alt_match.group(1).strip()
+        text = text[:alt_match.start()]
+
+    month_match = _MONTH_YEAR_PATTERN.search(text)
+    year_match = _YEAR_PATTERN.search(text)
+    if month_match is not None:
+        year, month = int(month_match.group(2)), _MONTHS[month_match.group(1).lower()]
+        query["dates"] = (year * 10000 + month * 100, year * 10000 + month * 100 + 99)
+    elif year_match is not None:
+        year = int(year_match.group(1))
+        query["dates"] = (year * 10000, year * 10000 + 9999)
+    if not query:
+        return None
+
+    range_match = _RANGE_PATTERN.search(text)
+    if range_match is not None:
+        low, high = sorted((int(range_match.group(1)), int(range_match.group(2))))
+        query["numbers"] = (low, high)
+    if _NEWEST_PATTERN.search(text):
+        query["newest_first"] = True
+    return query
+
+
+# Process-wide catalog, loaded lazily from the comic store
+_comic_archive: Optional[ComicArchive] = None
+
+
+def get_comic_archive() -> ComicArchive:
+    """Get the shared catalog, loading every stored comic in one query on first use."""
+    global _comic_archive
+    if _comic_archive is None:
+        store = get_comic_store()
+        _comic_archive = ComicArchive.from_rows(store.archive_rows() if store is not None else [])
+    return _comic_archive
+
+
+def reset_comic_archive() -> None:
+    """Drop the in-memory catalog so it is reloaded from the store on next use."""
+    global _comic_archive
+    _comic_archive = None
+
+
+def archive_comic(comic_data: Dict[str, Any]) -> None:
+    """Add a newly cached comic to the catalog, if the catalog is loaded.
+
+    An unloaded catalog picks the comic up from the store when it loads.
+
+    Args:
+        comic_data: Comic data from the XKCD API
+    """
+    if _comic_archive is not None:
+        _comic_archive.add(comic_data)
+
+
+def query_archive(text: str, limit: Optional[int] = None, strict: bool = True) -> Optional[List[int]]:
+    """Answer a date or alt text query from the catalog.
+
+    Args:
+        text: User query, e.g. "comics from March 2010" or "first comic of 2015"
+        limit: Maximum number of comics returned
+        strict: Raise if no stored comic matches, instead of returning an empty list
+
+    Returns:
+        Matching comic numbers, or None if the text is not a date or alt text query
+
+    Raises:
+        ValueError: If it is such a query, no stored comic matches and ``strict`` is set
+    """
+    query = parse_archive_query(text)
+    if query is None:
+        return None
+    matches = get_comic_archive().select(**query, limit=limit)
+    if not matches and strict:
+        raise ValueError(
+            "No stored comic matches that date or alt text. "
+            "Mirror the archive (python -m src.xkcd_app.mirror) to query every comic."
+        )
+    return matches
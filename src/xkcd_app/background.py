@@ -0,0 +1,88 @@
+"""Background tasks that keep the comic caches warm."""
+
+import asyncio
+import logging
+import os
+from typing import Any, Iterable, List
+
+from . import config
+from .html_generator import generate_comic_html
+from .store import get_comic_store
+from .xkcd_client import fetch_xkcd_comic, refresh_latest_comic
+
+
+logger = logging.getLogger(__name__)
+
+
+async def warm_comics(comic_numbers: Iterable[int], concurrency: int = config.WARM_CONCURRENCY) -> int:
+    """Fetch and render comics into every cache tier ahead of user requests.
+
+    Args:
+        comic_numbers: Comic numbers to warm
+        concurrency: Maximum number of comics fetched at once
+
+    Returns:
+        Number of comics warmed successfully
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def warm(comic_number: int) -> bool:
+        async with semaphore:
+            try:
+                generate_comic_html(await fetch_xkcd_comic(comic_number))
+                return True
+            except Exception as exc:
+                logger.warning("Failed to warm XKCD #%s: %s", comic_number, exc)
+                return False
+
+    results = await asyncio.gather(*(warm(num) for num in comic_numbers))
+    return sum(results)
+
+
+async def poll_latest_comic(interval: float) -> None:
+    """Revalidate the latest comic forever, so a new release is cached before anyone asks.
+
+    When several workers share the store, a lease makes only one of them poll each round.
+
+    Args:
+        interval: Seconds between polls
+    """
+    owner = str(os.getpid())
+    while True:
+        store = get_comic_store()
+        if config.WORKERS > 1 and store is not None and not store.acquire_lease("poll:latest", owner, interval):
+            # Another worker polls this round; its result reaches us through the store
+            await asyncio.sleep(interval)
+            continue
+        try:
+            comic_data = await refresh_latest_comic()
+            generate_comic_html(comic_data)
+            logger.debug("Latest XKCD is #%s", comic_data.get("num"))
+        except Exception as exc:
+            logger.warning("Failed to poll latest XKCD: %s", exc)
+        await asyncio.sleep(interval)
+
+
+def start_background_tasks() -> List["asyncio.Task[Any]"]:
+    """Start the configured warm-up and polling tasks.
+
+    Returns:
+        Started tasks, to be passed to stop_background_tasks on shutdown
+    """
+    tasks = []
+    if config.WARM_COMICS:
+        tasks.append(asyncio.create_task(warm_comics(config.WARM_COMICS)))
+    if config.POLL_INTERVAL > 0:
+        tasks.append(asyncio.create_task(poll_latest_comic(config.POLL_INTERVAL)))
+    return tasks
+
+
+async def stop_background_tasks(tasks: List["asyncio.Task[Any]"]) -> None:
+    """Cancel background tasks and wait for them to finish.
+
+    Args:
+        tasks: Tasks returned by start_background_tasks
+    """
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
@@ -0,0 +1,193 @@
+"""In-memory caching primitives for the XKCD ChatGPT App."""
+
+import asyncio
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, Hashable, List, Optional, Tuple
+
+
+@dataclass
+class CacheStats:
+    """Hit/miss/eviction counters for a cache tier."""
+    hits: int = 0
+    misses: int = 0
+    evictions: int = 0
+
+    @property
+    def hit_ratio(self) -> float:
+        """Fraction of lookups that were served from this tier."""
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def reset(self) -> None:
+        """Zero all counters."""
+        self.hits = self.misses = self.evictions = 0
+
+    def as_dict(self) -> Dict[str, Any]:
+        """Serialize the counters for health and metrics endpoints."""
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_ratio": round(self.hit_ratio, 4),
+        }
+
+
+class LRUCache:
+    """Least-recently-used cache bounded by entry count and/or total size, with optional TTL."""
+
+    def __init__(
+        self,
+        max_entries: Optional[int] = None,
+        max_bytes: Optional[int] = None,
+        sizeof: Callable[[Any], int] = len,
+    ):
+        """Create an empty cache.
+
+        Args:
+            max_entries: Maximum number of entries kept before evicting the oldest
+            max_bytes: Maximum total size of all values before evicting the oldest
+            sizeof: Function returning the size of a value, used with max_bytes
+        """
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.sizeof = sizeof
+        self.total_bytes = 0
+        self.stats = CacheStats()
+        self._entries: "OrderedDict[Hashable, Tuple[Any, Optional[float], int]]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return self._lookup(key) is not None
+
+    def _lookup(self, key: Hashable) -> Optional[Tuple[Any, Optional[float], int]]:
+        """Return the live entry for a key, dropping it if it has expired."""
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at = entry[1]
+        if expires_at is not None and expires_at <= time.monotonic():
+            self._remove(key)
+            return None
+        return entry
+
+    def _remove(self, key: Hashable) -> Optional[Tuple[Any, Optional[float], int]]:
+        """Remove an entry and release its size from the byte budget."""
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self.total_bytes -= entry[2]
+        return entry
+
+    def _over_capacity(self) -> bool:
+        """Check whether either the entry or byte bound is exceeded."""
+        if self.max_entries is not None and len(self._entries) > self.max_entries:
+            return True
+        return self.max_bytes is not None and self.total_bytes > self.max_bytes
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """Look up a key and mark it as recently used.
+
+        Args:
+            key: Cache key
+            default: Value returned on a miss
+
+        Returns:
+            Cached value, or default if missing or expired
+        """
+        entry = self._lookup(key)
+        if entry is None:
+            self.stats.misses += 1
+            return default
+        self._entries.move_to_end(key)
+        self.stats.hits += 1
+        return entry[0]
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None) -> None:
+        """Store a value, evicting least-recently-used entries if over capacity.
+
+        Values larger than the whole byte budget are not cached at all.
+
+        Args:
+            key: Cache key
+            value: Value to store
+            ttl: Seconds until the entry expires, or None to keep it until evicted
+        """
+        size = self.sizeof(value) if self.max_bytes is not None else 0
+        self._remove(key)
+        if self.max_bytes is not None and size > self.max_bytes:
+            return
+        expires_at = time.monotonic() + ttl if ttl is not None else None
+        self._entries[key] = (value, expires_at, size)
+        self.total_bytes += size
+        while self._over_capacity():
+            self._remove(next(iter(self._entries)))
+            self.stats.evictions += 1
+
+    def items(self) -> List[Tuple[Hashable, Any]]:
+        """Get the live entries from least to most recently used (without counting hits)."""
+        now = time.monotonic()
+        return [
+            (key, value)
+            for key, (value, expires_at, _) in self._entries.items()
+            if expires_at is None or expires_at > now
+        ]
+
+    def pop(self, key: Hashable, default: Any = None) -> Any:
+        """Remove a key and return its value (without counting a hit or miss)."""
+        entry = self._remove(key)
+        return entry[0] if entry is not None else default
+
+    def clear(self) -> None:
+        """Drop all entries and reset the counters."""
+        self._entries.clear()
+        self.total_bytes = 0
+        self.stats.reset()
+
+
+class SingleFlight:
+    """Coalesce concurrent calls for the same key into one shared in-flight task."""
+
+    def __init__(self):
+        self.started = 0
+        self.coalesced = 0
+        self._inflight: Dict[Hashable, "asyncio.Task[Any]"] = {}
+
+    def __len__(self) -> int:
+        return len(self._inflight)
+
+    async def run(self, key: Hashable, factory: Callable[[], Awaitable[Any]]) -> Any:
+        """Await the in-flight call for a key, starting it if there is none.
+
+        The shared task is shielded, so a cancelled caller never cancels the work
+        other callers are waiting on. Exceptions are raised to every waiter.
+
+        Args:
+            key: Key identifying equivalent calls
+            factory: Zero-argument coroutine function that performs the call
+
+        Returns:
+            Result of the shared call
+        """
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(factory())
+            self._inflight[key] = task
+            task.add_done_callback(lambda done: self._finish(key, done))
+            self.started += 1
+        else:
+            self.coalesced += 1
+        return await asyncio.shield(task)
+
+    def _finish(self, key: Hashable, task: "asyncio.Task[Any]") -> None:
+        """Forget a completed task and mark its exception as retrieved."""
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        if not task.cancelled():
+            task.exception()
+
+    def as_dict(self) -> Dict[str, Any]:
+        """Serialize the counters for health and metrics endpoints."""
+        return {"started": self.started, "coalesced": self.coalesced, "in_flight": len(self._inflight)}
@@ -0,0 +1,160 @@
+"""Prebuilt MCP catalog of the tools, resources and resource templates for every widget.
+
+The widget registry is static, so the listings are built once and every
+``tools/list``, ``resources/list`` and ``resources/templates/list`` request returns the
+same result objects. The catalog is rebuilt only when the registry or the settings
+that shape tool metadata change.
+"""
+
+import hashlib
+import json
+from copy import deepcopy
+from dataclasses import dataclass
+from typing import Any, Dict, Hashable, List, Optional, Tuple
+
+import mcp.types as types
+
+from . import config
+from .handlers import get_tool_meta
+from .models import AppWidget
+from .widgets import ALL_WIDGETS
+from .xkcd_client import images_by_reference
+
+
+# Tool input schema for MCP protocol
+TOOL_INPUT_SCHEMA: Dict[str, Any] = {
+    "type": "object",
+    "properties": {
+        "userQuery": {
+            "type": "string",
+            "description": (
+                "The user's request - can be a URL, comic number, or natural language "
+                "(e.g., 'https://xkcd.com/327/', 'show comic 2000', '#327', 'show me latest')"
+            ),
+        },
+        "comicNumber": {
+            "type": "integer",
+            "description": "Specific XKCD comic number to fetch (optional)",
+        },
+        "navigate": {
+            "type": "string",
+            "enum": ["next", "previous", "random"],
+            "description": (
+                "Step from the comic shown last in this conversation, or from comicNumber if given "
+                "(optional, for 'next one', 'previous', 'random')"
+            ),
+        },
+        "options": {
+            "type": "object",
+            "description": (
+                "Optional parameters: deferImage (true to return the comic's text at once and "
+                "load its image when the widget opens)"
+            ),
+        }
+    },
+    "required": ["userQuery"],
+    "additionalProperties": False,
+}
+
+# Result metadata key carrying the catalog version
+VERSION_META_KEY = "xkcd/catalogVersion"
+
+
+@dataclass(frozen=True)
+class Catalog:
+    """Ready-made listing results, with a version derived from their serialized form."""
+    version: str
+    tools: types.ServerResult
+    resources: types.ServerResult
+    resource_templates: types.ServerResult
+    body: bytes
+
+    @property
+    def etag(self) -> str:
+        """Strong HTTP ETag of the serialized catalog."""
+        return f'"{self.version}"'
+
+
+def build_catalog(widgets: List[AppWidget], mime_type: str) -> Catalog:
+    """Build the listing results for a widget registry.
+
+    Args:
+        widgets: Widgets to expose
+        mime_type: MIME type of the widget resources
+
+    Returns:
+        Prebuilt catalog
+    """
+    input_schema = deepcopy(TOOL_INPUT_SCHEMA)
+    tools = [
+        types.Tool(
+            name=widget.identifier,
+            title=widget.title,
+            description=widget.title,
+            inputSchema=input_schema,
+            _meta=get_tool_meta(widget),
+        )
+        for widget in widgets
+    ]
+    resources = [
+        types.Resource(
+            name=widget.title,
+            title=widget.title,
+            uri=widget.template_uri,
+            description=f"{widget.title} widget markup",
+            mimeType=mime_type,
+            _meta=get_tool_meta(widget),
+        )
+        for widget in widgets
+    ]
+    resource_templates = [
+        types.ResourceTemplate(
+            name=widget.title,
+            title=widget.title,
+            uriTemplate=widget.template_uri,
+            description=f"{widget.title} widget markup",
+            mimeType=mime_type,
+            _meta=get_tool_meta(widget),
+        )
+        for widget in widgets
+    ]
+
+    dump = lambda items: [item.model_dump(mode="json", by_alias=True, exclude_none=True) for item in items]
+    body = json.dumps(
+        {"tools": dump(tools), "resources": dump(resources), "resourceTemplates": dump(resource_templates)},
+        separators=(",", ":"),
+        sort_keys=True,
+    ).encode()
+    version = hashlib.sha256(body).hexdigest()[:16]
+    meta = {VERSION_META_KEY: version}
+
+    return Catalog(
+        version=version,
+        tools=types.ServerResult(types.ListToolsResult(tools=tools, _meta=meta)),
+        resources=types.ServerResult(types.ListResourcesResult(resources=resources, _meta=meta)),
+        resource_templates=types.ServerResult(
+            types.ListResourceTemplatesResult(resourceTemplates=resource_templates, _meta=meta)
+        ),
+        body=body,
+    )
+
+
+# Process-wide catalog and the registry state it was built from
+_catalog: Optional[Catalog] = None
+_catalog_key: Optional[Tuple[Hashable, ...]] = None
+
+
+def get_catalog(mime_type: str) -> Catalog:
+    """Get the catalog for the current widget registry, rebuilding it only if that changed.
+
+    Args:
+        mime_type: MIME type of the widget resources
+
+    Returns:
+        Prebuilt catalog
+    """
+    global _catalog, _catalog_key
+    key = (tuple(ALL_WIDGETS), mime_type, images_by_reference(), config.PUBLIC_URL)
+    if _catalog is None or key != _catalog_key:
+        _catalog, _catalog_key = build_catalog(ALL_WIDGETS, mime_type), key
+    return _catalog
@@ -0,0 +1,134 @@
+"""Runtime configuration for the XKCD ChatGPT App, read from environment variables."""
+
+import os
+
+
+def _env_bool(name: str, default: bool) -> bool:
+    """Read a boolean flag from the environment.
+
+    Args:
+        name: Environment variable name
+        default: Value to use when the variable is unset or empty
+
+    Returns:
+        Parsed boolean value
+    """
+    value = os.environ.get(name, "").strip().lower()
+    if not value:
+        return default
+    return value in ("1", "true", "yes", "on")
+
+
+def _env_int(name: str, default: int) -> int:
+    """Read an integer from the environment, falling back to a default."""
+    value = os.environ.get(name, "").strip()
+    return int(value) if value else default
+
+
+def _env_float(name: str, default: float) -> float:
+    """Read a float from the environment, falling back to a default."""
+    value = os.environ.get(name, "").strip()
+    return float(value) if value else default
+
+
+# Upstream HTTP client
+HTTP2_ENABLED = _env_bool("XKCD_HTTP2", False)
+HTTP_TIMEOUT = _env_float("XKCD_HTTP_TIMEOUT", 10.0)
+HTTP_CONNECT_TIMEOUT = _env_float("XKCD_HTTP_CONNECT_TIMEOUT", 5.0)
+HTTP_MAX_CONNECTIONS = _env_int("XKCD_HTTP_MAX_CONNECTIONS", 100)
+HTTP_MAX_KEEPALIVE = _env_int("XKCD_HTTP_MAX_KEEPALIVE", 20)
+HTTP_KEEPALIVE_EXPIRY = _env_float("XKCD_HTTP_KEEPALIVE_EXPIRY", 30.0)
+
+# Upstream deadlines: each comic load gets REQUEST_BUDGET seconds, at most JSON_BUDGET_SHARE
+# of which may go to the metadata request; the image download gets the rest
+REQUEST_BUDGET = _env_float("XKCD_REQUEST_BUDGET", 6.0)
+JSON_BUDGET_SHARE = _env_float("XKCD_JSON_BUDGET_SHARE", 0.4)
+
+# Upstream circuit breaker
+BREAKER_FAILURES = _env_int("XKCD_BREAKER_FAILURES", 5)
+BREAKER_RESET = _env_float("XKCD_BREAKER_RESET", 30.0)
+
+# Hedged requests: once HEDGE_MIN_SAMPLES latencies are known, a request still unanswered
+# after the HEDGE_PERCENTILE latency (at least HEDGE_MIN_DELAY) is sent a second time
+HEDGE_ENABLED = _env_bool("XKCD_HEDGE", False)
+HEDGE_PERCENTILE = _env_float("XKCD_HEDGE_PERCENTILE", 95.0)
+HEDGE_MIN_DELAY = _env_float("XKCD_HEDGE_MIN_DELAY", 0.05)
+HEDGE_MIN_SAMPLES = _env_int("XKCD_HEDGE_MIN_SAMPLES", 20)
+HEDGE_WINDOW = _env_int("XKCD_HEDGE_WINDOW", 256)
+
+# Process-wide retry budget: extra requests earn RETRY_BUDGET_RATIO tokens per request,
+# with at most RETRY_BUDGET_BURST saved up
+RETRY_BUDGET_RATIO = _env_float("XKCD_RETRY_BUDGET_RATIO", 0.1)
+RETRY_BUDGET_BURST = _env_float("XKCD_RETRY_BUDGET_BURST", 10.0)
+
+# Server processes: the production launcher starts WORKERS processes sharing the disk store
+HOST = os.environ.get("XKCD_HOST", "0.0.0.0").strip()
+PORT = _env_int("XKCD_PORT", 8000)
+WORKERS = max(1, _env_int("XKCD_WORKERS", 1))
+GRACEFUL_SHUTDOWN_TIMEOUT = _env_float("XKCD_GRACEFUL_SHUTDOWN_TIMEOUT", 30.0)
+STORE_BUSY_TIMEOUT = _env_float("XKCD_STORE_BUSY_TIMEOUT", 10.0)
+# Seconds a worker may hold the lease on an upstream fetch before others stop waiting for it
+FETCH_LEASE_TTL = _env_float("XKCD_FETCH_LEASE_TTL", 10.0)
+
+# Comic caches
+CACHE_DIR = os.environ.get("XKCD_CACHE_DIR", ".xkcd_cache").strip()
+METADATA_CACHE_SIZE = _env_int("XKCD_METADATA_CACHE_SIZE", 1024)
+LATEST_TTL = _env_float("XKCD_LATEST_TTL", 300.0)
+# The image memory budget is for the whole server, so each worker gets its share
+IMAGE_CACHE_BYTES = _env_int("XKCD_IMAGE_CACHE_BYTES", 64 * 1024 * 1024) // WORKERS
+
+# Cache snapshot written on shutdown and memory-mapped on boot (empty disables it)
+SNAPSHOT_PATH = os.environ.get("XKCD_SNAPSHOT_PATH", ".xkcd_cache/snapshot.bin").strip()
+
+# Background warm-up
+POLL_INTERVAL = _env_float("XKCD_POLL_INTERVAL", 0.0)
+WARM_COMICS = [int(num) for num in os.environ.get("XKCD_WARM_COMICS", "").replace(",", " ").split()]
+WARM_CONCURRENCY = _env_int("XKCD_WARM_CONCURRENCY", 4)
+
+# Archive mirror
+MIRROR_CONCURRENCY = _env_int("XKCD_MIRROR_CONCURRENCY", 8)
+
+# Viewer tool: answer with metadata first and hydrate the image when the widget is read
+DEFER_IMAGES = _env_bool("XKCD_DEFER_IMAGES", False)
+
+# Viewer navigation: after comic N is shown its neighbours are prefetched in the background,
+# at most PREFETCH_CONCURRENCY at once and only while less than PREFETCH_BYTES of prefetched
+# widgets sit unshown; a prefetched comic not shown within PREFETCH_TTL seconds counts as wasted
+PREFETCH_ENABLED = _env_bool("XKCD_PREFETCH", True)
+PREFETCH_CONCURRENCY = _env_int("XKCD_PREFETCH_CONCURRENCY", 3)
+PREFETCH_BYTES = _env_int("XKCD_PREFETCH_BYTES", 8 * 1024 * 1024) // WORKERS
+PREFETCH_TTL = _env_float("XKCD_PREFETCH_TTL", 600.0)
+NAVIGATION_SESSIONS = _env_int("XKCD_NAVIGATION_SESSIONS", 10000)
+
+# Gallery tool
+GALLERY_MAX_COMICS = _env_int("XKCD_GALLERY_MAX_COMICS", 50)
+GALLERY_CONCURRENCY = _env_int("XKCD_GALLERY_CONCURRENCY", 6)
+
+# Rendered widget HTML (shared through the disk store by default when running several workers)
+WIDGET_CACHE_BACKEND = (
+    os.environ.get("XKCD_WIDGET_CACHE_BACKEND", "").strip().lower() or ("sqlite" if WORKERS > 1 else "memory")
+)
+WIDGET_CACHE_BYTES = _env_int("XKCD_WIDGET_CACHE_BYTES", 32 * 1024 * 1024)
+WIDGET_CACHE_TTL = _env_float("XKCD_WIDGET_CACHE_TTL", 3600.0)
+
+# Image delivery: "inline" embeds base64 data URIs, "reference" links to the /img route
+IMAGE_MODE = os.environ.get("XKCD_IMAGE_MODE", "inline").strip().lower()
+PUBLIC_URL = os.environ.get("XKCD_PUBLIC_URL", "").strip().rstrip("/")
+HTML_CACHE_BYTES = _env_int("XKCD_HTML_CACHE_BYTES", 64 * 1024 * 1024) // WORKERS
+
+# Image variants (require Pillow)
+IMAGE_MAX_WIDTH = _env_int("XKCD_IMAGE_MAX_WIDTH", 1000)
+THUMBNAIL_WIDTH = _env_int("XKCD_THUMBNAIL_WIDTH", 240)
+INLINE_IMAGE_BUDGET = _env_int("XKCD_INLINE_IMAGE_BUDGET", 400 * 1024)
+
+# Tile pyramids for giant comics (require Pillow and the disk tier)
+TILE_SIZE = _env_int("XKCD_TILE_SIZE", 512)
+TILE_MIN_SIZE = _env_int("XKCD_TILE_MIN_SIZE", 4096)
+
+# Per-request profiling (see profiling.py)
+PROFILE_DIR = os.environ.get("XKCD_PROFILE_DIR", ".xkcd_profiles").strip()
+# The server has no authentication, so clients may only ask for profiles when this is set
+PROFILE_ON_REQUEST = _env_bool("XKCD_PROFILE_ON_REQUEST", False)
+PROFILE_SAMPLE_RATE = _env_float("XKCD_PROFILE_SAMPLE_RATE", 0.0)
+PROFILE_INTERVAL = _env_float("XKCD_PROFILE_INTERVAL", 0.001)
+PROFILE_MAX_FILES = _env_int("XKCD_PROFILE_MAX_FILES", 50)
@@ -1,18 +1,46 @@
 """MCP request handlers for XKCD widget following OpenAI patterns."""
 
-from typing import Any, Dict
+import asyncio
+import logging
+import time
+from contextlib import nullcontext
+from typing import Any, Dict, Optional, Sequence, Tuple
 
 import mcp.types as types
 from pydantic import ValidationError
 
-from .html_generator import generate_comic_html, generate_error_html
+from . import config
+from .archive import query_archive
+from .html_generator import generate_comic_html, generate_error_html, generate_gallery_html
+from .metrics import STAGE_SECONDS, TOOL_CALL_SECONDS, TOOL_CALLS_IN_FLIGHT, TOOL_RESPONSE_BYTES
 from .models import AppWidget, ToolInput
-from .widgets import get_widget_by_id, get_widget_by_uri
-from .xkcd_client import extract_comic_number, fetch_xkcd_comic
+from .navigation import PREFETCHER, navigate, parse_navigation, remember_comic
+from .profiling import profile_request, should_profile
+from .progress import ProgressReporter
+from .resilience import Deadline
+from .search import asks_for_latest, find_comic_number
+from .widget_cache import create_widget_cache, get_session_key
+from .widgets import XKCD_GALLERY_WIDGET, get_widget_by_id, get_widget_by_uri
+from .xkcd_client import (
+    extract_comic_number,
+    extract_comic_numbers,
+    fetch_xkcd_comic,
+    fetch_xkcd_comics,
+    images_by_reference,
+    load_comic_metadata,
+)
 
 
-# Cache to store the latest widget HTML (updated after each tool call)
-WIDGET_HTML_CACHE: Dict[str, str] = {}
+logger = logging.getLogger(__name__)
+
+# Cache of the latest widget HTML per session and template URI (updated after each tool call)
+WIDGET_HTML_CACHE = create_widget_cache()
+
+# Tool option asking for a metadata-first response with the image hydrated later
+DEFER_IMAGE_OPTION = "deferImage"
+
+# Image hydrations still running after a metadata-first tool call, keyed by (session key, template URI)
+PENDING_HYDRATIONS: Dict[Tuple[str, str], "asyncio.Task[None]"] = {}
 
 
 def get_tool_meta(widget: AppWidget) -> Dict[str, Any]:
@@ -24,7 +52,7 @@ def get_tool_meta(widget: AppWidget) -> Dict[str, Any]:
     Returns:
         Metadata dictionary
     """
-    return {
+    meta: Dict[str, Any] = {
         "openai/outputTemplate": widget.template_uri,
         "openai/toolInvocation/invoking": widget.invoking,
         "openai/toolInvocation/invoked": widget.invoked,
@@ -36,6 +64,10 @@ def get_tool_meta(widget: AppWidget) -> Dict[str, Any]:
             "readOnlyHint": True,
         }
     }
+    if images_by_reference():
+        # Allow the widget to load images from our /img route
+        meta["openai/widgetCSP"] = {"connect_domains": [], "resource_domains": [config.PUBLIC_URL]}
+    return meta
 
 
 def create_embedded_resource(widget: AppWidget, mime_type: str) -> types.EmbeddedResource:
@@ -81,8 +113,13 @@ async def handle_read_resource(
             )
         )
 
-    # Use cached HTML if available (updated after tool calls), otherwise use the default template
-    html_content = WIDGET_HTML_CACHE.get(widget.template_uri, widget.html)
+    # Use this session's cached HTML if available (updated after tool calls), otherwise the default template;
+    # anonymous requests always get the template, so they never read another client's comic
+    session_key = get_session_key(req)
+    html_content = widget.html
+    if session_key is not None:
+        await wait_for_hydration(session_key, widget.template_uri)
+        html_content = WIDGET_HTML_CACHE.get(session_key, widget.template_uri) or widget.html
 
     contents = [
         types.TextResourceContents(
@@ -96,6 +133,234 @@ async def handle_read_resource(
     return types.ServerResult(types.ReadResourceResult(contents=contents))
 
 
+def comic_result_data(comic_data: Dict[str, Any]) -> Dict[str, Any]:
+    """Build the structured content returned for a comic.
+
+    Args:
+        comic_data: Comic data from the XKCD API
+
+    Returns:
+        Structured comic summary
+    """
+    return {
+        "comic_number": comic_data.get("num"),
+        "title": comic_data.get("title"),
+        "alt": comic_data.get("alt"),
+        "img": comic_data.get("img"),
+        "date": f"{comic_data.get('year')}-{int(comic_data.get('month', 1)):02d}-{int(comic_data.get('day', 1)):02d}",
+    }
+
+
+def resolve_comic_number(payload: ToolInput) -> Optional[int]:
+    """Work out which comic a viewer call asks for.
+
+    Args:
+        payload: Validated tool input
+
+    Returns:
+        Comic number, or None for the latest comic
+    """
+    # First check if comic_number was explicitly provided
+    comic_number = payload.comic_number
+
+    # Then an explicit reference in the query ("xkcd.com/1337", "comic #1337 from 2014")
+    if comic_number is None:
+        comic_number = extract_comic_number(payload.user_query, explicit_only=True)
+
+    # Then answer dates and alt text from the catalog, before their years are taken for comic numbers.
+    # A catalog with no match (e.g. not mirrored) leaves the query to the search index.
+    matches = None
+    if comic_number is None:
+        matches = query_archive(payload.user_query, limit=1, strict=False)
+        comic_number = matches[0] if matches else None
+
+    # If not, try to extract a plain number from the user query
+    if comic_number is None and matches is None:
+        comic_number = extract_comic_number(payload.user_query)
+
+    # Otherwise look the query up in the full-text index ("the one about Bobby Tables"),
+    # unless it asks for the newest comic
+    if comic_number is None and not asks_for_latest(payload.user_query):
+        comic_number = find_comic_number(payload.user_query)
+    return comic_number
+
+
+async def choose_comic(
+    payload: ToolInput,
+    session_key: Optional[str],
+    deadline: Optional[Deadline] = None,
+) -> Tuple[Optional[int], Optional[str]]:
+    """Work out which comic a viewer call asks for, following navigation steps.
+
+    Args:
+        payload: Validated tool input
+        session_key: Session whose last shown comic navigation steps start from (None if anonymous)
+        deadline: Deadline of the tool call, for looking up the latest comic
+
+    Returns:
+        Tuple of (comic number or None for the latest comic, navigation direction or None)
+    """
+    direction = payload.navigate
+    if direction is None and payload.comic_number is None:
+        direction = parse_navigation(payload.user_query)
+    if direction is None:
+        comic_number = resolve_comic_number(payload)
+    else:
+        comic_number = await navigate(session_key, direction, origin=payload.comic_number, deadline=deadline)
+    if comic_number is not None:
+        PREFETCHER.claim(comic_number, navigated=direction is not None)
+    return comic_number, direction
+
+
+def defers_image(payload: ToolInput) -> bool:
+    """Check whether a viewer call should answer with metadata first and hydrate the image later."""
+    return bool(payload.options.get(DEFER_IMAGE_OPTION, config.DEFER_IMAGES))
+
+
+async def render_comic(
+    comic_number: Optional[int],
+    progress: ProgressReporter,
+    deadline: Optional[Deadline] = None,
+) -> Tuple[str, str, Dict[str, Any]]:
+    """Fetch and render a single comic for the viewer widget.
+
+    Args:
+        comic_number: Comic to show, or None for the latest comic
+        progress: Reporter notified after the metadata, image and render steps
+        deadline: Deadline of the tool call, shared by the metadata and image steps
+
+    Returns:
+        Tuple of (widget HTML, response text, structured content)
+    """
+    comic_data = await load_comic_metadata(comic_number, deadline=deadline)
+    await progress.advance(f"Fetched XKCD #{comic_data['num']}: {comic_data['title']}")
+    comic_data = await fetch_xkcd_comic(comic_data["num"], deadline=deadline)
+    await progress.advance(f"Fetched image for XKCD #{comic_data['num']}")
+
+    # Generate HTML with the fetched comic
+    with STAGE_SECONDS.time(stage="render"):
+        comic_html = generate_comic_html(comic_data)
+    await progress.advance("Rendered widget")
+    response_text = f"Displaying XKCD #{comic_data['num']}: {comic_data['title']}"
+    return comic_html, response_text, comic_result_data(comic_data)
+
+
+async def render_comic_metadata(
+    comic_number: Optional[int],
+    progress: ProgressReporter,
+    deadline: Optional[Deadline] = None,
+) -> Tuple[str, str, Dict[str, Any]]:
+    """Render a comic from its metadata alone, linking the upstream image until it is hydrated.
+
+    Args:
+        comic_number: Comic to show, or None for the latest comic
+        progress: Reporter notified once the metadata is in
+        deadline: Deadline of the tool call
+
+    Returns:
+        Tuple of (placeholder widget HTML, response text, structured content)
+    """
+    comic_data = await load_comic_metadata(comic_number, deadline=deadline)
+    with STAGE_SECONDS.time(stage="render"):
+        comic_html = generate_comic_html({**comic_data, "img_original": comic_data.get("img", "")})
+    await progress.finish(f"Fetched XKCD #{comic_data['num']}: {comic_data['title']} (image loads with the widget)")
+    response_text = f"Displaying XKCD #{comic_data['num']}: {comic_data['title']}"
+    return comic_html, response_text, {**comic_result_data(comic_data), "image_pending": True}
+
+
+def start_hydration(session_key: str, template_uri: str, comic_number: int, prefetch: Sequence[int] = ()) -> None:
+    """Fetch a comic's image in the background and replace the session's placeholder widget.
+
+    Any later tool call for the same session and widget cancels the hydration, so a
+    slow image can never overwrite a newer comic.
+
+    Args:
+        session_key: Session the widget belongs to
+        template_uri: Widget template URI
+        comic_number: Comic whose image to load
+        prefetch: Comics to prefetch once the image is in
+    """
+    key = (session_key, template_uri)
+    cancel_hydration(session_key, template_uri)
+
+    async def hydrate() -> None:
+        comic_data = await fetch_xkcd_comic(comic_number)
+        with STAGE_SECONDS.time(stage="render"):
+            comic_html = generate_comic_html(comic_data)
+        WIDGET_HTML_CACHE.set(session_key, template_uri, comic_html)
+        PREFETCHER.prefetch(prefetch)
+
+    def finish(task: "asyncio.Task[None]") -> None:
+        if PENDING_HYDRATIONS.get(key) is task:
+            del PENDING_HYDRATIONS[key]
+        if not task.cancelled() and task.exception() is not None:
+            logger.warning("Failed to hydrate XKCD #%s: %s", comic_number, task.exception())
+
+    task = asyncio.get_running_loop().create_task(hydrate())
+    PENDING_HYDRATIONS[key] = task
+    task.add_done_callback(finish)
+
+
+def cancel_hydration(session_key: str, template_uri: str) -> None:
+    """Cancel a session's pending image hydration, if any."""
+    task = PENDING_HYDRATIONS.pop((session_key, template_uri), None)
+    if task is not None:
+        task.cancel()
+
+
+async def wait_for_hydration(session_key: str, template_uri: str) -> None:
+    """Wait for a session's pending image hydration to finish.
+
+    Waits at most ``XKCD_REQUEST_BUDGET`` seconds. If hydration is slower, or it
+    fails, the placeholder is served. The placeholder still links the upstream image.
+    """
+    task = PENDING_HYDRATIONS.get((session_key, template_uri))
+    if task is not None:
+        await asyncio.wait({task}, timeout=config.REQUEST_BUDGET)
+
+
+async def render_gallery(payload: ToolInput, progress: ProgressReporter) -> Tuple[str, str, Dict[str, Any]]:
+    """Fetch a list, range, date or alt text query of comics concurrently and render them as a gallery.
+
+    Args:
+        payload: Validated tool input
+        progress: Reporter notified as each comic arrives and after rendering
+
+    Returns:
+        Tuple of (widget HTML, response text, structured content)
+    """
+    comic_numbers = query_archive(payload.user_query, limit=config.GALLERY_MAX_COMICS)
+    if comic_numbers is None:
+        comic_numbers = extract_comic_numbers(payload.user_query)
+    if payload.comic_number is not None and payload.comic_number not in comic_numbers:
+        comic_numbers.insert(0, payload.comic_number)
+    if not comic_numbers:
+        raise ValueError("No comic numbers found. Try a list or range like '#300-#320' or '327, 1053'.")
+
+    progress.total = len(comic_numbers) + 1
+
+    async def fetched(done: int) -> None:
+        await progress.advance(f"Fetched {done} of {len(comic_numbers)} comics")
+
+    comics = await fetch_xkcd_comics(comic_numbers, variant="thumb", on_fetched=fetched)
+    with STAGE_SECONDS.time(stage="render"):
+        gallery_html = generate_gallery_html(comics, comic_numbers)
+    await progress.advance("Rendered gallery")
+
+    loaded = [comic for comic in comics if not isinstance(comic, Exception)]
+    errors = [
+        {"comic_number": num, "error": str(comic)}
+        for num, comic in zip(comic_numbers, comics)
+        if isinstance(comic, Exception)
+    ]
+    response_text = f"Displaying {len(loaded)} of {len(comic_numbers)} XKCD comics"
+    result_data = {
+        "comics": [comic_result_data(comic) for comic in loaded],
+        "errors": errors,
+    }
+    return gallery_html, response_text, result_data
+
+
 async def handle_call_tool(
     req: types.CallToolRequest,
     mime_type: str
@@ -123,10 +388,34 @@ async def handle_call_tool(
             )
         )
 
+    started = time.perf_counter()
+    profiler = profile_request(widget.identifier) if should_profile(req) else nullcontext()
+    with TOOL_CALLS_IN_FLIGHT.track_inprogress(tool=widget.identifier), profiler:
+        result, outcome = await call_widget_tool(widget, req, mime_type)
+    TOOL_CALL_SECONDS.observe(time.perf_counter() - started, tool=widget.identifier, outcome=outcome)
+    return result
+
+
+async def call_widget_tool(
+    widget: AppWidget,
+    req: types.CallToolRequest,
+    mime_type: str
+) -> Tuple[types.ServerResult, str]:
+    """Run a widget's tool and build its result.
+
+    Args:
+        widget: Widget whose tool was called
+        req: The tool call request
+        mime_type: MIME type for resources
+
+    Returns:
+        Tuple of (server result, outcome: ``ok``, ``error`` or ``invalid``)
+    """
     # Validate input
     arguments = req.params.arguments or {}
     try:
-        payload = ToolInput.model_validate(arguments)
+        with STAGE_SECONDS.time(stage="validation"):
+            payload = ToolInput.model_validate(arguments)
     except ValidationError as exc:
         return types.ServerResult(
             types.CallToolResult(
@@ -138,64 +427,83 @@ async def handle_call_tool(
                 ],
                 isError=True,
             )
-        )
-
-    # Fetch XKCD comic
+        ), "invalid"
+
+    # Fetch and render the comic(s) for this widget
+    outcome = "ok"
+    session_key = get_session_key(req)
+    progress = ProgressReporter(req, total=3)
+    viewer = widget.identifier != XKCD_GALLERY_WIDGET.identifier
+    deferred = viewer and defers_image(payload)
     try:
-        # First check if comic_number was explicitly provided
-        comic_number = payload.comic_number
-
-        # If not, try to extract from the user query (URL or number)
-        if comic_number is None:
-            comic_number = extract_comic_number(payload.user_query)
-
-        comic_data = await fetch_xkcd_comic(comic_number)
-
-        # Generate HTML with the fetched comic
-        comic_html = generate_comic_html(comic_data)
-
-        # Cache the HTML so it's available when the resource is requested
-        WIDGET_HTML_CACHE[widget.template_uri] = comic_html
-
-        # Update widget with the new HTML
-        updated_widget = AppWidget(
-            identifier=widget.identifier,
-            title=widget.title,
-            template_uri=widget.template_uri,
-            invoking=widget.invoking,
-            invoked=widget.invoked,
-            html=comic_html,
-            response_text=f"Displaying XKCD #{comic_data['num']}: {comic_data['title']}",
-        )
-
-        result_data = {
-            "comic_number": comic_data.get("num"),
-            "title": comic_data.get("title"),
-            "alt": comic_data.get("alt"),
-            "img": comic_data.get("img"),
-            "date": f"{comic_data.get('year')}-{int(comic_data.get('month', 1)):02d}-{int(comic_data.get('day', 1)):02d}",
-        }
-
-        # Build embedded widget resource with updated widget
-        widget_resource = create_embedded_resource(updated_widget, mime_type)
+        if not viewer:
+            widget_html, response_text, result_data = await render_gallery(payload, progress)
+        else:
+            # One budget for the whole call: the image step only gets what the metadata step left
+            deadline = Deadline(config.REQUEST_BUDGET)
+            comic_number, direction = await choose_comic(payload, session_key, deadline)
+            if deferred:
+                widget_html, response_text, result_data = await render_comic_metadata(comic_number, progress, deadline)
+            else:
+                widget_html, response_text, result_data = await render_comic(comic_number, progress, deadline)
     except Exception as e:
         # Handle errors gracefully
-        error_html = generate_error_html(str(e))
+        widget_html = generate_error_html(str(e))
+        response_text = f"Error: {str(e)}"
+        result_data = {"error": str(e)}
+        outcome = "error"
+        viewer = deferred = False
+    TOOL_RESPONSE_BYTES.observe(len(widget_html), tool=widget.identifier)
+
+    # Cache the HTML so it's available when this session requests the resource (the result embeds it anyway)
+    if session_key is not None:
+        cancel_hydration(session_key, widget.template_uri)
+        WIDGET_HTML_CACHE.set(session_key, widget.template_uri, widget_html)
+
+    # Warm the comics this session is likely to ask for next (after the image, for metadata-first calls)
+    if viewer:
+        prefetch = remember_comic(session_key, result_data["comic_number"], direction)
+        if deferred and session_key is not None:
+            start_hydration(session_key, widget.template_uri, result_data["comic_number"], prefetch)
+        else:
+            PREFETCHER.prefetch(prefetch)
+
+    with STAGE_SECONDS.time(stage="serialize"):
+        return build_tool_result(widget, widget_html, response_text, result_data, mime_type), outcome
+
+
+def build_tool_result(
+    widget: AppWidget,
+    widget_html: str,
+    response_text: str,
+    result_data: Dict[str, Any],
+    mime_type: str,
+) -> types.ServerResult:
+    """Build a tool result that embeds the rendered widget.
 
-        # Cache the error HTML
-        WIDGET_HTML_CACHE[widget.template_uri] = error_html
+    Args:
+        widget: Widget whose tool was called
+        widget_html: Rendered widget HTML
+        response_text: Text content of the result
+        result_data: Structured content of the result
+        mime_type: MIME type for resources
 
-        updated_widget = AppWidget(
-            identifier=widget.identifier,
-            title=widget.title,
-            template_uri=widget.template_uri,
-            invoking=widget.invoking,
-            invoked=widget.invoked,
-            html=error_html,
-            response_text=f"Error: {str(e)}",
-        )
-        widget_resource = create_embedded_resource(updated_widget, mime_type)
-        result_data = {"error": str(e)}
+    Returns:
+        Server result
+    """
+    # Update widget with the new HTML
+    updated_widget = AppWidget(
+        identifier=widget.identifier,
+        title=widget.title,
+        template_uri=widget.template_uri,
+        invoking=widget.invoking,
+        invoked=widget.invoked,
+        html=widget_html,
+        response_text=response_text,
+    )
+
+    # Build embedded widget resource with updated widget
+    widget_resource = create_embedded_resource(updated_widget, mime_type)
 
     meta: Dict[str, Any] = {
         "openai.com/widget": widget_resource.model_dump(mode="json"),
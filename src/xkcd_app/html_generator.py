@@ -1,7 +1,12 @@
 """HTML generation for XKCD widget displays."""
 
 import html
-from typing import Any, Dict
+import json
+import re
+from typing import Any, Dict, Hashable, List, Tuple, Union
+
+from . import config
+from .cache import LRUCache
 
 
 PLACEHOLDER_HTML = (
@@ -28,41 +33,88 @@ PLACEHOLDER_HTML = (
 )
 
 
-def generate_comic_html(comic_data: Dict[str, Any]) -> str:
-    """Generate HTML for displaying XKCD comic.
+GALLERY_PLACEHOLDER_HTML = (
+    "<div style='max-width: 800px; margin: 0 auto; padding: 20px; font-family: Arial, sans-serif;'>"
+    "  <div style='background: white; border: 2px solid black; border-radius: 8px; "
+    "              padding: 40px; text-align: center;'>"
+    "    <h1 style='color: black; margin: 0 0 20px 0; font-size: 32px; font-weight: bold;'>XKCD Comic Gallery</h1>"
+    "    <div style='background: white; border: 2px dashed #333; border-radius: 4px; padding: 30px; margin: 20px 0;'>"
+    "      <p style='color: black; font-size: 18px; margin: 0 0 15px 0; font-weight: bold;'>"
+    "        Ready to display several XKCD comics at once!"
+    "      </p>"
+    "      <p style='color: #333; font-size: 14px; margin: 0; line-height: 1.6;'>"
+    "        Request a list or range of comics to see them side by side.<br>"
+    "        Try: '#300-#320' or '327, 1053, 2347'"
+    "      </p>"
+    "    </div>"
+    "  </div>"
+    "</div>"
+)
 
-    Args:
-        comic_data: Comic data from XKCD API
 
-    Returns:
-        HTML string with embedded comic
+class CompiledTemplate:
+    """HTML template split once into static segments and ``{name}`` placeholders.
+
+    Rendering joins the precomputed segments with the substituted values, without
+    re-parsing the template or building intermediate strings.
     """
-    # Escape HTML to prevent injection and attribute breaking
-    title = html.escape(comic_data.get('title', 'XKCD Comic'))
-    alt_text = html.escape(comic_data.get('alt', 'No alt text available'))
 
-    # Use base64 encoded image if available, otherwise fall back to URL
-    img_url = comic_data.get('img_base64', comic_data.get('img', ''))
-    img_original_url = comic_data.get('img_original', comic_data.get('img', ''))
+    def __init__(self, source: str):
+        """Compile a template.
 
-    comic_num = comic_data.get('num')
-    year = comic_data.get('year')
+        Args:
+            source: Template text with ``{name}`` placeholders
+        """
+        parts = re.split(r"\{(\w+)\}", source)
+        self._segments: Tuple[str, ...] = tuple(parts[0::2])
+        self._names: Tuple[str, ...] = tuple(parts[1::2])
+
+    def render(self, **values: Any) -> str:
+        """Render the template.
+
+        Args:
+            **values: Value for every placeholder (converted with str)
+
+        Returns:
+            Rendered text
+        """
+        pieces = [self._segments[0]]
+        for name, segment in zip(self._names, self._segments[1:]):
+            pieces.append(str(values[name]))
+            pieces.append(segment)
+        return "".join(pieces)
 
-    # XKCD API returns month and day as strings, convert to int
-    month = int(comic_data.get('month', 1))
-    day = int(comic_data.get('day', 1))
 
-    return f"""
+COMIC_TEMPLATE = CompiledTemplate("""
     <div style="max-width: 800px; margin: 0 auto; padding: 20px; font-family: Arial, sans-serif;">
         <div style="background: white; border: 2px solid black; border-radius: 8px; padding: 30px;">
             <h1 style="color: black; margin: 0 0 10px 0; font-size: 28px; font-weight: bold;">
                 #{comic_num} - {title}
             </h1>
             <p style="color: #333; margin: 0 0 20px 0; font-size: 14px;">
-                Published: {year}-{month:02d}-{day:02d}
+                Published: {date}
             </p>
 
-            <div style="background: #f5f5f5; border: 1px solid #ddd; border-radius: 4px; padding: 20px; margin-bottom: 20px; text-align: center;">
+            <div style="background: #f5f5f5; border: 1px solid #ddd; border-radius: 4px; padding: 20px; margin-bottom: 20px; text-align: center;">{image}
+            </div>
+
+            <div style="background: #f9f9f9; border-left: 4px solid black; border-radius: 4px; padding: 15px; margin-bottom: 20px;">
+                <p style="color: #333; margin: 0; font-size: 14px; line-height: 1.6;">
+                    <strong style="color: black;">Alt text:</strong> {alt_text}
+                </p>
+            </div>
+
+            <div style="margin-top: 20px; padding-top: 20px; border-top: 2px solid black; text-align: center;">
+                <p style="color: #666; margin: 0; font-size: 12px;">
+                    Comic by Randall Munroe • <a href="https://xkcd.com/{comic_num}"
+                    target="_blank" style="color: black; text-decoration: underline;">View on xkcd.com</a>
+                </p>
+            </div>
+        </div>
+    </div>
+    """)
+
+IMAGE_TEMPLATE = CompiledTemplate("""
                 <img src="{img_url}"
                      alt="{alt_text}"
                      title="{alt_text}"
@@ -71,24 +123,232 @@ def generate_comic_html(comic_data: Dict[str, Any]) -> str:
                      onerror="this.style.display='none'; this.nextElementSibling.style.display='block';">
                 <div style="display: none; padding: 20px; color: #ff4444;">
                     Failed to load image. <a href="{img_original_url}" target="_blank" style="color: #ff4444;">View original</a>
-                </div>
-            </div>
+                </div>{full_size_link}""")
 
-            <div style="background: #f9f9f9; border-left: 4px solid black; border-radius: 4px; padding: 15px; margin-bottom: 20px;">
-                <p style="color: #333; margin: 0; font-size: 14px; line-height: 1.6;">
-                    <strong style="color: black;">Alt text:</strong> {alt_text}
+# Scrollable viewer for giant comics that only requests the pyramid tiles in view
+TILED_IMAGE_TEMPLATE = CompiledTemplate("""
+                <div id="xkcd-tiles-{comic_num}" title="{alt_text}" data-tiles="{tiles_url}" data-pyramid="{pyramid}"
+                     style="position: relative; height: 600px; overflow: auto; background: white; border: 1px solid #ccc; text-align: left;">
+                    <div style="position: relative;"></div>
+                </div>
+                <p style="margin: 10px 0 0 0; font-size: 12px;">
+                    <button type="button" data-zoom="-1">Zoom in</button>
+                    <button type="button" data-zoom="1">Zoom out</button>
+                    <a href="{img_original_url}" target="_blank" style="color: black; text-decoration: underline;">View full size</a>
                 </p>
-            </div>
+                <script>
+                (function () {
+                    var viewer = document.getElementById("xkcd-tiles-{comic_num}");
+                    var canvas = viewer.firstElementChild;
+                    var pyramid = JSON.parse(viewer.getAttribute("data-pyramid"));
+                    var base = viewer.getAttribute("data-tiles");
+                    var size = pyramid.tile_size;
+                    var level = pyramid.levels.length - 1;
+                    while (level > 0 && pyramid.levels[level - 1].width <= viewer.clientWidth) level--;
+                    var loaded = new Set();
+                    var pending = false;
+
+                    function show() {
+                        pending = false;
+                        var info = pyramid.levels[level];
+                        var firstCol = Math.floor(viewer.scrollLeft / size);
+                        var lastCol = Math.min(info.cols - 1, Math.floor((viewer.scrollLeft + viewer.clientWidth) / size));
+                        var firstRow = Math.floor(viewer.scrollTop / size);
+                        var lastRow = Math.min(info.rows - 1, Math.floor((viewer.scrollTop + viewer.clientHeight) / size));
+                        for (var col = firstCol; col <= lastCol; col++) {
+                            for (var row = firstRow; row <= lastRow; row++) {
+                                var key = level + "/" + col + "_" + row;
+                                if (loaded.has(key)) continue;
+                                loaded.add(key);
+                                var tile = document.createElement("img");
+                                tile.src = base + "/" + key;
+                                tile.alt = "";
+                                tile.style.cssText = "position: absolute; display: block; left: " + col * size + "px; top: " + row * size + "px;";
+                                canvas.appendChild(tile);
+                            }
+                        }
+                    }
+
+                    function schedule() {
+                        if (!pending) {
+                            pending = true;
+                            requestAnimationFrame(show);
+                        }
+                    }
+
+                    function zoomTo(next) {
+                        if (next < 0 || next >= pyramid.levels.length || next === level) return;
+                        var scale = pyramid.levels[next].width / pyramid.levels[level].width;
+                        var centerX = (viewer.scrollLeft + viewer.clientWidth / 2) * scale;
+                        var centerY = (viewer.scrollTop + viewer.clientHeight / 2) * scale;
+                        level = next;
+                        loaded.clear();
+                        canvas.textContent = "";
+                        canvas.style.width = pyramid.levels[level].width + "px";
+                        canvas.style.height = pyramid.levels[level].height + "px";
+                        viewer.scrollLeft = centerX - viewer.clientWidth / 2;
+                        viewer.scrollTop = centerY - viewer.clientHeight / 2;
+                        schedule();
+                    }
+
+                    canvas.style.width = pyramid.levels[level].width + "px";
+                    canvas.style.height = pyramid.levels[level].height + "px";
+                    viewer.addEventListener("scroll", schedule);
+                    window.addEventListener("resize", schedule);
+                    viewer.parentNode.querySelectorAll("button[data-zoom]").forEach(function (button) {
+                        button.addEventListener("click", function () {
+                            zoomTo(level + Number(button.getAttribute("data-zoom")));
+                        });
+                    });
+                    show();
+                })();
+                </script>""")
+
+FULL_SIZE_LINK_TEMPLATE = CompiledTemplate("""
+                <p style="margin: 10px 0 0 0; font-size: 12px;">
+                    Showing a reduced image. <a href="{img_original_url}" target="_blank" style="color: black; text-decoration: underline;">View full size</a>
+                </p>""")
 
+ERROR_TEMPLATE = CompiledTemplate("""
+    <div style="padding: 20px; border: 2px solid #ff4444; border-radius: 8px; background: #fff0f0;">
+        <h2 style="color: #ff4444; margin-top: 0;">Error Fetching Comic</h2>
+        <p style="color: #333;">{error_message}</p>
+    </div>
+    """)
+
+GALLERY_TEMPLATE = CompiledTemplate("""
+    <div style="max-width: 800px; margin: 0 auto; padding: 20px; font-family: Arial, sans-serif;">
+        <div style="background: white; border: 2px solid black; border-radius: 8px; padding: 30px;">
+            <h1 style="color: black; margin: 0 0 20px 0; font-size: 28px; font-weight: bold;">
+                XKCD Gallery ({count} comics)
+            </h1>
+            <div style="display: grid; grid-template-columns: repeat(auto-fill, minmax(180px, 1fr)); gap: 15px;">
+                {cards}
+            </div>
             <div style="margin-top: 20px; padding-top: 20px; border-top: 2px solid black; text-align: center;">
                 <p style="color: #666; margin: 0; font-size: 12px;">
-                    Comic by Randall Munroe • <a href="https://xkcd.com/{comic_num}"
-                    target="_blank" style="color: black; text-decoration: underline;">View on xkcd.com</a>
+                    Comics by Randall Munroe • Powered by XKCD API
                 </p>
             </div>
         </div>
     </div>
+    """)
+
+GALLERY_CARD_TEMPLATE = CompiledTemplate("""
+            <div style="border: 1px solid #ccc; border-radius: 4px; padding: 10px; background: #f9f9f9; text-align: center;">
+                <a href="https://xkcd.com/{comic_num}" target="_blank" style="color: black; text-decoration: none;">
+                    <img src="{img_url}"
+                         alt="{alt_text}"
+                         title="{alt_text}"
+                         style="max-width: 100%; max-height: 150px; object-fit: contain; display: block; margin: 0 auto 8px auto;"
+                         loading="lazy">
+                    <span style="font-size: 13px; font-weight: bold;">#{comic_num} - {title}</span>
+                </a>
+            </div>""")
+
+GALLERY_ERROR_CARD_TEMPLATE = CompiledTemplate("""
+            <div style="border: 2px solid #ff4444; border-radius: 4px; padding: 10px; background: #fff0f0;">
+                <p style="color: #ff4444; margin: 0; font-size: 13px; font-weight: bold;">#{comic_num} unavailable</p>
+                <p style="color: #333; margin: 5px 0 0 0; font-size: 12px;">{error_message}</p>
+            </div>""")
+
+# Rendered comic pages and gallery cards, keyed by (kind, comic number, render mode)
+HTML_CACHE = LRUCache(max_bytes=config.HTML_CACHE_BYTES)
+
+# Interned error pages, keyed by error message
+ERROR_HTML_CACHE = LRUCache(max_entries=256)
+
+
+def image_src(comic_data: Dict[str, Any]) -> str:
+    """Pick the image source for a comic: a served reference, a data URI or the upstream URL."""
+    return comic_data.get('img_src') or comic_data.get('img_base64') or comic_data.get('img', '')
+
+
+def render_mode(comic_data: Dict[str, Any]) -> str:
+    """Classify how a comic's image is delivered, which determines its rendered HTML.
+
+    Returns:
+        ``tiled`` for a tile pyramid, ``reference`` for the /img route, ``inline`` for a
+        data URI or ``url`` for the upstream URL, suffixed with the image variant when one is used
     """
+    if comic_data.get('img_tiles'):
+        return "tiled"
+    variant = comic_data.get('img_variant', 'original')
+    if comic_data.get('img_src'):
+        return f"reference:{variant}"
+    if str(comic_data.get('img_base64', '')).startswith("data:"):
+        return f"inline:{variant}"
+    return "url"
+
+
+def _memoized(key: Hashable, render) -> str:
+    """Return cached HTML for a key, rendering and caching it on a miss."""
+    rendered = HTML_CACHE.get(key)
+    if rendered is None:
+        rendered = render()
+        HTML_CACHE.set(key, rendered)
+    return rendered
+
+
+def generate_comic_html(comic_data: Dict[str, Any]) -> str:
+    """Generate HTML for displaying XKCD comic.
+
+    Comics never change, so the output is memoized per comic number and render mode.
+
+    Args:
+        comic_data: Comic data from XKCD API
+
+    Returns:
+        HTML string with embedded comic
+    """
+    key = ("comic", comic_data.get('num'), render_mode(comic_data))
+    return _memoized(key, lambda: _render_comic_html(comic_data))
+
+
+def _render_comic_html(comic_data: Dict[str, Any]) -> str:
+    """Render the comic page template without memoization."""
+    # Escape HTML to prevent injection and attribute breaking
+    title = html.escape(comic_data.get('title', 'XKCD Comic'))
+    alt_text = html.escape(comic_data.get('alt', 'No alt text available'))
+
+    # Use the served or base64 encoded image if available, otherwise fall back to URL
+    img_url = image_src(comic_data)
+    img_original_url = comic_data.get('img_original', comic_data.get('img', ''))
+
+    tiles = comic_data.get('img_tiles')
+    if tiles:
+        # Giant comics load only the visible tiles of their pyramid
+        pyramid = {"tile_size": tiles["tile_size"], "levels": tiles["levels"]}
+        image = TILED_IMAGE_TEMPLATE.render(
+            comic_num=comic_data.get('num'),
+            alt_text=alt_text,
+            tiles_url=html.escape(tiles["url"]),
+            pyramid=html.escape(json.dumps(pyramid, separators=(",", ":"))),
+            img_original_url=img_original_url,
+        )
+    else:
+        # Link to the full image when a downsized variant is displayed
+        full_size_link = ""
+        if comic_data.get('img_variant', 'original') != 'original':
+            full_size_link = FULL_SIZE_LINK_TEMPLATE.render(img_original_url=img_original_url)
+        image = IMAGE_TEMPLATE.render(
+            img_url=img_url,
+            alt_text=alt_text,
+            img_original_url=img_original_url,
+            full_size_link=full_size_link,
+        )
+
+    # XKCD API returns month and day as strings, convert to int
+    month = int(comic_data.get('month', 1))
+    day = int(comic_data.get('day', 1))
+
+    return COMIC_TEMPLATE.render(
+        comic_num=comic_data.get('num'),
+        title=title,
+        date=f"{comic_data.get('year')}-{month:02d}-{day:02d}",
+        image=image,
+        alt_text=alt_text,
+    )
 
 
 def generate_error_html(error_message: str) -> str:
@@ -100,9 +360,40 @@ def generate_error_html(error_message: str) -> str:
     Returns:
         HTML string with error message
     """
-    return f"""
-    <div style="padding: 20px; border: 2px solid #ff4444; border-radius: 8px; background: #fff0f0;">
-        <h2 style="color: #ff4444; margin-top: 0;">Error Fetching Comic</h2>
-        <p style="color: #333;">{html.escape(error_message)}</p>
-    </div>
+    rendered = ERROR_HTML_CACHE.get(error_message)
+    if rendered is None:
+        rendered = ERROR_TEMPLATE.render(error_message=html.escape(error_message))
+        ERROR_HTML_CACHE.set(error_message, rendered)
+    return rendered
+
+
+def generate_gallery_html(comics: List[Union[Dict[str, Any], Exception]], comic_numbers: List[int]) -> str:
+    """Generate HTML for a gallery of XKCD comic thumbnails.
+
+    Each comic's card is memoized, so galleries sharing comics only render new cards.
+
+    Args:
+        comics: Comic data (or the error raised while fetching it) for each comic
+        comic_numbers: Requested comic numbers, in the same order as comics
+
+    Returns:
+        HTML string with one thumbnail card per comic
     """
+    cards = []
+    for comic_num, comic_data in zip(comic_numbers, comics):
+        if isinstance(comic_data, Exception):
+            cards.append(GALLERY_ERROR_CARD_TEMPLATE.render(
+                comic_num=comic_num,
+                error_message=html.escape(str(comic_data)),
+            ))
+            continue
+
+        key = ("card", comic_num, render_mode(comic_data))
+        cards.append(_memoized(key, lambda: GALLERY_CARD_TEMPLATE.render(
+            comic_num=comic_num,
+            title=html.escape(comic_data.get('title', 'XKCD Comic')),
+            alt_text=html.escape(comic_data.get('alt', '')),
+            img_url=image_src(comic_data),
+        )))
+
+    return GALLERY_TEMPLATE.render(count=len(comic_numbers), cards="".join(cards))
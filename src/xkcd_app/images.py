@@ -0,0 +1,152 @@
+"""Image variant processing for oversized comics.
+
+Variants and tile pyramids are produced with Pillow, which is an optional dependency
+(``pip install pillow``). Without it every variant falls back to the original image
+and no comic is tiled.
+"""
+
+import importlib.util
+import math
+from io import BytesIO
+from typing import Any, Dict, Optional, Tuple
+
+from . import config
+
+
+ORIGINAL = "original"
+
+# Maximum width of each resized variant, in pixels
+VARIANT_WIDTHS = {
+    "capped": config.IMAGE_MAX_WIDTH,
+    "thumb": config.THUMBNAIL_WIDTH,
+}
+
+
+def variants_available() -> bool:
+    """Check whether Pillow is installed so resized variants can be produced."""
+    return importlib.util.find_spec("PIL") is not None
+
+
+def data_uri_length(content_length: int, mime_type: str) -> int:
+    """Compute the length of the base64 data URI for an image without encoding it.
+
+    Args:
+        content_length: Size of the raw image in bytes
+        mime_type: Image MIME type
+
+    Returns:
+        Length of ``data:<mime>;base64,<payload>``
+    """
+    return len(f"data:{mime_type};base64,") + 4 * ((content_length + 2) // 3)
+
+
+def resize_image(content: bytes, mime_type: str, max_width: int) -> Optional[Tuple[bytes, str]]:
+    """Produce a width-capped, re-encoded rendition of an image.
+
+    Args:
+        content: Original image bytes
+        mime_type: Original image MIME type
+        max_width: Maximum width of the rendition in pixels
+
+    Returns:
+        Tuple of (image bytes, MIME type), or None if the original is already
+        narrow enough, animated, undecodable, or no larger than the rendition would be
+    """
+    if not variants_available():
+        return None
+
+    from PIL import Image
+
+    try:
+        with Image.open(BytesIO(content)) as image:
+            if image.width <= max_width or getattr(image, "is_animated", False):
+                return None
+            height = max(1, round(image.height * max_width / image.width))
+            if image.mode not in ("1", "L", "RGB", "RGBA"):
+                image = image.convert("RGBA")
+            resized = image.resize((max_width, height), Image.LANCZOS)
+    except (OSError, Image.DecompressionBombError):
+        # Undecodable images, and images too large for Pillow to open safely, are served as they are
+        return None
+
+    rendition, mime_type = _encode(resized, mime_type)
+    if len(rendition) >= len(content):
+        return None
+    return rendition, mime_type
+
+
+def _encode(image, mime_type: str) -> Tuple[bytes, str]:
+    """Encode a Pillow image as JPEG for JPEG sources and as a compact PNG otherwise."""
+    output = BytesIO()
+    if mime_type == "image/jpeg":
+        image.convert("RGB").save(output, "JPEG", quality=85, optimize=True)
+        return output.getvalue(), mime_type
+
+    # xkcd line art compresses best as a palette PNG
+    if image.mode == "RGBA" and image.getextrema()[3][0] == 255:
+        image = image.convert("RGB")
+    if image.mode == "RGB":
+        image = image.quantize(colors=256)
+    image.save(output, "PNG", optimize=True)
+    return output.getvalue(), "image/png"
+
+
+def build_tile_pyramid(
+    content: bytes,
+    mime_type: str,
+    tile_size: int,
+    min_size: int,
+) -> Optional[Tuple[Dict[str, Any], Dict[Tuple[int, int, int], bytes]]]:
+    """Slice an oversized image into a pyramid of fixed-size tiles.
+
+    Level 0 is the full-resolution image; each following level halves both
+    dimensions, down to a level that fits in a single tile.
+
+    Args:
+        content: Original image bytes
+        mime_type: Original image MIME type
+        tile_size: Width and height of each tile in pixels
+        min_size: Only images whose longest side exceeds this are tiled
+
+    Returns:
+        Tuple of (manifest, tile bytes keyed by (level, column, row)), or None if
+        Pillow is missing or the image is small enough, animated or undecodable
+    """
+    if not variants_available():
+        return None
+
+    from PIL import Image
+
+    try:
+        with Image.open(BytesIO(content)) as image:
+            if max(image.size) <= min_size or getattr(image, "is_animated", False):
+                return None
+            level_image = image.convert("RGBA") if image.mode not in ("1", "L", "RGB", "RGBA") else image.copy()
+    except (OSError, Image.DecompressionBombError):
+        # Undecodable images, and images too large for Pillow to open safely, stay untiled
+        return None
+
+    levels = []
+    tiles: Dict[Tuple[int, int, int], bytes] = {}
+    tile_mime_type = mime_type
+    while True:
+        width, height = level_image.size
+        cols, rows = math.ceil(width / tile_size), math.ceil(height / tile_size)
+        for col in range(cols):
+            for row in range(rows):
+                left, top = col * tile_size, row * tile_size
+                box = (left, top, min(width, left + tile_size), min(height, top + tile_size))
+                tiles[len(levels), col, row], tile_mime_type = _encode(level_image.crop(box), mime_type)
+        levels.append({"width": width, "height": height, "cols": cols, "rows": rows})
+        if cols == 1 and rows == 1:
+            break
+        level_image = level_image.resize((max(1, math.ceil(width / 2)), max(1, math.ceil(height / 2))), Image.LANCZOS)
+
+    manifest = {
+        "width": levels[0]["width"],
+        "height": levels[0]["height"],
+        "tile_size": tile_size,
+        "mime_type": tile_mime_type,
+        "levels": levels,
+    }
+    return manifest, tiles
@@ -0,0 +1,361 @@
+"""Prometheus-style metrics for the XKCD ChatGPT App.
+
+A small dependency-free implementation of counters, gauges and histograms that
+renders the Prometheus text exposition format served by ``/metrics``.
+"""
+
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+
+# Latency buckets in seconds, from cache hits to slow upstream downloads
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Size buckets in bytes, from error pages to inlined multi-megabyte images
+SIZE_BUCKETS = (1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216)
+
+LabelValues = Tuple[str, ...]
+
+
+def _escape(value: str) -> str:
+    """Escape a label value for the text exposition format."""
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: Optional[Tuple[str, str]] = None) -> str:
+    """Format a label set as ``{name="value",...}`` (empty when there are no labels)."""
+    pairs = list(zip(names, values))
+    if extra is not None:
+        pairs.append(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(str(value))}"' for name, value in pairs) + "}"
+
+
+def _format_value(value: float) -> str:
+    """Format a sample value, using integers where exact."""
+    if value == float("inf"):
+        return "+Inf"
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+class Metric:
+    """Base class of a named metric family with a fixed set of label names."""
+
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        """Create a metric family.
+
+        Args:
+            name: Metric name
+            documentation: HELP text
+            labelnames: Names of the labels every sample carries
+        """
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+
+    def _key(self, labels: Dict[str, Any]) -> LabelValues:
+        """Turn keyword labels into an ordered tuple of label values."""
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def samples(self) -> Iterator[str]:
+        """Yield exposition lines for every sample."""
+        raise NotImplementedError
+
+    def render(self) -> str:
+        """Render the family with its HELP and TYPE lines."""
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        lines.extend(self.samples())
+        return "\n".join(lines)
+
+    def clear(self) -> None:
+        """Drop every sample."""
+        raise NotImplementedError
+
+
+class Counter(Metric):
+    """Monotonically increasing count."""
+
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, amount: float = 1.0, **labels: Any) -> None:
+        """Increase the count for a label set."""
+        key = self._key(labels)
+        self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels: Any) -> float:
+        """Get the current count for a label set."""
+        return self._values.get(self._key(labels), 0.0)
+
+    def samples(self) -> Iterator[str]:
+        for key, value in sorted(self._values.items()):
+            yield f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"
+
+    def clear(self) -> None:
+        self._values.clear()
+
+
+class Gauge(Counter):
+    """Value that can go up and down."""
+
+    kind = "gauge"
+
+    def dec(self, amount: float = 1.0, **labels: Any) -> None:
+        """Decrease the value for a label set."""
+        self.inc(-amount, **labels)
+
+    def set(self, value: float, **labels: Any) -> None:
+        """Set the value for a label set."""
+        self._values[self._key(labels)] = value
+
+    @contextmanager
+    def track_inprogress(self, **labels: Any) -> Iterator[None]:
+        """Count a block as in progress while it runs."""
+        self.inc(**labels)
+        try:
+            yield
+        finally:
+            self.dec(**labels)
+
+
+class Histogram(Metric):
+    """Distribution of observations over fixed cumulative buckets."""
+
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = LATENCY_BUCKETS,
+    ):
+        """Create a histogram family.
+
+        Args:
+            name: Metric name
+            documentation: HELP text
+            labelnames: Names of the labels every sample carries
+            buckets: Upper bounds of the buckets, in increasing order
+        """
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(buckets)
+        # Per label set: (per-bucket counts including +Inf, sum, count)
+        self._series: Dict[LabelValues, List[Any]] = {}
+
+    def observe(self, value: float, **labels: Any) -> None:
+        """Record one observation."""
+        key = self._key(labels)
+        series = self._series.get(key)
+        if series is None:
+            series = self._series[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+        counts = series[0]
+        for index, bound in enumerate(self.buckets):
+            if value <= bound:
+                counts[index] += 1
+                break
+        else:
+            counts[-1] += 1
+        series[1] += value
+        series[2] += 1
+
+    @contextmanager
+    def time(self, **labels: Any) -> Iterator[None]:
+        """Observe the wall-clock duration of a block, in seconds."""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def count(self, **labels: Any) -> int:
+        """Get the number of observations for a label set."""
+        series = self._series.get(self._key(labels))
+        return series[2] if series is not None else 0
+
+    def samples(self) -> Iterator[str]:
+        for key, (counts, total, count) in sorted(self._series.items()):
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += bucket_count
+                labels = _format_labels(self.labelnames, key, ("le", _format_value(bound)))
+                yield f"{self.name}_bucket{labels} {cumulative}"
+            labels = _format_labels(self.labelnames, key)
+            yield f"{self.name}_sum{labels} {_format_value(total)}"
+            yield f"{self.name}_count{labels} {count}"
+
+    def clear(self) -> None:
+        self._series.clear()
+
+
+# Stages of serving a comic: validation, upstream_json, upstream_image, encode, render, serialize
+STAGE_SECONDS = Histogram(
+    "xkcd_stage_seconds",
+    "Time spent in each stage of serving a comic",
+    ("stage",),
+)
+
+TOOL_CALL_SECONDS = Histogram(
+    "xkcd_tool_call_seconds",
+    "End-to-end tool call latency",
+    ("tool", "outcome"),
+)
+
+TOOL_RESPONSE_BYTES = Histogram(
+    "xkcd_tool_response_bytes",
+    "Size of the widget HTML returned by a tool call",
+    ("tool",),
+    buckets=SIZE_BUCKETS,
+)
+
+TOOL_CALLS_IN_FLIGHT = Gauge(
+    "xkcd_tool_calls_in_flight",
+    "Tool calls currently being handled",
+    ("tool",),
+)
+
+HTTP_REQUESTS_IN_FLIGHT = Gauge(
+    "xkcd_http_requests_in_flight",
+    "HTTP requests currently being handled",
+    ("route",),
+)
+
+HTTP_RESPONSE_BYTES = Histogram(
+    "xkcd_http_response_bytes",
+    "Size of HTTP response bodies",
+    ("route",),
+    buckets=SIZE_BUCKETS,
+)
+
+UPSTREAM_ERRORS = Counter(
+    "xkcd_upstream_errors_total",
+    "Failed requests to xkcd.com and its image CDN",
+    ("kind", "reason"),
+)
+
+STALE_RESPONSES = Counter(
+    "xkcd_stale_responses_total",
+    "Latest-comic lookups answered with a stale copy because upstream was slow or failing",
+)
+
+HEDGED_REQUESTS = Counter(
+    "xkcd_hedged_requests_total",
+    "Upstream requests that passed the hedging threshold, by whether the hedge won, lost or was denied by the retry budget",
+    ("kind", "result"),
+)
+
+STARTUP_SECONDS = Gauge(
+    "xkcd_startup_seconds",
+    "Duration of each cold-start phase: imports, app, snapshot, ready",
+    ("phase",),
+)
+
+ALL_METRICS: List[Metric] = [
+    STAGE_SECONDS,
+    TOOL_CALL_SECONDS,
+    TOOL_RESPONSE_BYTES,
+    TOOL_CALLS_IN_FLIGHT,
+    HTTP_REQUESTS_IN_FLIGHT,
+    HTTP_RESPONSE_BYTES,
+    UPSTREAM_ERRORS,
+    STALE_RESPONSES,
+    HEDGED_REQUESTS,
+    STARTUP_SECONDS,
+]
+
+
+def record_upstream_error(kind: str, exc: BaseException) -> None:
+    """Count a failed upstream request by HTTP status or exception type.
+
+    Args:
+        kind: ``json`` for comic metadata, ``image`` for image downloads
+        exc: Raised exception
+    """
+    response = getattr(exc, "response", None)
+    reason = str(response.status_code) if response is not None else type(exc).__name__
+    UPSTREAM_ERRORS.inc(kind=kind, reason=reason)
+
+
+def route_label(path: str) -> str:
+    """Collapse a request path to its first segment so labels stay low-cardinality."""
+    return "/" + path.lstrip("/").split("/", 1)[0]
+
+
+class MetricsMiddleware:
+    """ASGI middleware counting in-flight HTTP requests and response body sizes per route."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        route = route_label(scope["path"])
+        size = 0
+
+        async def counting_send(message):
+            nonlocal size
+            if message["type"] == "http.response.body":
+                size += len(message.get("body", b""))
+            await send(message)
+
+        with HTTP_REQUESTS_IN_FLIGHT.track_inprogress(route=route):
+            try:
+                await self.app(scope, receive, counting_send)
+            finally:
+                HTTP_RESPONSE_BYTES.observe(size, route=route)
+
+
+def render_cache_metrics(caches: Dict[str, Optional[Dict[str, Any]]]) -> str:
+    """Render cache counters as gauges, one series per cache and counter.
+
+    Args:
+        caches: Counter dictionaries (``hits``, ``misses``, ``hit_ratio``, ...) keyed by cache name
+
+    Returns:
+        Exposition text
+    """
+    families: Dict[str, List[str]] = {}
+    for cache_name, counters in caches.items():
+        for field, value in (counters or {}).items():
+            if isinstance(value, (int, float)) and not isinstance(value, bool):
+                line = f"xkcd_cache_{field}{_format_labels(('cache',), (cache_name,))} {_format_value(value)}"
+                families.setdefault(field, []).append(line)
+    lines = []
+    for field, samples in families.items():
+        lines.append(f"# HELP xkcd_cache_{field} Cache {field.replace('_', ' ')} per cache")
+        lines.append(f"# TYPE xkcd_cache_{field} gauge")
+        lines.extend(samples)
+    return "\n".join(lines)
+
+
+def render_metrics(caches: Optional[Dict[str, Optional[Dict[str, Any]]]] = None) -> str:
+    """Render every metric family in the Prometheus text format.
+
+    Args:
+        caches: Optional cache counters to include (see ``render_cache_metrics``)
+
+    Returns:
+        Exposition text ending with a newline
+    """
+    parts = [metric.render() for metric in ALL_METRICS]
+    if caches:
+        parts.append(render_cache_metrics(caches))
+    return "\n".join(parts) + "\n"
+
+
+def reset_metrics() -> None:
+    """Drop every recorded sample."""
+    for metric in ALL_METRICS:
+        metric.clear()
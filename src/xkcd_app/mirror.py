@@ -0,0 +1,146 @@
+"""Resumable bulk mirror of the XKCD archive into the local comic store.
+
+Run ``python -m src.xkcd_app.mirror`` to sync every comic's metadata and image
+into the SQLite store that ``fetch_xkcd_comic`` reads before going upstream.
+Comics already in the store are skipped, so an interrupted run resumes where it
+stopped and later runs only download newly published comics.
+"""
+
+import argparse
+import asyncio
+import logging
+from dataclasses import dataclass, field
+from typing import List, Optional
+
+import httpx
+
+from . import config
+from .store import close_comic_store, get_comic_store, open_comic_store
+from .xkcd_client import (
+    close_http_client,
+    get_comic_metadata,
+    get_image_bytes,
+    open_http_client,
+    refresh_latest_comic,
+)
+
+
+logger = logging.getLogger(__name__)
+
+# Meta-table key recording comic numbers that do not exist upstream (e.g. #404)
+MISSING_KEY = "mirror_missing"
+
+
+@dataclass
+class MirrorResult:
+    """Summary of a mirror run."""
+    latest: int
+    fetched: int = 0
+    skipped: int = 0
+    missing: List[int] = field(default_factory=list)
+    failed: List[int] = field(default_factory=list)
+
+
+async def mirror_archive(
+    concurrency: int = config.MIRROR_CONCURRENCY,
+    include_images: bool = True,
+    latest: Optional[int] = None,
+) -> MirrorResult:
+    """Sync every comic up to the latest one into the shared comic store.
+
+    Args:
+        concurrency: Maximum number of comics downloaded at once
+        include_images: Whether to mirror image bytes as well as metadata
+        latest: Highest comic number to mirror, or None to ask upstream
+
+    Returns:
+        Summary of fetched, skipped, missing and failed comics
+    """
+    store = get_comic_store()
+    if store is None:
+        raise RuntimeError("The comic store is disabled; set XKCD_CACHE_DIR to mirror the archive")
+
+    stored = store.comic_numbers()
+    if latest is None:
+        latest = (await refresh_latest_comic())["num"]
+
+    result = MirrorResult(latest=latest)
+    known_missing = set((store.get_meta(MISSING_KEY) or {}).get("numbers", []))
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def mirror_one(comic_number: int) -> None:
+        async with semaphore:
+            try:
+                was_stored = comic_number in stored
+                comic_data = await get_comic_metadata(comic_number)
+                img_url = comic_data.get("img", "")
+                needs_image = include_images and img_url and not store.has_image(img_url)
+                if needs_image:
+                    await get_image_bytes(img_url)
+                if was_stored and not needs_image:
+                    result.skipped += 1
+                else:
+                    result.fetched += 1
+            except httpx.HTTPStatusError as exc:
+                if exc.response.status_code == 404:
+                    result.missing.append(comic_number)
+                else:
+                    logger.warning("Failed to mirror XKCD #%s: %s", comic_number, exc)
+                    result.failed.append(comic_number)
+            except Exception as exc:
+                logger.warning("Failed to mirror XKCD #%s: %s", comic_number, exc)
+                result.failed.append(comic_number)
+
+    pending = [num for num in range(1, latest + 1) if num not in known_missing]
+    await asyncio.gather(*(mirror_one(num) for num in pending))
+
+    result.skipped += len(known_missing & set(range(1, latest + 1)))
+    if result.missing:
+        store.set_meta(MISSING_KEY, {"numbers": sorted(known_missing | set(result.missing))})
+    result.missing.sort()
+    result.failed.sort()
+    return result
+
+
+async def _run(args: argparse.Namespace) -> MirrorResult:
+    """Open the store and HTTP client, run the mirror and close both."""
+    open_comic_store(args.db)
+    await open_http_client()
+    try:
+        return await mirror_archive(
+            concurrency=args.concurrency,
+            include_images=not args.no_images,
+            latest=args.latest,
+        )
+    finally:
+        await close_http_client()
+        close_comic_store()
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Command-line entry point for mirroring the archive.
+
+    Args:
+        argv: Command-line arguments, defaulting to sys.argv
+
+    Returns:
+        Process exit code (non-zero if any comic failed)
+    """
+    parser = argparse.ArgumentParser(description="Mirror the XKCD archive into the local comic store")
+    parser.add_argument("--db", default=None, help="SQLite store path (default: $XKCD_CACHE_DIR/xkcd.sqlite3)")
+    parser.add_argument("--concurrency", type=int, default=config.MIRROR_CONCURRENCY, help="Parallel downloads")
+    parser.add_argument("--latest", type=int, default=None, help="Highest comic number to mirror")
+    parser.add_argument("--no-images", action="store_true", help="Mirror metadata only")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(levelname)s %(message)s")
+    result = asyncio.run(_run(args))
+    print(
+        f"Mirrored up to #{result.latest}: {result.fetched} fetched, {result.skipped} already stored, "
+        f"{len(result.missing)} missing upstream, {len(result.failed)} failed"
+    )
+    return 1 if result.failed else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -1,7 +1,7 @@
 """Data models for the XKCD ChatGPT App."""
 
 from dataclasses import dataclass
-from typing import Any, Dict, Optional
+from typing import Any, Dict, Literal, Optional
 
 from pydantic import BaseModel, ConfigDict, Field
 
@@ -33,6 +33,11 @@ class ToolInput(BaseModel):
         description="Specific XKCD comic number to fetch (optional)",
     )
 
+    navigate: Optional[Literal["next", "previous", "random"]] = Field(
+        None,
+        description="Step from the comic shown last in this conversation, or from comicNumber if given (optional)",
+    )
+
     options: Dict[str, Any] = Field(
         default_factory=dict,
         description="Optional parameters",
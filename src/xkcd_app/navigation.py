@@ -0,0 +1,321 @@
+"""Prev/next/random navigation from the comic each session saw last, with neighbour prefetching.
+
+Browsing is mostly sequential, so once the viewer shows comic N its neighbours
+N+1 and N-1 are fetched and rendered in the background. After a random step the
+session's next random comic is picked in advance and prefetched too. Speculative
+work is bounded. At most ``XKCD_PREFETCH_CONCURRENCY`` prefetches run at once, and
+none start while ``XKCD_PREFETCH_BYTES`` of prefetched widgets are still unshown.
+"""
+
+import asyncio
+import logging
+import random
+import re
+import time
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+from . import config
+from .cache import CacheStats, LRUCache
+from .html_generator import generate_comic_html
+from .resilience import Deadline
+from .xkcd_client import fetch_xkcd_comic, known_latest_number, load_comic_metadata
+
+
+logger = logging.getLogger(__name__)
+
+# Navigation directions accepted by the viewer tool
+NEXT = "next"
+PREVIOUS = "previous"
+RANDOM = "random"
+DIRECTIONS = (NEXT, PREVIOUS, RANDOM)
+
+# Comic numbers that were never published (https://xkcd.com/404/ is a real 404)
+MISSING_COMICS = frozenset({404})
+
+# Whole queries that ask for a step instead of a comic ("next", "previous one", "show me a random comic")
+NAVIGATION_PATTERN = re.compile(
+    r"(?:(?:show|give|get)\s+(?:me\s+)?)?(?:the\s+|a\s+|another\s+)?"
+    r"(next|previous|prev|back|random)(?:\s+(?:one|comic|xkcd))?\s*[.!?]*",
+    re.IGNORECASE,
+)
+
+_DIRECTION_ALIASES = {"prev": PREVIOUS, "back": PREVIOUS}
+
+# Navigation state per session ({"last": comic shown last, "random": next random pick}), keyed by session key
+SESSION_NAVIGATION = LRUCache(max_entries=config.NAVIGATION_SESSIONS)
+
+
+def parse_navigation(text: str) -> Optional[str]:
+    """Recognize a query that is only a navigation step.
+
+    Queries that merely mention a direction ("the one about random numbers") are
+    left to the search index.
+
+    Args:
+        text: User query
+
+    Returns:
+        NEXT, PREVIOUS or RANDOM, or None if the query is not a navigation step
+    """
+    match = NAVIGATION_PATTERN.fullmatch(text.strip())
+    if match is None:
+        return None
+    word = match.group(1).lower()
+    return _DIRECTION_ALIASES.get(word, word)
+
+
+def step_comic(comic_number: int, direction: str, latest: Optional[int]) -> int:
+    """Get the comic one step before or after another, skipping unpublished numbers.
+
+    Args:
+        comic_number: Comic to step from
+        direction: NEXT or PREVIOUS
+        latest: Number of the latest comic, or None if unknown
+
+    Returns:
+        Neighbouring comic number
+
+    Raises:
+        ValueError: If the step would leave the archive
+    """
+    step = 1 if direction == NEXT else -1
+    target = comic_number + step
+    while target in MISSING_COMICS:
+        target += step
+    if target < 1:
+        raise ValueError("XKCD #1 is the first comic; there is no previous one.")
+    if latest is not None and target > latest:
+        raise ValueError(f"XKCD #{latest} is the latest comic; there is no next one yet.")
+    return target
+
+
+def pick_random_comic(latest: int, exclude: Iterable[int] = ()) -> int:
+    """Pick a published comic uniformly at random.
+
+    Args:
+        latest: Number of the latest comic
+        exclude: Comics not to pick (e.g. the one on screen), unless nothing else is left
+
+    Returns:
+        Comic number
+    """
+    excluded = MISSING_COMICS.union(exclude)
+    while True:
+        comic_number = random.randint(1, latest)
+        if comic_number not in excluded or latest <= len(excluded):
+            return comic_number
+
+
+def neighbour_comics(comic_number: int, latest: Optional[int]) -> List[int]:
+    """Get the comics one navigation step away, the next one first."""
+    neighbours = []
+    for direction in (NEXT, PREVIOUS):
+        try:
+            neighbours.append(step_comic(comic_number, direction, latest))
+        except ValueError:
+            continue
+    return neighbours
+
+
+async def navigate(
+    session_key: Optional[str],
+    direction: str,
+    origin: Optional[int] = None,
+    deadline: Optional[Deadline] = None,
+) -> int:
+    """Work out the comic a navigation step lands on.
+
+    Steps start from ``origin`` if given, otherwise from the comic the session saw
+    last, otherwise from the latest comic (like the buttons on xkcd.com). Anonymous
+    requests have no history. The latest comic number already known is used even if
+    its TTL has passed; upstream is only asked, within the request budget, when no
+    number is known or a step would pass the known latest comic.
+
+    Args:
+        session_key: Session taking the step, or None if anonymous
+        direction: NEXT, PREVIOUS or RANDOM
+        origin: Comic to step from instead of the session's last one
+        deadline: Deadline of the tool call, for looking up the latest comic
+
+    Returns:
+        Comic number
+
+    Raises:
+        ValueError: If the step would leave the archive
+    """
+    latest = known_latest_number()
+    if latest is None:
+        latest = (await load_comic_metadata(None, deadline=deadline))["num"]
+    state = (SESSION_NAVIGATION.get(session_key) if session_key is not None else None) or {}
+    current = origin if origin is not None else state.get("last", latest)
+    if direction == RANDOM:
+        picked = state.get("random")
+        if picked is not None and picked != current:
+            return picked
+        return pick_random_comic(latest, exclude=(current,))
+    try:
+        return step_comic(current, direction, latest)
+    except ValueError:
+        if direction != NEXT:
+            raise
+        # A new comic may have been published since the latest one was looked up
+        fresh = (await load_comic_metadata(None, deadline=deadline))["num"]
+        if fresh == latest:
+            raise
+        return step_comic(current, direction, fresh)
+
+
+def remember_comic(session_key: Optional[str], comic_number: int, direction: Optional[str] = None) -> List[int]:
+    """Record the comic a session was shown and work out where it is likely to go next.
+
+    Args:
+        session_key: Session that was shown the comic, or None if anonymous (nothing is recorded)
+        comic_number: Comic shown
+        direction: Navigation step that led to it, if any
+
+    Returns:
+        Comics worth prefetching, most likely first
+    """
+    latest = known_latest_number()
+    state: Dict[str, Any] = {"last": comic_number, "random": None}
+    targets = []
+    if direction == RANDOM and latest is not None:
+        # Someone pressing "random" tends to press it again
+        state["random"] = pick_random_comic(latest, exclude=(comic_number,))
+        targets.append(state["random"])
+    if session_key is not None:
+        SESSION_NAVIGATION.set(session_key, state)
+    return targets + neighbour_comics(comic_number, latest)
+
+
+class Prefetcher:
+    """Speculative background comic fetches, bounded by concurrency and by the size of unshown results.
+
+    ``hits`` counts prefetched comics that were shown, ``misses`` counts navigation
+    steps that landed on a comic that was not prefetched, and ``evictions`` counts
+    prefetched comics that expired unshown.
+    """
+
+    def __init__(self):
+        self.stats = CacheStats()
+        self.started = 0
+        self.skipped = 0
+        self.failed = 0
+        self._tasks: Dict[int, "asyncio.Task[None]"] = {}
+        # Prefetched comics not shown yet: comic number -> (rendered widget size, expiry time)
+        self._unshown: Dict[int, Tuple[int, float]] = {}
+        # In-flight prefetches already claimed by a tool call
+        self._claimed: Set[int] = set()
+
+    @property
+    def unshown_bytes(self) -> int:
+        """Size of the prefetched widgets nobody has been shown yet."""
+        self._expire()
+        return sum(size for size, _ in self._unshown.values())
+
+    def _expire(self) -> None:
+        """Forget prefetched comics that were not shown in time."""
+        now = time.monotonic()
+        for comic_number in [num for num, (_, expires_at) in self._unshown.items() if expires_at <= now]:
+            del self._unshown[comic_number]
+            self.stats.evictions += 1
+
+    def prefetch(self, comic_numbers: Iterable[int]) -> None:
+        """Start fetching and rendering comics in the background.
+
+        Comics already prefetched or in flight are left alone. Comics over the
+        concurrency or byte budget are skipped, not queued: a late prefetch is
+        worthless.
+
+        Args:
+            comic_numbers: Comics to prefetch, most likely first
+        """
+        if not config.PREFETCH_ENABLED:
+            return
+        for comic_number in comic_numbers:
+            if comic_number in self._tasks or comic_number in self._unshown:
+                continue
+            if len(self._tasks) >= config.PREFETCH_CONCURRENCY or self.unshown_bytes >= config.PREFETCH_BYTES:
+                self.skipped += 1
+                continue
+            task = asyncio.get_running_loop().create_task(self._fetch(comic_number))
+            self._tasks[comic_number] = task
+            task.add_done_callback(lambda done, num=comic_number: self._finish(num, done))
+            self.started += 1
+
+    async def _fetch(self, comic_number: int) -> None:
+        """Fetch and render one comic into the shared caches."""
+        html = generate_comic_html(await fetch_xkcd_comic(comic_number))
+        if comic_number in self._claimed:
+            self._claimed.discard(comic_number)
+        else:
+            self._unshown[comic_number] = (len(html), time.monotonic() + config.PREFETCH_TTL)
+
+    def _finish(self, comic_number: int, task: "asyncio.Task[None]") -> None:
+        """Forget a finished prefetch and log its failure, if any."""
+        if self._tasks.get(comic_number) is task:
+            del self._tasks[comic_number]
+        if task.cancelled() or task.exception() is None:
+            return
+        self.failed += 1
+        self._claimed.discard(comic_number)
+        logger.debug("Failed to prefetch XKCD #%s: %s", comic_number, task.exception())
+
+    def claim(self, comic_number: int, navigated: bool = False) -> bool:
+        """Note that a tool call is about to show a comic.
+
+        Args:
+            comic_number: Comic about to be shown
+            navigated: Whether a navigation step led to it (only those count as misses)
+
+        Returns:
+            True if the comic was prefetched or is being prefetched
+        """
+        self._expire()
+        if self._unshown.pop(comic_number, None) is not None:
+            self.stats.hits += 1
+            return True
+        if comic_number in self._tasks:
+            # The tool call joins the in-flight fetch
+            self._claimed.add(comic_number)
+            self.stats.hits += 1
+            return True
+        if navigated:
+            self.stats.misses += 1
+        return False
+
+    async def close(self) -> None:
+        """Cancel in-flight prefetches and wait for them to finish."""
+        tasks = list(self._tasks.values())
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    def clear(self) -> None:
+        """Forget every prefetch and reset the counters (in-flight tasks are not cancelled)."""
+        self._tasks.clear()
+        self._unshown.clear()
+        self._claimed.clear()
+        self.stats.reset()
+        self.started = self.skipped = self.failed = 0
+
+    def as_dict(self) -> Dict[str, Any]:
+        """Serialize the counters for health and metrics endpoints."""
+        return {
+            **self.stats.as_dict(),
+            "started": self.started,
+            "skipped": self.skipped,
+            "failed": self.failed,
+            "in_flight": len(self._tasks),
+            "unshown_bytes": self.unshown_bytes,
+        }
+
+
+# Process-wide neighbour prefetcher
+PREFETCHER = Prefetcher()
+
+
+def reset_navigation() -> None:
+    """Forget every session's navigation state and the prefetch counters."""
+    SESSION_NAVIGATION.clear()
+    PREFETCHER.clear()
@@ -0,0 +1,168 @@
+"""Opt-in per-request sampling profiler with flamegraph-compatible output.
+
+A profiled tool call starts a background thread that samples the event loop
+thread's Python stack at a fixed interval. Samples are written in the collapsed
+stack format (``frame;frame;frame count``) read by ``flamegraph.pl``, speedscope and
+similar tools. The event loop is shared, so samples also include work done for
+other requests running at the same time.
+
+Profiling is done for a random ``XKCD_PROFILE_SAMPLE_RATE`` fraction of calls.
+With ``XKCD_PROFILE_ON_REQUEST`` set, a call can also ask for a profile with the
+``X-XKCD-Profile`` header or the ``options.profile`` tool option. That switch is off
+by default because the server has no authentication. When none of these apply, no
+profiler is created.
+"""
+
+import logging
+import random
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Iterator, Optional
+
+from mcp.server.lowlevel.server import request_ctx
+
+from . import config
+
+
+logger = logging.getLogger(__name__)
+
+# HTTP header that requests a profile of the call
+PROFILE_HEADER = "x-xkcd-profile"
+
+# Tool option that requests a profile of the call
+PROFILE_OPTION = "profile"
+
+
+class SamplingProfiler:
+    """Samples the stack of one thread from a background thread."""
+
+    def __init__(self, thread_id: int, interval: float):
+        """Create a stopped profiler.
+
+        Args:
+            thread_id: Identifier of the thread to sample
+            interval: Seconds between samples
+        """
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks: Counter = Counter()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        """Start sampling."""
+        self._thread = threading.Thread(target=self._run, name="xkcd-profiler", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> Counter:
+        """Stop sampling.
+
+        Returns:
+            Sample count per collapsed stack
+        """
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        return self.stacks
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is not None:
+                self.stacks[collapse_stack(frame)] += 1
+
+
+def collapse_stack(frame) -> str:
+    """Format a frame and its callers as one collapsed stack, outermost frame first."""
+    frames = []
+    while frame is not None:
+        code = frame.f_code
+        frames.append(f"{code.co_name} ({code.co_filename}:{code.co_firstlineno})")
+        frame = frame.f_back
+    return ";".join(reversed(frames))
+
+
+def should_profile(req: Any) -> bool:
+    """Decide whether to profile a tool call.
+
+    Args:
+        req: MCP tool call request
+
+    Returns:
+        True if the call was sampled, or asked for a profile while ``XKCD_PROFILE_ON_REQUEST`` is set
+    """
+    if config.PROFILE_ON_REQUEST and asks_for_profile(req):
+        return True
+    return config.PROFILE_SAMPLE_RATE > 0 and random.random() < config.PROFILE_SAMPLE_RATE
+
+
+def asks_for_profile(req: Any) -> bool:
+    """Check whether a tool call asks for a profile with the tool option or the HTTP header."""
+    arguments = req.params.arguments or {}
+    options = arguments.get("options")
+    if isinstance(options, dict) and options.get(PROFILE_OPTION):
+        return True
+    try:
+        http_request = request_ctx.get().request
+    except LookupError:
+        http_request = None
+    if http_request is None:
+        return False
+    return http_request.headers.get(PROFILE_HEADER, "").strip().lower() in ("1", "true", "yes", "on")
+
+
+def write_profile(stacks: Counter, label: str, directory: Path) -> Path:
+    """Write collapsed stacks to a new file and prune old profiles.
+
+    Args:
+        stacks: Sample count per collapsed stack
+        label: Name included in the file name (e.g. the tool name)
+        directory: Profile directory
+
+    Returns:
+        Path of the written file
+    """
+    directory.mkdir(parents=True, exist_ok=True)
+    path = directory / f"{time.strftime('%Y%m%dT%H%M%S')}-{time.time_ns() % 1_000_000_000:09d}-{label}.collapsed"
+    path.write_text("".join(f"{stack} {count}\n" for stack, count in stacks.most_common()))
+    prune_profiles(directory, config.PROFILE_MAX_FILES)
+    return path
+
+
+def prune_profiles(directory: Path, keep: int) -> int:
+    """Delete all but the newest profiles in a directory.
+
+    Args:
+        directory: Profile directory
+        keep: Number of profiles to keep
+
+    Returns:
+        Number of profiles deleted
+    """
+    # File names start with their creation time, so they sort oldest first
+    profiles = sorted(directory.glob("*.collapsed"), reverse=True)
+    for path in profiles[keep:]:
+        path.unlink(missing_ok=True)
+    return max(0, len(profiles) - keep)
+
+
+@contextmanager
+def profile_request(label: str) -> Iterator[None]:
+    """Sample the current thread while a block runs and write the profile when it ends.
+
+    Args:
+        label: Name included in the profile file name
+    """
+    profiler = SamplingProfiler(threading.get_ident(), config.PROFILE_INTERVAL)
+    profiler.start()
+    try:
+        yield
+    finally:
+        stacks = profiler.stop()
+        if stacks:
+            path = write_profile(stacks, label, Path(config.PROFILE_DIR))
+            logger.info("Wrote %s profile samples to %s", sum(stacks.values()), path)
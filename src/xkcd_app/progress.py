@@ -0,0 +1,67 @@
+"""MCP progress notifications for long-running tool calls."""
+
+import logging
+from typing import Any, Optional
+
+from mcp.server.lowlevel.server import request_ctx
+
+
+logger = logging.getLogger(__name__)
+
+
+class ProgressReporter:
+    """Sends ``notifications/progress`` for a request that asked for them.
+
+    A client asks for progress by putting a ``progressToken`` in the request's
+    ``_meta``. Without one, or outside an MCP request, reporting does nothing.
+    """
+
+    def __init__(self, req: Any, total: float):
+        """Create a reporter for a request.
+
+        Args:
+            req: MCP request with ``params``
+            total: Progress value that means done
+        """
+        self.total = total
+        self.progress = 0.0
+        meta = getattr(req.params, "meta", None)
+        self.token = meta.progressToken if meta is not None else None
+        try:
+            context = request_ctx.get()
+        except LookupError:
+            context = None
+        self._session = context.session if context is not None and self.token is not None else None
+        self._request_id: Optional[str] = str(context.request_id) if context is not None else None
+
+    @property
+    def enabled(self) -> bool:
+        """Whether notifications are sent."""
+        return self._session is not None
+
+    async def advance(self, message: str, steps: float = 1) -> None:
+        """Move progress forward and notify the client.
+
+        A failed notification (e.g. the client went away) never fails the tool call.
+
+        Args:
+            message: Human-readable description of the step just completed
+            steps: Amount to add to the progress value
+        """
+        self.progress = min(self.total, self.progress + steps)
+        if self._session is None:
+            return
+        try:
+            await self._session.send_progress_notification(
+                self.token,
+                self.progress,
+                total=self.total,
+                message=message,
+                related_request_id=self._request_id,
+            )
+        except Exception as exc:
+            logger.debug("Failed to send progress notification: %s", exc)
+
+    async def finish(self, message: str) -> None:
+        """Report the remaining steps as done."""
+        await self.advance(message, self.total - self.progress)
@@ -0,0 +1,197 @@
+"""Deadline budgets, a circuit breaker and hedging support for upstream requests."""
+
+import math
+import time
+from collections import deque
+from typing import Any, Deque, Dict, Optional
+
+
+class UpstreamUnavailable(Exception):
+    """The upstream could not be asked in time (budget spent or circuit open)."""
+
+
+class DeadlineExceeded(UpstreamUnavailable):
+    """The request's time budget ran out before the upstream answered."""
+
+
+class CircuitOpen(UpstreamUnavailable):
+    """The upstream has been failing, so requests are refused without trying."""
+
+
+class Deadline:
+    """Point in time by which a whole operation must finish."""
+
+    def __init__(self, budget: float):
+        """Start a deadline.
+
+        Args:
+            budget: Seconds from now until the deadline
+        """
+        self.budget = budget
+        self.expires_at = time.monotonic() + budget
+
+    def remaining(self) -> float:
+        """Seconds left before the deadline (never negative)."""
+        return max(0.0, self.expires_at - time.monotonic())
+
+
+class CircuitBreaker:
+    """Consecutive-failure circuit breaker with a single half-open trial request.
+
+    After ``failure_threshold`` consecutive failures the circuit opens and requests
+    are refused for ``reset_timeout`` seconds. One trial request is then let through:
+    success closes the circuit, failure opens it again.
+    """
+
+    def __init__(self, name: str, failure_threshold: int, reset_timeout: float):
+        """Create a closed circuit.
+
+        Args:
+            name: Name used in error messages and stats
+            failure_threshold: Consecutive failures that open the circuit
+            reset_timeout: Seconds the circuit stays open before a trial request
+        """
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.reset()
+
+    @property
+    def state(self) -> str:
+        """``closed``, ``open`` or ``half_open``."""
+        if self._opened_at is None:
+            return "closed"
+        if self._trial_in_flight or time.monotonic() - self._opened_at >= self.reset_timeout:
+            return "half_open"
+        return "open"
+
+    def before_request(self) -> None:
+        """Check that a request may be sent.
+
+        Raises:
+            CircuitOpen: If the circuit is open, or its trial request is already in flight
+        """
+        state = self.state
+        if state == "closed":
+            return
+        if state == "open" or self._trial_in_flight:
+            self.rejected += 1
+            raise CircuitOpen(f"Circuit for {self.name} is open after repeated upstream failures")
+        self._trial_in_flight = True
+
+    def record_success(self) -> None:
+        """Close the circuit after a successful request."""
+        self._failures = 0
+        self._opened_at = None
+        self._trial_in_flight = False
+
+    def record_failure(self) -> None:
+        """Count a failed request, opening the circuit at the threshold or after a failed trial."""
+        self._failures += 1
+        if self._trial_in_flight or (self._opened_at is None and self._failures >= self.failure_threshold):
+            self.opened += 1
+            self._opened_at = time.monotonic()
+            self._trial_in_flight = False
+
+    def abandon(self) -> None:
+        """Forget a request that ended without an outcome (e.g. cancelled), freeing the trial slot."""
+        self._trial_in_flight = False
+
+    def reset(self) -> None:
+        """Close the circuit and zero its counters."""
+        self._failures = 0
+        self._opened_at: Optional[float] = None
+        self._trial_in_flight = False
+        self.opened = 0
+        self.rejected = 0
+
+    def as_dict(self) -> Dict[str, Any]:
+        """Serialize the breaker state for health and metrics endpoints."""
+        return {
+            "state": self.state,
+            "consecutive_failures": self._failures,
+            "opened": self.opened,
+            "rejected": self.rejected,
+        }
+
+
+class LatencyTracker:
+    """Recent upstream latencies, used to pick an adaptive hedging threshold."""
+
+    def __init__(self, window: int):
+        """Create an empty tracker.
+
+        Args:
+            window: Number of most recent observations kept
+        """
+        self._samples: Deque[float] = deque(maxlen=window)
+
+    def __len__(self) -> int:
+        return len(self._samples)
+
+    def observe(self, seconds: float) -> None:
+        """Record the latency of one completed request."""
+        self._samples.append(seconds)
+
+    def percentile(self, percent: float) -> Optional[float]:
+        """Get a percentile of the recent latencies (nearest rank), or None without samples.
+
+        Args:
+            percent: Percentile between 0 and 100
+        """
+        if not self._samples:
+            return None
+        ordered = sorted(self._samples)
+        rank = max(0, min(len(ordered) - 1, math.ceil(percent / 100 * len(ordered)) - 1))
+        return ordered[rank]
+
+    def clear(self) -> None:
+        """Drop every observation."""
+        self._samples.clear()
+
+
+class RetryBudget:
+    """Token bucket that limits extra (hedged or retried) requests to a fraction of traffic.
+
+    Every original request deposits ``ratio`` tokens, up to ``max_tokens``; every
+    extra request spends one. When upstream slows down for everyone, the bucket
+    drains and extra requests stop, so hedging can't amplify an outage.
+    """
+
+    def __init__(self, ratio: float, max_tokens: float):
+        """Create an empty budget.
+
+        Args:
+            ratio: Tokens earned per original request (0.1 allows one extra per ten)
+            max_tokens: Cap on saved-up tokens, bounding bursts of extra requests
+        """
+        self.ratio = ratio
+        self.max_tokens = max_tokens
+        self.reset()
+
+    def deposit(self) -> None:
+        """Earn tokens for one original request."""
+        self.tokens = min(self.max_tokens, self.tokens + self.ratio)
+
+    def withdraw(self) -> bool:
+        """Spend a token for an extra request.
+
+        Returns:
+            True if the extra request may be sent
+        """
+        if self.tokens < 1:
+            self.denied += 1
+            return False
+        self.tokens -= 1
+        self.spent += 1
+        return True
+
+    def reset(self) -> None:
+        """Empty the bucket and zero its counters."""
+        self.tokens = 0.0
+        self.spent = 0
+        self.denied = 0
+
+    def as_dict(self) -> Dict[str, Any]:
+        """Serialize the budget for health and metrics endpoints."""
+        return {"tokens": round(self.tokens, 2), "spent": self.spent, "denied": self.denied}
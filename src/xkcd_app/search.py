@@ -0,0 +1,297 @@
+"""Full-text search over comic titles, alt text and transcripts.
+
+The index is an in-memory inverted index ranked with BM25. It grows one comic at a
+time as comics are cached or mirrored, and each comic's term frequencies are
+persisted in the comic store, so startup only reloads postings instead of
+re-tokenizing the archive. The server loads them in a worker thread; until that
+finishes, descriptive queries are answered as a miss.
+"""
+
+import asyncio
+import logging
+import math
+import re
+from collections import Counter
+from typing import Any, Dict, List, Optional, Tuple
+
+from .store import ComicStore, get_comic_store
+
+
+logger = logging.getLogger(__name__)
+
+# Weight of each comic field, applied as a term-frequency multiplier
+FIELD_WEIGHTS = {
+    "title": 3,
+    "alt": 1,
+    "transcript": 1,
+}
+
+# Words that carry no meaning in comic requests ("show me the latest xkcd comic")
+STOPWORDS = frozenset("""
+    a about an and any are as at be by can comic comics display do find for from get give
+    has have i in is it latest me my new newest of on one or please show that the this to
+    want was what where which with xkcd you
+""".split())
+
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+# Minimum BM25 score for a query to resolve to a comic
+MIN_MATCH_SCORE = 1.0
+
+_TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+
+# Words that ask for the newest comic rather than describe one ("what's today's xkcd?")
+LATEST_WORDS = frozenset({"current", "latest", "most", "newest", "recent", "today"})
+
+
+def tokenize(text: str) -> List[str]:
+    """Split text into lowercase search terms, dropping stopwords and single characters.
+
+    Single characters are mostly the leftovers of contractions ("what's" -> "s").
+
+    Args:
+        text: Text to tokenize
+
+    Returns:
+        List of search terms
+    """
+    return [
+        token for token in _TOKEN_PATTERN.findall(text.lower())
+        if len(token) > 1 and token not in STOPWORDS
+    ]
+
+
+def asks_for_latest(query: str) -> bool:
+    """Check whether a query only asks for the newest comic ("most recent one", "today's xkcd").
+
+    Queries that also describe a comic ("the one about alternating current") are not
+    requests for the newest comic, even if they contain one of ``LATEST_WORDS``.
+    """
+    words = [token for token in _TOKEN_PATTERN.findall(query.lower()) if len(token) > 1]
+    return (
+        any(word in LATEST_WORDS for word in words)
+        and all(word in LATEST_WORDS or word in STOPWORDS for word in words)
+    )
+
+
+def comic_terms(comic_data: Dict[str, Any]) -> Dict[str, int]:
+    """Compute weighted term frequencies for a comic.
+
+    ``safe_title`` is only indexed when it differs from ``title``.
+
+    Args:
+        comic_data: Comic data from the XKCD API
+
+    Returns:
+        Mapping of term to weighted frequency
+    """
+    counts: Counter = Counter()
+    titles = {comic_data.get("title") or "", comic_data.get("safe_title") or ""}
+    for title in titles:
+        for token in tokenize(title):
+            counts[token] += FIELD_WEIGHTS["title"]
+    for field in ("alt", "transcript"):
+        for token in tokenize(comic_data.get(field) or ""):
+            counts[token] += FIELD_WEIGHTS[field]
+    return dict(counts)
+
+
+class SearchIndex:
+    """Inverted index of comic terms with BM25 ranking."""
+
+    def __init__(self):
+        self.postings: Dict[str, Dict[int, int]] = {}
+        self.doc_lengths: Dict[int, int] = {}
+        self.total_length = 0
+
+    def __len__(self) -> int:
+        return len(self.doc_lengths)
+
+    def __contains__(self, comic_number: int) -> bool:
+        return comic_number in self.doc_lengths
+
+    def add(self, comic_number: int, terms: Dict[str, int]) -> None:
+        """Add a comic's term frequencies, replacing any previous entry.
+
+        Args:
+            comic_number: Comic number
+            terms: Mapping of term to weighted frequency
+        """
+        if comic_number in self.doc_lengths:
+            self.remove(comic_number)
+        for term, frequency in terms.items():
+            self.postings.setdefault(term, {})[comic_number] = frequency
+        length = sum(terms.values())
+        self.doc_lengths[comic_number] = length
+        self.total_length += length
+
+    def remove(self, comic_number: int) -> None:
+        """Remove a comic from the index."""
+        length = self.doc_lengths.pop(comic_number, None)
+        if length is None:
+            return
+        self.total_length -= length
+        for term in [term for term, docs in self.postings.items() if comic_number in docs]:
+            del self.postings[term][comic_number]
+            if not self.postings[term]:
+                del self.postings[term]
+
+    def search(self, query: str, limit: int = 5) -> List[Tuple[int, float]]:
+        """Rank comics against a free-text query.
+
+        Args:
+            query: Free-text query
+            limit: Maximum number of results
+
+        Returns:
+            List of (comic number, score), best first
+        """
+        doc_count = len(self.doc_lengths)
+        if not doc_count:
+            return []
+        avg_length = self.total_length / doc_count
+        scores: Dict[int, float] = {}
+        for term in set(tokenize(query)):
+            docs = self.postings.get(term)
+            if not docs:
+                continue
+            idf = math.log(1 + (doc_count - len(docs) + 0.5) / (len(docs) + 0.5))
+            for comic_number, frequency in docs.items():
+                norm = BM25_K1 * (1 - BM25_B + BM25_B * self.doc_lengths[comic_number] / avg_length)
+                scores[comic_number] = scores.get(comic_number, 0.0) + idf * frequency * (BM25_K1 + 1) / (frequency + norm)
+        ranked = sorted(scores.items(), key=lambda item: (-item[1], item[0]))
+        return ranked[:limit]
+
+
+# Process-wide index, loaded lazily from the comic store
+_search_index: Optional[SearchIndex] = None
+
+# Whether load_search_index is reading the store in a worker thread
+_loading = False
+
+# Comics cached while the index was loading, indexed once it is installed
+_pending_comics: List[Dict[str, Any]] = []
+
+
+def read_search_index(store: ComicStore) -> Tuple[SearchIndex, Dict[int, Dict[str, int]]]:
+    """Build an index from the store through its own read-only connection.
+
+    Stored postings are loaded as-is; only comics stored since the index was last
+    persisted (e.g. by a mirror run in another process) are tokenized. Safe to run
+    in a worker thread.
+
+    Args:
+        store: Comic store to read
+
+    Returns:
+        Tuple of (index, terms of the comics tokenized here, still to be persisted)
+    """
+    index = SearchIndex()
+    new_terms: Dict[int, Dict[str, int]] = {}
+    reader = store.open_reader()
+    try:
+        for comic_number, terms in store.iter_search_terms(reader):
+            index.add(comic_number, terms)
+        for comic_data in store.iter_unindexed_comics(reader):
+            comic_number = int(comic_data["num"])
+            new_terms[comic_number] = comic_terms(comic_data)
+            index.add(comic_number, new_terms[comic_number])
+    finally:
+        reader.close()
+    return index, new_terms
+
+
+def _install_search_index(
+    index: SearchIndex, new_terms: Dict[int, Dict[str, int]], store: Optional[ComicStore]
+) -> None:
+    """Make a loaded index the shared one, persisting newly tokenized terms."""
+    global _search_index
+    _search_index = index
+    if store is not None:
+        for comic_number, terms in new_terms.items():
+            store.put_search_terms(comic_number, terms)
+    pending, _pending_comics[:] = list(_pending_comics), []
+    for comic_data in pending:
+        index_comic(comic_data)
+
+
+def get_search_index() -> SearchIndex:
+    """Get the shared search index, loading it from the comic store on first use.
+
+    Returns:
+        The shared search index
+    """
+    if _search_index is None:
+        store = get_comic_store()
+        if store is None:
+            _install_search_index(SearchIndex(), {}, store)
+        else:
+            _install_search_index(*read_search_index(store), store)
+    return _search_index
+
+
+async def load_search_index() -> None:
+    """Load the shared search index in a worker thread, leaving the event loop free.
+
+    Until it finishes, ``find_comic_number`` answers every query as a miss.
+    """
+    global _loading
+    store = get_comic_store()
+    if _search_index is not None or _loading or store is None:
+        return
+    _loading = True
+    try:
+        index, new_terms = await asyncio.to_thread(read_search_index, store)
+    except Exception as exc:
+        # The index is then loaded on the event loop by the first query that needs it
+        logger.warning("Failed to load the search index: %s", exc)
+        return
+    finally:
+        _loading = False
+    if _search_index is None and get_comic_store() is store:
+        _install_search_index(index, new_terms, store)
+
+
+def reset_search_index() -> None:
+    """Drop the in-memory index so it is reloaded from the store on next use."""
+    global _search_index
+    _search_index = None
+    _pending_comics.clear()
+
+
+def index_comic(comic_data: Dict[str, Any]) -> None:
+    """Add a comic to the shared index and persist its terms.
+
+    Args:
+        comic_data: Comic data from the XKCD API
+    """
+    if _loading:
+        _pending_comics.append(comic_data)
+        return
+    index = get_search_index()
+    comic_number = int(comic_data["num"])
+    if comic_number in index:
+        return
+    terms = comic_terms(comic_data)
+    index.add(comic_number, terms)
+    store = get_comic_store()
+    if store is not None:
+        store.put_search_terms(comic_number, terms)
+
+
+def find_comic_number(query: str) -> Optional[int]:
+    """Resolve a natural-language query to the best matching comic.
+
+    Args:
+        query: User query, e.g. "the one about Bobby Tables"
+
+    Returns:
+        Best matching comic number, or None if nothing matches well enough (or the index is still loading)
+    """
+    if _loading:
+        return None
+    results = get_search_index().search(query, limit=1)
+    if results and results[0][1] >= MIN_MATCH_SCORE:
+        return results[0][0]
+    return None
@@ -0,0 +1,102 @@
+"""Production launcher for the MCP server.
+
+``python main.py`` starts ``XKCD_WORKERS`` uvicorn worker processes. They use
+uvloop and httptools when those are installed, and fall back to asyncio and h11
+when they are not. The workers share comic metadata, images and rendered widgets
+through the SQLite comic store. On SIGTERM or SIGINT, each worker stops accepting
+connections and waits up to ``XKCD_GRACEFUL_SHUTDOWN_TIMEOUT`` seconds for
+in-flight requests before running the app's shutdown.
+
+``python main.py --reload`` runs a single auto-reloading process for development.
+"""
+
+import argparse
+import importlib.util
+import logging
+import os
+from typing import Any, Dict, List, Optional
+
+from . import config
+
+
+logger = logging.getLogger(__name__)
+
+# Import string of the ASGI app, so worker processes can import it themselves
+APP = "main:app"
+
+
+def best_event_loop() -> str:
+    """Get the fastest installed event loop implementation (``uvloop`` or ``asyncio``)."""
+    return "uvloop" if importlib.util.find_spec("uvloop") is not None else "asyncio"
+
+
+def best_http_parser() -> str:
+    """Get the fastest installed HTTP/1.1 parser (``httptools`` or ``h11``)."""
+    return "httptools" if importlib.util.find_spec("httptools") is not None else "h11"
+
+
+def uvicorn_options(host: str, port: int, workers: int, reload: bool = False) -> Dict[str, Any]:
+    """Build the uvicorn settings for a launch.
+
+    Args:
+        host: Interface to bind
+        port: Port to bind
+        workers: Number of worker processes (ignored when reloading)
+        reload: Run one process that restarts when source files change
+
+    Returns:
+        Keyword arguments for ``uvicorn.run``
+    """
+    options: Dict[str, Any] = {
+        "host": host,
+        "port": port,
+        "loop": best_event_loop(),
+        "http": best_http_parser(),
+        "timeout_graceful_shutdown": config.GRACEFUL_SHUTDOWN_TIMEOUT,
+    }
+    if reload:
+        options["reload"] = True
+    else:
+        options["workers"] = workers
+    return options
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Command-line entry point for running the server.
+
+    Args:
+        argv: Command-line arguments, defaulting to sys.argv
+
+    Returns:
+        Process exit code
+    """
+    parser = argparse.ArgumentParser(description="Run the XKCD ChatGPT App MCP server")
+    parser.add_argument("--host", default=config.HOST, help="Interface to bind")
+    parser.add_argument("--port", type=int, default=config.PORT, help="Port to bind")
+    parser.add_argument("--workers", type=int, default=config.WORKERS, help="Worker processes")
+    parser.add_argument("--reload", action="store_true", help="Single auto-reloading process for development")
+    args = parser.parse_args(argv)
+    if args.reload and args.workers > 1:
+        parser.error("--reload runs a single process and cannot be combined with --workers")
+    if args.workers < 1:
+        parser.error("--workers must be at least 1")
+
+    logging.basicConfig(level=logging.INFO, format="%(levelname)s %(message)s")
+    if args.workers > 1 and not config.CACHE_DIR:
+        logger.warning("XKCD_CACHE_DIR is empty: %s workers will not share any caches", args.workers)
+    # Worker processes import the app afresh and size their caches from this
+    os.environ["XKCD_WORKERS"] = str(args.workers)
+
+    import uvicorn
+
+    options = uvicorn_options(args.host, args.port, args.workers, args.reload)
+    logger.info(
+        "Starting %s worker(s) on %s:%s (loop=%s, http=%s)",
+        1 if args.reload else args.workers, args.host, args.port, options["loop"], options["http"],
+    )
+    uvicorn.run(APP, **options)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
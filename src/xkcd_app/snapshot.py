@@ -0,0 +1,205 @@
+"""Memory-mapped snapshot of the hot in-memory caches, for fast cold starts.
+
+On shutdown the server writes the comics, image bytes and data URIs it holds in
+memory to a single file. On boot the file is memory-mapped, and only its small
+index is parsed. Entries are read from the mapping when a lookup misses the memory
+cache. A new replica therefore serves warm comics right away, without
+re-downloading or re-encoding anything. Several workers mapping the same file
+share its pages through the OS page cache.
+
+File layout: ``MAGIC``, the index length as an 8-byte little-endian integer, the
+JSON index, then the concatenated entry payloads. The index maps
+``namespace -> key -> [offset, length, mime type]``.
+"""
+
+import json
+import logging
+import mmap
+import os
+import struct
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+from . import config
+from .cache import CacheStats
+
+
+logger = logging.getLogger(__name__)
+
+# File signature and format version
+MAGIC = b"XKCDSNP1"
+
+_HEADER = struct.Struct("<8sQ")
+
+
+class SnapshotWriter:
+    """Collects entries in memory and writes them as one snapshot file."""
+
+    def __init__(self):
+        self._chunks: List[bytes] = []
+        self._index: Dict[str, Dict[str, List[Any]]] = {}
+        self._size = 0
+
+    def __len__(self) -> int:
+        return sum(len(entries) for entries in self._index.values())
+
+    def add(self, namespace: str, key: str, data: bytes, mime_type: Optional[str] = None) -> None:
+        """Add an entry (a later entry for the same key replaces the earlier one).
+
+        Args:
+            namespace: Entry kind, e.g. ``comics`` or ``images``
+            key: Entry key within the namespace
+            data: Payload bytes
+            mime_type: Optional MIME type of the payload
+        """
+        self._index.setdefault(namespace, {})[key] = [self._size, len(data), mime_type]
+        self._chunks.append(data)
+        self._size += len(data)
+
+    def write(self, path: Union[str, Path]) -> int:
+        """Write the snapshot atomically, replacing any existing file.
+
+        Args:
+            path: Snapshot file
+
+        Returns:
+            Number of bytes written
+        """
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        index = json.dumps({"created_at": time.time(), "entries": self._index}, separators=(",", ":")).encode()
+        # Unique per process, so workers shutting down together never write the same temp file
+        tmp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+        with open(tmp_path, "wb") as file:
+            file.write(_HEADER.pack(MAGIC, len(index)))
+            file.write(index)
+            for chunk in self._chunks:
+                file.write(chunk)
+        os.replace(tmp_path, path)
+        return _HEADER.size + len(index) + self._size
+
+
+class CacheSnapshot:
+    """Read-only view of a snapshot file through a memory mapping."""
+
+    def __init__(self, path: Union[str, Path]):
+        """Map a snapshot file and parse its index.
+
+        Args:
+            path: Snapshot file
+
+        Raises:
+            ValueError: If the file is not a snapshot in this format
+        """
+        self.path = Path(path)
+        with open(self.path, "rb") as file:
+            self._mmap = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            if len(self._mmap) < _HEADER.size:
+                raise ValueError(f"{self.path} is too short to be a cache snapshot")
+            magic, index_length = _HEADER.unpack_from(self._mmap, 0)
+            if magic != MAGIC:
+                raise ValueError(f"{self.path} is not a cache snapshot")
+            index = json.loads(self._mmap[_HEADER.size:_HEADER.size + index_length])
+        except BaseException:
+            self._mmap.close()
+            raise
+        self._payload_start = _HEADER.size + index_length
+        self.created_at: float = index["created_at"]
+        self.entries: Dict[str, Dict[str, List[Any]]] = index["entries"]
+        self.stats = CacheStats()
+
+    def __len__(self) -> int:
+        return sum(len(entries) for entries in self.entries.values())
+
+    @property
+    def size(self) -> int:
+        """Size of the mapped file in bytes."""
+        return len(self._mmap)
+
+    def keys(self, namespace: str) -> List[str]:
+        """Get the keys stored in a namespace."""
+        return list(self.entries.get(namespace, ()))
+
+    def get(self, namespace: str, key: str) -> Optional[Tuple[bytes, Optional[str]]]:
+        """Read an entry from the mapping.
+
+        Args:
+            namespace: Entry kind
+            key: Entry key
+
+        Returns:
+            Tuple of (payload bytes, MIME type), or None if the snapshot has no such entry
+        """
+        entry = self.entries.get(namespace, {}).get(key)
+        if entry is None:
+            self.stats.misses += 1
+            return None
+        offset, length, mime_type = entry
+        start = self._payload_start + offset
+        self.stats.hits += 1
+        return self._mmap[start:start + length], mime_type
+
+    def get_json(self, namespace: str, key: str) -> Optional[Any]:
+        """Read and decode a JSON entry, or None if the snapshot has no such entry."""
+        entry = self.get(namespace, key)
+        return json.loads(entry[0]) if entry is not None else None
+
+    def close(self) -> None:
+        """Unmap the file."""
+        self._mmap.close()
+
+    def as_dict(self) -> Dict[str, Any]:
+        """Serialize the snapshot stats for health and metrics endpoints."""
+        return {
+            **self.stats.as_dict(),
+            "entries": len(self),
+            "bytes": self.size,
+            "age_seconds": round(time.time() - self.created_at, 1),
+        }
+
+
+# Process-wide snapshot mapped at startup
+_snapshot: Optional[CacheSnapshot] = None
+
+
+def snapshot_path() -> Optional[Path]:
+    """Get the configured snapshot file, or None if ``XKCD_SNAPSHOT_PATH`` is empty."""
+    return Path(config.SNAPSHOT_PATH) if config.SNAPSHOT_PATH else None
+
+
+def load_snapshot(path: Optional[Union[str, Path]] = None) -> Optional[CacheSnapshot]:
+    """Map the cache snapshot, replacing any previously mapped one.
+
+    A missing or unreadable file is not an error: the server starts with empty caches.
+
+    Args:
+        path: Snapshot file, or None to use ``XKCD_SNAPSHOT_PATH``
+
+    Returns:
+        The mapped snapshot, or None if there is none
+    """
+    global _snapshot
+    close_snapshot()
+    path = Path(path) if path is not None else snapshot_path()
+    if path is None or not path.exists():
+        return None
+    try:
+        _snapshot = CacheSnapshot(path)
+    except (OSError, ValueError) as exc:
+        logger.warning("Ignoring unreadable cache snapshot %s: %s", path, exc)
+    return _snapshot
+
+
+def get_snapshot() -> Optional[CacheSnapshot]:
+    """Get the mapped cache snapshot, if one was loaded."""
+    return _snapshot
+
+
+def close_snapshot() -> None:
+    """Unmap the cache snapshot, if one is mapped."""
+    global _snapshot
+    snapshot, _snapshot = _snapshot, None
+    if snapshot is not None:
+        snapshot.close()
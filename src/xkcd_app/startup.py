@@ -0,0 +1,47 @@
+"""Cold-start timeline: how long the process took to import, load its cache snapshot and get ready.
+
+This module only uses the standard library, so it can be imported before the heavy
+dependencies whose import time it measures.
+"""
+
+import time
+from typing import Any, Dict
+
+
+class StartupTimeline:
+    """Durations of consecutive startup phases, measured from the first import of this module."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self._last = self.started
+        self.phases: Dict[str, float] = {}
+
+    def mark(self, phase: str) -> float:
+        """End a phase now.
+
+        Args:
+            phase: Name of the phase that just finished (``imports``, ``snapshot``, ``ready``)
+
+        Returns:
+            Seconds the phase took
+        """
+        now = time.perf_counter()
+        self.phases[phase] = now - self._last
+        self._last = now
+        return self.phases[phase]
+
+    @property
+    def total(self) -> float:
+        """Seconds from the start of the timeline to the end of the last phase."""
+        return self._last - self.started
+
+    def as_dict(self) -> Dict[str, Any]:
+        """Serialize the timeline for health and metrics endpoints, in milliseconds."""
+        return {
+            "phases_ms": {phase: round(seconds * 1000, 1) for phase, seconds in self.phases.items()},
+            "total_ms": round(self.total * 1000, 1),
+        }
+
+
+# Process-wide timeline, started when the app begins importing
+STARTUP = StartupTimeline()
@@ -0,0 +1,438 @@
+"""Persistent SQLite store for XKCD comic data that survives restarts."""
+
+import hashlib
+import json
+import sqlite3
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Set, Tuple, Union
+
+from . import config
+from .cache import CacheStats
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS comics (
+    num INTEGER PRIMARY KEY,
+    data TEXT NOT NULL,
+    fetched_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS blobs (
+    sha256 TEXT PRIMARY KEY,
+    data BLOB NOT NULL
+);
+CREATE TABLE IF NOT EXISTS images (
+    url TEXT PRIMARY KEY,
+    sha256 TEXT NOT NULL REFERENCES blobs (sha256),
+    mime_type TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS widget_html (
+    session_key TEXT NOT NULL,
+    template_uri TEXT NOT NULL,
+    html TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    expires_at REAL NOT NULL,
+    accessed_at REAL NOT NULL,
+    PRIMARY KEY (session_key, template_uri)
+);
+CREATE TABLE IF NOT EXISTS tile_pyramids (
+    url TEXT PRIMARY KEY,
+    manifest TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS tiles (
+    url TEXT NOT NULL,
+    level INTEGER NOT NULL,
+    col INTEGER NOT NULL,
+    row INTEGER NOT NULL,
+    sha256 TEXT NOT NULL REFERENCES blobs (sha256),
+    PRIMARY KEY (url, level, col, row)
+);
+CREATE TABLE IF NOT EXISTS search_terms (
+    num INTEGER PRIMARY KEY,
+    terms TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS leases (
+    key TEXT PRIMARY KEY,
+    owner TEXT NOT NULL,
+    expires_at REAL NOT NULL
+);
+"""
+
+
+class ComicStore:
+    """SQLite-backed store of comic metadata and content-addressed image bytes."""
+
+    def __init__(self, path: Union[str, Path]):
+        """Open (and create if needed) the store at the given path.
+
+        Args:
+            path: SQLite database file
+        """
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.stats = CacheStats()
+        self.image_stats = CacheStats()
+        # Several server workers may share the file; wait for their write locks instead of failing
+        self._conn = sqlite3.connect(
+            str(self.path),
+            isolation_level=None,
+            check_same_thread=False,
+            timeout=config.STORE_BUSY_TIMEOUT,
+        )
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(SCHEMA)
+
+    def close(self) -> None:
+        """Close the underlying database connection."""
+        self._conn.close()
+
+    def open_reader(self) -> sqlite3.Connection:
+        """Open a separate read-only connection, for bulk reads on another thread.
+
+        Returns:
+            Connection the caller must close
+        """
+        return sqlite3.connect(
+            f"{self.path.resolve().as_uri()}?mode=ro",
+            uri=True,
+            timeout=config.STORE_BUSY_TIMEOUT,
+        )
+
+    def get_comic(self, comic_number: int) -> Optional[Dict[str, Any]]:
+        """Get stored metadata for a comic.
+
+        Args:
+            comic_number: Comic number
+
+        Returns:
+            Comic metadata if stored, None otherwise
+        """
+        row = self._conn.execute("SELECT data FROM comics WHERE num = ?", (comic_number,)).fetchone()
+        if row is None:
+            self.stats.misses += 1
+            return None
+        self.stats.hits += 1
+        return json.loads(row[0])
+
+    def put_comic(self, comic_data: Dict[str, Any]) -> None:
+        """Store metadata for a comic, replacing any existing entry.
+
+        Args:
+            comic_data: Comic data as returned by the XKCD API
+        """
+        self._conn.execute(
+            "INSERT OR REPLACE INTO comics (num, data, fetched_at) VALUES (?, ?, ?)",
+            (int(comic_data["num"]), json.dumps(comic_data), time.time()),
+        )
+
+    def has_comic(self, comic_number: int) -> bool:
+        """Check whether metadata is stored for a comic."""
+        row = self._conn.execute("SELECT 1 FROM comics WHERE num = ?", (comic_number,)).fetchone()
+        return row is not None
+
+    def comic_numbers(self) -> Set[int]:
+        """Get the numbers of all stored comics."""
+        return {row[0] for row in self._conn.execute("SELECT num FROM comics")}
+
+    def archive_rows(self) -> List[Tuple[int, Any, Any, Any, Optional[str], Optional[str]]]:
+        """Get the catalog fields of every stored comic in one query, ordered by number.
+
+        The fields are extracted by SQLite, so no comic's JSON is decoded in Python.
+
+        Returns:
+            Rows of (num, year, month, day, title, alt)
+        """
+        return self._conn.execute(
+            "SELECT num, json_extract(data, '$.year'), json_extract(data, '$.month'), "
+            "json_extract(data, '$.day'), json_extract(data, '$.title'), json_extract(data, '$.alt') "
+            "FROM comics ORDER BY num"
+        ).fetchall()
+
+    def has_image(self, url: str) -> bool:
+        """Check whether image bytes are stored for an image URL."""
+        row = self._conn.execute("SELECT 1 FROM images WHERE url = ?", (url,)).fetchone()
+        return row is not None
+
+    def get_meta(self, key: str) -> Optional[Dict[str, Any]]:
+        """Get a JSON record from the key/value meta table."""
+        row = self._conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return json.loads(row[0]) if row is not None else None
+
+    def set_meta(self, key: str, value: Dict[str, Any]) -> None:
+        """Store a JSON record in the key/value meta table."""
+        self._conn.execute(
+            "INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)",
+            (key, json.dumps(value)),
+        )
+
+    def acquire_lease(self, key: str, owner: str, ttl: float) -> bool:
+        """Claim a named lease unless another owner holds an unexpired one.
+
+        Leases let server processes sharing the store agree on which of them does
+        a piece of work, such as fetching a comic from upstream.
+
+        Args:
+            key: Lease name
+            owner: Identifier of the claiming process
+            ttl: Seconds until the lease expires if it is not released
+
+        Returns:
+            True if the lease is now held by ``owner``
+        """
+        now = time.time()
+        cursor = self._conn.execute(
+            "INSERT INTO leases (key, owner, expires_at) VALUES (?, ?, ?) "
+            "ON CONFLICT (key) DO UPDATE SET owner = excluded.owner, expires_at = excluded.expires_at "
+            "WHERE leases.expires_at <= ? OR leases.owner = excluded.owner",
+            (key, owner, now + ttl, now),
+        )
+        return cursor.rowcount > 0
+
+    def release_lease(self, key: str, owner: str) -> None:
+        """Give up a lease held by ``owner`` (a no-op if someone else holds it)."""
+        self._conn.execute("DELETE FROM leases WHERE key = ? AND owner = ?", (key, owner))
+
+    def get_widget_html(self, session_key: str, template_uri: str, now: float) -> Optional[str]:
+        """Get unexpired widget HTML for a session and mark it as recently used.
+
+        Args:
+            session_key: Session identifier
+            template_uri: Widget template URI
+            now: Current wall-clock time
+
+        Returns:
+            Cached HTML, or None if missing or expired
+        """
+        row = self._conn.execute(
+            "SELECT html FROM widget_html WHERE session_key = ? AND template_uri = ? AND expires_at > ?",
+            (session_key, template_uri, now),
+        ).fetchone()
+        if row is None:
+            return None
+        self._conn.execute(
+            "UPDATE widget_html SET accessed_at = ? WHERE session_key = ? AND template_uri = ?",
+            (now, session_key, template_uri),
+        )
+        return row[0]
+
+    def put_widget_html(
+        self,
+        session_key: str,
+        template_uri: str,
+        html: str,
+        expires_at: float,
+        max_bytes: int,
+    ) -> int:
+        """Store widget HTML, then evict expired and least-recently-used entries over budget.
+
+        Args:
+            session_key: Session identifier
+            template_uri: Widget template URI
+            html: Rendered HTML
+            expires_at: Wall-clock expiry time
+            max_bytes: Total size budget of all cached widget HTML
+
+        Returns:
+            Number of entries evicted to stay within budget
+        """
+        now = time.time()
+        self._conn.execute(
+            "INSERT OR REPLACE INTO widget_html "
+            "(session_key, template_uri, html, size, expires_at, accessed_at) VALUES (?, ?, ?, ?, ?, ?)",
+            (session_key, template_uri, html, len(html), expires_at, now),
+        )
+        self._conn.execute("DELETE FROM widget_html WHERE expires_at <= ?", (now,))
+        evicted = 0
+        total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM widget_html").fetchone()[0]
+        while total > max_bytes:
+            row = self._conn.execute(
+                "SELECT session_key, template_uri, size FROM widget_html ORDER BY accessed_at LIMIT 1"
+            ).fetchone()
+            if row is None:
+                break
+            self._conn.execute(
+                "DELETE FROM widget_html WHERE session_key = ? AND template_uri = ?", (row[0], row[1])
+            )
+            total -= row[2]
+            evicted += 1
+        return evicted
+
+    def clear_widget_html(self) -> None:
+        """Delete every cached widget."""
+        self._conn.execute("DELETE FROM widget_html")
+
+    def put_search_terms(self, comic_number: int, terms: Dict[str, int]) -> None:
+        """Persist a comic's search term frequencies.
+
+        Args:
+            comic_number: Comic number
+            terms: Mapping of term to weighted frequency
+        """
+        self._conn.execute(
+            "INSERT OR REPLACE INTO search_terms (num, terms) VALUES (?, ?)",
+            (comic_number, json.dumps(terms, separators=(",", ":"))),
+        )
+
+    def iter_search_terms(self, reader: Optional[sqlite3.Connection] = None) -> Iterator[Tuple[int, Dict[str, int]]]:
+        """Iterate over the persisted term frequencies of every indexed comic.
+
+        Args:
+            reader: Connection from ``open_reader`` to read through, instead of the shared one
+        """
+        for num, terms in (reader or self._conn).execute("SELECT num, terms FROM search_terms"):
+            yield num, json.loads(terms)
+
+    def iter_unindexed_comics(self, reader: Optional[sqlite3.Connection] = None) -> Iterator[Dict[str, Any]]:
+        """Iterate over stored comics that have no persisted search terms yet.
+
+        Args:
+            reader: Connection from ``open_reader`` to read through, instead of the shared one
+        """
+        rows = (reader or self._conn).execute(
+            "SELECT data FROM comics WHERE num NOT IN (SELECT num FROM search_terms)"
+        ).fetchall()
+        for (data,) in rows:
+            yield json.loads(data)
+
+    def get_image(self, url: str) -> Optional[Tuple[bytes, str]]:
+        """Get stored image bytes for an image URL.
+
+        Args:
+            url: Image URL as referenced by comic metadata
+
+        Returns:
+            Tuple of (image bytes, MIME type) if stored, None otherwise
+        """
+        row = self._conn.execute(
+            "SELECT blobs.data, images.mime_type FROM images "
+            "JOIN blobs ON blobs.sha256 = images.sha256 WHERE images.url = ?",
+            (url,),
+        ).fetchone()
+        if row is None:
+            self.image_stats.misses += 1
+            return None
+        self.image_stats.hits += 1
+        return bytes(row[0]), row[1]
+
+    def put_image(self, url: str, content: bytes, mime_type: str) -> str:
+        """Store image bytes under their content hash and index them by URL.
+
+        Identical images referenced by different URLs share one blob.
+
+        Args:
+            url: Image URL as referenced by comic metadata
+            content: Raw image bytes
+            mime_type: Image MIME type
+
+        Returns:
+            SHA-256 hex digest of the content
+        """
+        digest = hashlib.sha256(content).hexdigest()
+        self._conn.execute("INSERT OR IGNORE INTO blobs (sha256, data) VALUES (?, ?)", (digest, content))
+        self._conn.execute(
+            "INSERT OR REPLACE INTO images (url, sha256, mime_type) VALUES (?, ?, ?)",
+            (url, digest, mime_type),
+        )
+        return digest
+
+    def get_tile_manifest(self, url: str) -> Optional[Dict[str, Any]]:
+        """Get the stored tile pyramid manifest of an image, if it has been processed."""
+        row = self._conn.execute("SELECT manifest FROM tile_pyramids WHERE url = ?", (url,)).fetchone()
+        return json.loads(row[0]) if row is not None else None
+
+    def put_tile_pyramid(
+        self,
+        url: str,
+        manifest: Dict[str, Any],
+        tiles: Dict[Tuple[int, int, int], bytes],
+    ) -> None:
+        """Store an image's tile pyramid in one transaction.
+
+        Tiles are content-addressed, so blank tiles repeated across the image share one blob.
+
+        Args:
+            url: Image URL as referenced by comic metadata
+            manifest: Pyramid manifest (an empty ``levels`` list records an untiled image)
+            tiles: Tile bytes keyed by (level, column, row)
+        """
+        self._conn.execute("BEGIN")
+        try:
+            for (level, col, row), content in tiles.items():
+                digest = hashlib.sha256(content).hexdigest()
+                self._conn.execute("INSERT OR IGNORE INTO blobs (sha256, data) VALUES (?, ?)", (digest, content))
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO tiles (url, level, col, row, sha256) VALUES (?, ?, ?, ?, ?)",
+                    (url, level, col, row, digest),
+                )
+            self._conn.execute(
+                "INSERT OR REPLACE INTO tile_pyramids (url, manifest) VALUES (?, ?)",
+                (url, json.dumps(manifest)),
+            )
+        except BaseException:
+            self._conn.execute("ROLLBACK")
+            raise
+        self._conn.execute("COMMIT")
+
+    def get_tile(self, url: str, level: int, col: int, row: int) -> Optional[Tuple[bytes, str]]:
+        """Get one tile of an image's pyramid.
+
+        Args:
+            url: Image URL as referenced by comic metadata
+            level: Pyramid level (0 is full resolution)
+            col: Tile column
+            row: Tile row
+
+        Returns:
+            Tuple of (tile bytes, SHA-256 hex digest) if stored, None otherwise
+        """
+        row_data = self._conn.execute(
+            "SELECT blobs.data, tiles.sha256 FROM tiles JOIN blobs ON blobs.sha256 = tiles.sha256 "
+            "WHERE tiles.url = ? AND tiles.level = ? AND tiles.col = ? AND tiles.row = ?",
+            (url, level, col, row),
+        ).fetchone()
+        return (bytes(row_data[0]), row_data[1]) if row_data is not None else None
+
+
+# Process-wide store, opened lazily from config or explicitly by the app lifespan
+_comic_store: Optional[ComicStore] = None
+
+
+def open_comic_store(path: Optional[Union[str, Path]] = None) -> Optional[ComicStore]:
+    """Install the shared comic store, closing any previously installed one.
+
+    Args:
+        path: Database file, or None to use ``XKCD_CACHE_DIR`` (disabled when empty)
+
+    Returns:
+        The installed store, or None if the disk tier is disabled
+    """
+    global _comic_store
+    close_comic_store()
+    if path is None and config.CACHE_DIR:
+        path = Path(config.CACHE_DIR) / "xkcd.sqlite3"
+    _comic_store = ComicStore(path) if path is not None else None
+    return _comic_store
+
+
+def close_comic_store() -> None:
+    """Close the shared comic store, if one is open."""
+    global _comic_store
+    store, _comic_store = _comic_store, None
+    if store is not None:
+        store.close()
+
+
+def get_comic_store() -> Optional[ComicStore]:
+    """Get the shared comic store, opening it lazily from config.
+
+    Returns:
+        The shared store, or None if the disk tier is disabled
+    """
+    if _comic_store is None and config.CACHE_DIR:
+        return open_comic_store()
+    return _comic_store
@@ -0,0 +1,121 @@
+"""Session-scoped cache of rendered widget HTML.
+
+Rendered HTML is keyed by session and template URI, so concurrent users never read
+each other's comics from ``handle_read_resource``. The server runs stateless HTTP, so
+no MCP session ID is issued, and sessions are identified only by client request
+metadata. Requests without it are anonymous and are never cached. The in-process backend is an LRU
+with a byte budget; the SQLite backend shares entries between worker processes
+through the comic store.
+"""
+
+import time
+from typing import Any, Optional
+
+from . import config
+from .cache import CacheStats, LRUCache
+from .store import get_comic_store
+
+
+# Request metadata keys that identify a client conversation, in order of preference
+SESSION_META_KEYS = ("openai/session", "openai/subject")
+
+
+def get_session_key(req: Any) -> Optional[str]:
+    """Identify the session a request belongs to from client-supplied request metadata.
+
+    The server runs stateless HTTP and never issues an ``mcp-session-id``, so the
+    ``openai/session`` and ``openai/subject`` metadata are the only session signals.
+
+    Args:
+        req: MCP request with ``params``
+
+    Returns:
+        Session key, or None for an anonymous request (which must not share state)
+    """
+    meta = getattr(req.params, "meta", None)
+    extra = (meta.model_extra or {}) if meta is not None else {}
+    for key in SESSION_META_KEYS:
+        if extra.get(key):
+            return str(extra[key])
+    return None
+
+
+class WidgetHTMLCache:
+    """In-process widget HTML cache bounded by total size, with per-entry TTL."""
+
+    def __init__(self, max_bytes: int, ttl: float):
+        """Create an empty cache.
+
+        Args:
+            max_bytes: Maximum total size of cached HTML
+            ttl: Seconds a rendered widget stays readable
+        """
+        self.ttl = ttl
+        self._cache = LRUCache(max_bytes=max_bytes)
+
+    @property
+    def stats(self) -> CacheStats:
+        return self._cache.stats
+
+    def get(self, session_key: str, template_uri: str) -> Optional[str]:
+        """Get the HTML last rendered for a widget in a session."""
+        return self._cache.get((session_key, template_uri))
+
+    def set(self, session_key: str, template_uri: str, html: str) -> None:
+        """Remember the HTML rendered for a widget in a session."""
+        self._cache.set((session_key, template_uri), html, ttl=self.ttl)
+
+    def clear(self) -> None:
+        """Drop every cached widget."""
+        self._cache.clear()
+
+
+class SQLiteWidgetHTMLCache(WidgetHTMLCache):
+    """Widget HTML cache stored in the shared comic store, visible to every worker."""
+
+    def __init__(self, max_bytes: int, ttl: float):
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self._stats = CacheStats()
+
+    @property
+    def stats(self) -> CacheStats:
+        return self._stats
+
+    def get(self, session_key: str, template_uri: str) -> Optional[str]:
+        store = get_comic_store()
+        html = store.get_widget_html(session_key, template_uri, time.time()) if store is not None else None
+        if html is None:
+            self._stats.misses += 1
+        else:
+            self._stats.hits += 1
+        return html
+
+    def set(self, session_key: str, template_uri: str, html: str) -> None:
+        store = get_comic_store()
+        if store is not None:
+            self._stats.evictions += store.put_widget_html(
+                session_key, template_uri, html, time.time() + self.ttl, self.max_bytes
+            )
+
+    def clear(self) -> None:
+        store = get_comic_store()
+        if store is not None:
+            store.clear_widget_html()
+        self._stats.reset()
+
+
+def create_widget_cache(backend: str = config.WIDGET_CACHE_BACKEND) -> WidgetHTMLCache:
+    """Create the widget HTML cache for the configured backend.
+
+    Args:
+        backend: ``memory`` for an in-process cache, ``sqlite`` to share it across workers
+
+    Returns:
+        Widget HTML cache
+    """
+    if backend == "sqlite":
+        return SQLiteWidgetHTMLCache(config.WIDGET_CACHE_BYTES, config.WIDGET_CACHE_TTL)
+    if backend == "memory":
+        return WidgetHTMLCache(config.WIDGET_CACHE_BYTES, config.WIDGET_CACHE_TTL)
+    raise ValueError(f"Unknown widget cache backend: {backend}")
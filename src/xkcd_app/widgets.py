@@ -2,7 +2,7 @@
 
 from typing import Dict, List
 
-from .html_generator import PLACEHOLDER_HTML
+from .html_generator import GALLERY_PLACEHOLDER_HTML, PLACEHOLDER_HTML
 from .models import AppWidget
 
 
@@ -17,9 +17,20 @@ XKCD_VIEWER_WIDGET = AppWidget(
     response_text="Ready to fetch XKCD comics. Request a comic to get started!",
 )
 
+XKCD_GALLERY_WIDGET = AppWidget(
+    identifier="xkcd-gallery",
+    title="XKCD Comic Gallery",
+    template_uri="ui://widget/xkcd-gallery.html",
+    invoking="Fetching XKCD comics...",
+    invoked="XKCD comics loaded successfully",
+    html=GALLERY_PLACEHOLDER_HTML,
+    response_text="Ready to fetch XKCD comics. Request a list or range like '#300-#320'.",
+)
+
 # List of all widgets (extensible for adding more widgets)
 ALL_WIDGETS: List[AppWidget] = [
     XKCD_VIEWER_WIDGET,
+    XKCD_GALLERY_WIDGET,
 ]
 
 # Build lookup dictionaries for efficient access
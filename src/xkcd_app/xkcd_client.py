@@ -1,13 +1,187 @@
 """XKCD API client for fetching comics."""
 
+import asyncio
 import base64
+import contextvars
+import hashlib
+import importlib.util
+import json
+import logging
+import os
 import re
-from typing import Any, Dict, Optional
+import time
+from contextlib import asynccontextmanager
+from pathlib import Path
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional, Tuple, Union
 
 import httpx
 
+from . import config
+from .archive import archive_comic
+from .cache import CacheStats, LRUCache, SingleFlight
+from .images import (
+    ORIGINAL,
+    VARIANT_WIDTHS,
+    build_tile_pyramid,
+    data_uri_length,
+    resize_image,
+    variants_available,
+)
+from .metrics import HEDGED_REQUESTS, STAGE_SECONDS, STALE_RESPONSES, record_upstream_error
+from .resilience import (
+    CircuitBreaker,
+    Deadline,
+    DeadlineExceeded,
+    LatencyTracker,
+    RetryBudget,
+    UpstreamUnavailable,
+)
+from .search import index_comic
+from .snapshot import SnapshotWriter, get_snapshot, snapshot_path
+from .store import get_comic_store
 
-def extract_comic_number(text: str) -> Optional[int]:
+
+logger = logging.getLogger(__name__)
+
+LATEST_URL = "https://xkcd.com/info.0.json"
+LATEST_KEY = "latest"
+
+# In-memory tier of comic metadata, keyed by comic number or LATEST_KEY
+METADATA_CACHE = LRUCache(max_entries=config.METADATA_CACHE_SIZE)
+
+# In-memory tier of ready-made image data URIs, keyed by image URL and bounded by size
+IMAGE_CACHE = LRUCache(max_bytes=config.IMAGE_CACHE_BYTES)
+
+# Strong ETags (quoted SHA-256 of the image bytes), keyed by image variant key
+IMAGE_ETAGS = LRUCache(max_entries=4096)
+
+# Variant chosen to fit the inline image budget, keyed by image URL
+IMAGE_VARIANT_CHOICES = LRUCache(max_entries=4096)
+
+# Tile pyramid manifests (an empty ``levels`` list marks an untiled image), keyed by image URL
+TILE_MANIFESTS = LRUCache(max_entries=4096)
+
+# Shared in-flight fetches, keyed by comic number or LATEST_KEY
+COMIC_FETCHES = SingleFlight()
+
+# Shared in-flight tile pyramid builds, keyed by image URL
+TILE_BUILDS = SingleFlight()
+
+# Latest-comic pointer with upstream validators ({num, etag, last_modified, fetched_at})
+_latest_record: Optional[Dict[str, Any]] = None
+
+# Conditional requests for the latest comic: hits are 304s, misses are full downloads
+REVALIDATION_STATS = CacheStats()
+
+# Upstream fetches claimed through a store lease: hits were fetched by another worker
+WORKER_LEASE_STATS = CacheStats()
+
+# Interval at which a worker checks whether another worker finished a fetch it is waiting on
+LEASE_POLL_INTERVAL = 0.05
+
+# Circuit breakers for comic metadata (xkcd.com) and images (imgs.xkcd.com)
+UPSTREAM_BREAKERS = {
+    "json": CircuitBreaker("xkcd.com", config.BREAKER_FAILURES, config.BREAKER_RESET),
+    "image": CircuitBreaker("imgs.xkcd.com", config.BREAKER_FAILURES, config.BREAKER_RESET),
+}
+
+# Recent upstream latencies per request kind, for the adaptive hedging threshold
+UPSTREAM_LATENCY = {kind: LatencyTracker(config.HEDGE_WINDOW) for kind in ("json", "image")}
+
+# Process-wide allowance for hedged requests
+RETRY_BUDGET = RetryBudget(config.RETRY_BUDGET_RATIO, config.RETRY_BUDGET_BURST)
+
+# Deadline of the comic load running in the current task, if any
+_deadline: contextvars.ContextVar[Optional[Deadline]] = contextvars.ContextVar("xkcd_deadline", default=None)
+
+# Background revalidation of a stale latest comic, at most one at a time
+_revalidation_task: Optional[asyncio.Task] = None
+
+
+# Process-wide HTTP client, opened and closed with the app lifespan
+_http_client: Optional[httpx.AsyncClient] = None
+
+
+def create_http_client(transport: Optional[httpx.AsyncBaseTransport] = None) -> httpx.AsyncClient:
+    """Create a pooled HTTP client configured for the XKCD upstream.
+
+    HTTP/2 is only enabled when requested and the optional ``h2`` package is installed.
+
+    Args:
+        transport: Optional transport override (e.g. ``httpx.MockTransport`` in tests)
+
+    Returns:
+        Configured async HTTP client
+    """
+    http2 = config.HTTP2_ENABLED and importlib.util.find_spec("h2") is not None
+    return httpx.AsyncClient(
+        http2=http2,
+        transport=transport,
+        timeout=httpx.Timeout(config.HTTP_TIMEOUT, connect=config.HTTP_CONNECT_TIMEOUT),
+        limits=httpx.Limits(
+            max_connections=config.HTTP_MAX_CONNECTIONS,
+            max_keepalive_connections=config.HTTP_MAX_KEEPALIVE,
+            keepalive_expiry=config.HTTP_KEEPALIVE_EXPIRY,
+        ),
+        follow_redirects=True,
+    )
+
+
+async def open_http_client(client: Optional[httpx.AsyncClient] = None) -> httpx.AsyncClient:
+    """Install the shared HTTP client, closing any previously installed one.
+
+    Args:
+        client: Client to install, or None to create the default pooled client
+
+    Returns:
+        The installed client
+    """
+    global _http_client
+    await close_http_client()
+    _http_client = client if client is not None else create_http_client()
+    return _http_client
+
+
+async def prepare_http_client() -> httpx.AsyncClient:
+    """Create the default shared client in a worker thread, unless one is already installed.
+
+    Building the client's TLS context takes around 100 ms, so startup does it off the
+    event loop instead of delaying readiness. Requests that need a client before this
+    finishes create one themselves.
+
+    Returns:
+        The installed client
+    """
+    global _http_client
+    client = await asyncio.to_thread(create_http_client)
+    if _http_client is None or _http_client.is_closed:
+        _http_client = client
+    else:
+        await client.aclose()
+    return _http_client
+
+
+async def close_http_client() -> None:
+    """Close the shared HTTP client, if one is open."""
+    global _http_client
+    client, _http_client = _http_client, None
+    if client is not None:
+        await client.aclose()
+
+
+def get_http_client() -> httpx.AsyncClient:
+    """Get the shared HTTP client, creating it lazily outside the app lifespan.
+
+    Returns:
+        The shared async HTTP client
+    """
+    global _http_client
+    if _http_client is None or _http_client.is_closed:
+        _http_client = create_http_client()
+    return _http_client
+
+
+def extract_comic_number(text: str, explicit_only: bool = False) -> Optional[int]:
     """Extract XKCD comic number from URL or text.
 
     Supports formats:
@@ -19,6 +193,7 @@ def extract_comic_number(text: str) -> Optional[int]:
 
     Args:
         text: User input text that might contain a URL or comic number
+        explicit_only: Only accept URLs and #-numbers, not plain numbers (which may be years)
 
     Returns:
         Comic number if found, None otherwise
@@ -26,8 +201,9 @@ def extract_comic_number(text: str) -> Optional[int]:
     url_patterns = [
         r'xkcd\.com/(\d+)',  # Matches xkcd.com/327 or https://xkcd.com/327/
         r'#(\d+)',           # Matches #327
-        r'\b(\d+)\b',        # Matches standalone numbers like 327
     ]
+    if not explicit_only:
+        url_patterns.append(r'\b(\d+)\b')  # Matches standalone numbers like 327
 
     for pattern in url_patterns:
         match = re.search(pattern, text)
@@ -40,48 +216,895 @@ def extract_comic_number(text: str) -> Optional[int]:
     return None
 
 
-async def fetch_xkcd_comic(comic_number: Optional[int] = None) -> Dict[str, Any]:
+def extract_comic_numbers(text: str, limit: int = config.GALLERY_MAX_COMICS) -> List[int]:
+    """Extract every comic number from a list or range query.
+
+    Supports formats such as "#300-#320", "300 to 320", "327, 1053, 2347" and
+    xkcd.com URLs, in any combination. Duplicates are dropped and order is kept.
+
+    Args:
+        text: User input text
+        limit: Maximum number of comic numbers returned
+
+    Returns:
+        List of comic numbers
+    """
+    pattern = r'(?:xkcd\.com/)?#?(\d+)(?:\s*(?:-|–|\.\.|to)\s*(?:xkcd\.com/)?#?(\d+))?'
+    numbers: List[int] = []
+    for match in re.finditer(pattern, text):
+        start = int(match.group(1))
+        end = int(match.group(2)) if match.group(2) else start
+        step = 1 if end >= start else -1
+        for comic_number in range(start, end + step, step):
+            if comic_number not in numbers:
+                numbers.append(comic_number)
+            if len(numbers) >= limit:
+                return numbers
+    return numbers
+
+
+def reset_caches() -> None:
+    """Drop every in-memory cache tier and counter (the disk tier is left untouched)."""
+    global _latest_record, _revalidation_task
+    METADATA_CACHE.clear()
+    IMAGE_CACHE.clear()
+    IMAGE_ETAGS.clear()
+    IMAGE_VARIANT_CHOICES.clear()
+    TILE_MANIFESTS.clear()
+    _latest_record = None
+    REVALIDATION_STATS.reset()
+    WORKER_LEASE_STATS.reset()
+    for breaker in UPSTREAM_BREAKERS.values():
+        breaker.reset()
+    for tracker in UPSTREAM_LATENCY.values():
+        tracker.clear()
+    RETRY_BUDGET.reset()
+    _revalidation_task = None
+
+
+def get_cache_stats() -> Dict[str, Any]:
+    """Get hit/miss counters for every comic cache tier.
+
+    Returns:
+        Dictionary of per-tier counters
+    """
+    store = get_comic_store()
+    return {
+        "metadata_memory": {**METADATA_CACHE.stats.as_dict(), "entries": len(METADATA_CACHE)},
+        "metadata_disk": store.stats.as_dict() if store is not None else None,
+        "image_memory": {
+            **IMAGE_CACHE.stats.as_dict(),
+            "entries": len(IMAGE_CACHE),
+            "bytes": IMAGE_CACHE.total_bytes,
+        },
+        "image_disk": store.image_stats.as_dict() if store is not None else None,
+        "single_flight": COMIC_FETCHES.as_dict(),
+        "latest_revalidation": REVALIDATION_STATS.as_dict(),
+        "worker_leases": WORKER_LEASE_STATS.as_dict() if config.WORKERS > 1 else None,
+        "snapshot": get_snapshot().as_dict() if get_snapshot() is not None else None,
+    }
+
+
+def get_upstream_stats() -> Dict[str, Any]:
+    """Get the circuit breaker state of each upstream and the stale responses served.
+
+    Returns:
+        Dictionary of per-upstream breaker stats
+    """
+    return {
+        "breakers": {kind: breaker.as_dict() for kind, breaker in UPSTREAM_BREAKERS.items()},
+        "stale_latest_served": int(STALE_RESPONSES.value()),
+        "hedging": {
+            "enabled": config.HEDGE_ENABLED,
+            "thresholds": {kind: hedge_delay(kind) for kind in UPSTREAM_LATENCY},
+            "retry_budget": RETRY_BUDGET.as_dict(),
+        },
+    }
+
+
+def _get_cached_comic(comic_number: int) -> Optional[Dict[str, Any]]:
+    """Get numbered comic metadata from the memory tier, the snapshot or the disk tier without going upstream."""
+    comic_data = METADATA_CACHE.get(comic_number)
+    if comic_data is not None:
+        return comic_data
+
+    snapshot = get_snapshot()
+    comic_data = snapshot.get_json("comics", str(comic_number)) if snapshot is not None else None
+    if comic_data is not None:
+        METADATA_CACHE.set(comic_number, comic_data)
+        return comic_data
+
+    store = get_comic_store()
+    comic_data = store.get_comic(comic_number) if store is not None else None
+    if comic_data is not None:
+        METADATA_CACHE.set(comic_number, comic_data)
+    return comic_data
+
+
+def _cache_comic(comic_data: Dict[str, Any]) -> None:
+    """Add freshly fetched comic metadata to the memory and disk tiers, the search index and the catalog."""
+    METADATA_CACHE.set(comic_data["num"], comic_data)
+    store = get_comic_store()
+    if store is not None:
+        store.put_comic(comic_data)
+    index_comic(comic_data)
+    archive_comic(comic_data)
+
+
+def _get_latest_record() -> Optional[Dict[str, Any]]:
+    """Get the latest-comic pointer and its upstream validators.
+
+    An expired in-memory pointer is re-read from the store, where another worker
+    may already have revalidated it.
+    """
+    global _latest_record
+    if _latest_record is not None and time.time() - _latest_record["fetched_at"] < config.LATEST_TTL:
+        return _latest_record
+    store = get_comic_store()
+    stored = store.get_meta(LATEST_KEY) if store is not None else None
+    if stored is None and _latest_record is None and get_snapshot() is not None:
+        stored = get_snapshot().get_json("meta", LATEST_KEY)
+    if stored is not None and (_latest_record is None or stored["fetched_at"] > _latest_record["fetched_at"]):
+        _latest_record = stored
+    return _latest_record
+
+
+@asynccontextmanager
+async def _worker_lease(key: str, is_stored: Callable[[], bool]) -> AsyncIterator[bool]:
+    """Make sure only one server worker fetches a missing item from upstream.
+
+    Workers that lose the race wait for the lease holder to store the item instead
+    of fetching it again. A worker that waits longer than ``XKCD_FETCH_LEASE_TTL``
+    stops waiting and fetches the item itself.
+
+    Args:
+        key: Lease name identifying the item
+        is_stored: Cheap check whether the item is in the store
+
+    Yields:
+        True if another worker stored the item meanwhile, False if the caller should fetch it
+    """
+    store = get_comic_store()
+    if store is None or config.WORKERS <= 1:
+        yield False
+        return
+
+    owner = str(os.getpid())
+    give_up_at = time.monotonic() + config.FETCH_LEASE_TTL
+    while not store.acquire_lease(key, owner, config.FETCH_LEASE_TTL) and time.monotonic() < give_up_at:
+        await asyncio.sleep(LEASE_POLL_INTERVAL)
+        if is_stored():
+            WORKER_LEASE_STATS.hits += 1
+            yield True
+            return
+    try:
+        stored = is_stored()
+        if stored:
+            WORKER_LEASE_STATS.hits += 1
+        else:
+            WORKER_LEASE_STATS.misses += 1
+        yield stored
+    finally:
+        store.release_lease(key, owner)
+
+
+def known_latest_number() -> Optional[int]:
+    """Get the number of the latest comic this process knows of, without going upstream (even if expired)."""
+    record = _get_latest_record()
+    return record["num"] if record is not None else None
+
+
+def _set_latest_record(record: Dict[str, Any]) -> None:
+    """Remember the latest-comic pointer in memory and on disk."""
+    global _latest_record
+    _latest_record = record
+    store = get_comic_store()
+    if store is not None:
+        store.set_meta(LATEST_KEY, record)
+
+
+def hedge_delay(kind: str) -> Optional[float]:
+    """Get how long a request may go unanswered before it is hedged.
+
+    Args:
+        kind: ``json`` for comic metadata, ``image`` for image downloads
+
+    Returns:
+        Seconds to wait, or None until enough latencies have been observed
+    """
+    tracker = UPSTREAM_LATENCY[kind]
+    if len(tracker) < config.HEDGE_MIN_SAMPLES:
+        return None
+    return max(config.HEDGE_MIN_DELAY, tracker.percentile(config.HEDGE_PERCENTILE))
+
+
+async def _timed_get(url: str, kind: str, headers: Optional[Dict[str, str]]) -> httpx.Response:
+    """Send one GET and record its latency for the hedging threshold."""
+    started = time.perf_counter()
+    response = await get_http_client().get(url, headers=headers)
+    UPSTREAM_LATENCY[kind].observe(time.perf_counter() - started)
+    return response
+
+
+async def _hedged_get(url: str, kind: str, headers: Optional[Dict[str, str]]) -> httpx.Response:
+    """Send a GET, and a second copy if the first is slower than the hedging threshold.
+
+    The first response to arrive wins and the other request is cancelled. A hedge is
+    only sent if the retry budget allows it; if one attempt fails, the other is awaited.
+
+    Args:
+        url: URL to fetch
+        kind: ``json`` for comic metadata, ``image`` for image downloads
+        headers: Optional request headers
+
+    Returns:
+        Upstream response
+    """
+    RETRY_BUDGET.deposit()
+    delay = hedge_delay(kind) if config.HEDGE_ENABLED else None
+    if delay is None:
+        return await _timed_get(url, kind, headers)
+
+    primary = asyncio.ensure_future(_timed_get(url, kind, headers))
+    pending = {primary}
+    try:
+        done, pending = await asyncio.wait(pending, timeout=delay)
+        if done:
+            return primary.result()
+        if not RETRY_BUDGET.withdraw():
+            HEDGED_REQUESTS.inc(kind=kind, result="denied")
+            return await primary
+        hedge = asyncio.ensure_future(_timed_get(url, kind, headers))
+        pending = {primary, hedge}
+        while True:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            succeeded = [task for task in done if task.exception() is None]
+            if succeeded or not pending:
+                winner = succeeded[0] if succeeded else done.pop()
+                HEDGED_REQUESTS.inc(kind=kind, result="won" if winner is hedge else "lost")
+                return winner.result()
+    finally:
+        for task in pending:
+            task.cancel()
+
+
+async def _upstream_get(url: str, kind: str, headers: Optional[Dict[str, str]] = None) -> httpx.Response:
+    """Send a GET to xkcd.com or its image CDN within the current deadline and circuit breaker.
+
+    Inside a comic load, metadata requests may use up to ``XKCD_JSON_BUDGET_SHARE`` of the
+    budget and image requests whatever is left. A ``304 Not Modified`` is returned as is;
+    other error statuses raise. Server errors, timeouts and connection failures count
+    against the circuit breaker.
+
+    Args:
+        url: URL to fetch
+        kind: ``json`` for comic metadata, ``image`` for image downloads
+        headers: Optional request headers
+
+    Returns:
+        Upstream response
+
+    Raises:
+        UpstreamUnavailable: If the deadline is spent or the circuit is open
+        httpx.HTTPError: If the request fails
+    """
+    breaker = UPSTREAM_BREAKERS[kind]
+    deadline = _deadline.get()
+    timeout = None
+    if deadline is not None:
+        timeout = deadline.remaining()
+        if kind == "json":
+            timeout = min(timeout, deadline.budget * config.JSON_BUDGET_SHARE)
+
+    with STAGE_SECONDS.time(stage=f"upstream_{kind}"):
+        try:
+            if timeout is not None and timeout <= 0:
+                raise DeadlineExceeded(f"No time left to fetch {url}")
+            breaker.before_request()
+            try:
+                request = _hedged_get(url, kind, headers)
+                response = await (asyncio.wait_for(request, timeout) if timeout is not None else request)
+            except asyncio.TimeoutError:
+                breaker.record_failure()
+                raise DeadlineExceeded(f"{url} did not answer within {timeout:.2f}s") from None
+            except httpx.HTTPError:
+                breaker.record_failure()
+                raise
+            except BaseException:
+                breaker.abandon()
+                raise
+            if response.status_code >= 500:
+                breaker.record_failure()
+            else:
+                breaker.record_success()
+            if response.status_code != 304:
+                response.raise_for_status()
+        except (httpx.HTTPError, UpstreamUnavailable) as exc:
+            record_upstream_error(kind, exc)
+            raise
+    return response
+
+
+async def get_comic_metadata(comic_number: Optional[int] = None) -> Dict[str, Any]:
+    """Get comic metadata from the memory tier, the disk tier or the XKCD API.
+
+    Numbered comics never change and are cached indefinitely; the latest-comic
+    lookup is only trusted for ``XKCD_LATEST_TTL`` seconds before it is revalidated.
+
+    Args:
+        comic_number: Specific comic number, or None for the latest comic
+
+    Returns:
+        Comic metadata as returned by the XKCD API (shared, do not mutate)
+    """
+    if comic_number is None:
+        return await _get_latest_metadata()
+
+    comic_data = _get_cached_comic(comic_number)
+    if comic_data is not None:
+        return comic_data
+
+    store = get_comic_store()
+    async with _worker_lease(f"comic:{comic_number}", lambda: store.has_comic(comic_number)) as stored:
+        comic_data = _get_cached_comic(comic_number) if stored else None
+        if comic_data is None:
+            response = await _upstream_get(f"https://xkcd.com/{comic_number}/info.0.json", "json")
+            comic_data = response.json()
+            _cache_comic(comic_data)
+    return comic_data
+
+
+async def _get_latest_metadata(revalidate: bool = False) -> Dict[str, Any]:
+    """Get the latest comic, revalidating an expired copy with a conditional request.
+
+    A ``304 Not Modified`` reuses the already-parsed metadata object, so the image
+    and rendered HTML cached for that comic are reused as well. If upstream fails or
+    misses its budget, the expired copy is served and revalidated in the background.
+
+    Args:
+        revalidate: Check upstream even if the cached copy is still within its TTL
+            (failures are raised instead of serving stale)
+    """
+    comic_data = None if revalidate else METADATA_CACHE.get(LATEST_KEY)
+    if comic_data is not None:
+        return comic_data
+
+    record = _get_latest_record()
+    cached = _get_cached_comic(record["num"]) if record is not None else None
+    headers: Dict[str, str] = {}
+    if cached is not None:
+        age = time.time() - record["fetched_at"]
+        if age < config.LATEST_TTL and not revalidate:
+            METADATA_CACHE.set(LATEST_KEY, cached, ttl=config.LATEST_TTL - age)
+            return cached
+        if record.get("etag"):
+            headers["If-None-Match"] = record["etag"]
+        if record.get("last_modified"):
+            headers["If-Modified-Since"] = record["last_modified"]
+
+    if cached is not None and not revalidate and _revalidation_task is not None and not _revalidation_task.done():
+        # Upstream is already being revalidated after a failure; don't queue behind it
+        STALE_RESPONSES.inc()
+        return cached
+
+    try:
+        response = await _upstream_get(LATEST_URL, "json", headers=headers)
+    except (httpx.HTTPError, UpstreamUnavailable) as exc:
+        if cached is None or revalidate:
+            raise
+        # Serve the stale copy now and revalidate off the request path
+        logger.warning("Serving stale latest XKCD #%s: %s", cached.get("num"), exc)
+        STALE_RESPONSES.inc()
+        _revalidate_latest_in_background()
+        return cached
+    if response.status_code == 304 and cached is None:
+        raise httpx.HTTPStatusError("Unexpected 304 for an uncached comic", request=response.request, response=response)
+
+    if response.status_code == 304:
+        REVALIDATION_STATS.hits += 1
+        comic_data = cached
+        etag = response.headers.get("etag", record.get("etag"))
+        last_modified = response.headers.get("last-modified", record.get("last_modified"))
+    else:
+        REVALIDATION_STATS.misses += 1
+        comic_data = response.json()
+        _cache_comic(comic_data)
+        etag = response.headers.get("etag")
+        last_modified = response.headers.get("last-modified")
+
+    _set_latest_record({
+        "num": comic_data["num"],
+        "etag": etag,
+        "last_modified": last_modified,
+        "fetched_at": time.time(),
+    })
+    METADATA_CACHE.set(LATEST_KEY, comic_data, ttl=config.LATEST_TTL)
+    return comic_data
+
+
+def _revalidate_latest_in_background() -> None:
+    """Start revalidating the latest comic in a background task, unless one is running."""
+    global _revalidation_task
+    if _revalidation_task is not None and not _revalidation_task.done():
+        return
+
+    async def revalidate() -> None:
+        # The task inherits the spent deadline of the request that served stale; start afresh
+        _deadline.set(Deadline(config.REQUEST_BUDGET))
+        try:
+            await _get_latest_metadata(revalidate=True)
+        except Exception as exc:
+            logger.warning("Background revalidation of latest XKCD failed: %s", exc)
+
+    _revalidation_task = asyncio.get_running_loop().create_task(revalidate())
+
+
+def guess_image_mime_type(img_url: str) -> str:
+    """Determine the image MIME type from its URL.
+
+    Args:
+        img_url: Image URL
+
+    Returns:
+        MIME type, defaulting to PNG
+    """
+    if img_url.endswith('.png'):
+        return 'image/png'
+    elif img_url.endswith('.jpg') or img_url.endswith('.jpeg'):
+        return 'image/jpeg'
+    elif img_url.endswith('.gif'):
+        return 'image/gif'
+    return 'image/png'
+
+
+def encode_data_uri(content: bytes, mime_type: str) -> str:
+    """Encode image bytes as a base64 data URI."""
+    with STAGE_SECONDS.time(stage="encode"):
+        return f"data:{mime_type};base64,{base64.b64encode(content).decode('ascii')}"
+
+
+async def get_image_bytes(img_url: str) -> Tuple[bytes, str]:
+    """Get raw comic image bytes from the disk tier, downloading and storing them if missing.
+
+    Args:
+        img_url: Image URL from comic metadata
+
+    Returns:
+        Tuple of (image bytes, MIME type)
+    """
+    store = get_comic_store()
+    stored = store.get_image(img_url) if store is not None else None
+    if stored is None:
+        stored = _get_snapshot_image(img_url)
+    if stored is not None:
+        return stored
+
+    async with _worker_lease(f"image:{img_url}", lambda: store.has_image(img_url)) as stored:
+        if stored:
+            stored_image = store.get_image(img_url)
+            if stored_image is not None:
+                return stored_image
+        img_response = await _upstream_get(img_url, "image")
+        content = img_response.content
+        mime_type = guess_image_mime_type(img_url)
+        if store is not None:
+            store.put_image(img_url, content, mime_type)
+    return content, mime_type
+
+
+def _get_snapshot_image(key: str) -> Optional[Tuple[bytes, str]]:
+    """Get image bytes from the cache snapshot, copying them into the disk tier."""
+    snapshot = get_snapshot()
+    entry = snapshot.get("images", key) if snapshot is not None else None
+    if entry is None:
+        return None
+    content, mime_type = entry
+    store = get_comic_store()
+    if store is not None:
+        store.put_image(key, content, mime_type)
+    return content, mime_type
+
+
+def images_by_reference() -> bool:
+    """Check whether widgets link to the /img route instead of inlining images.
+
+    Returns:
+        True if ``XKCD_IMAGE_MODE=reference`` and ``XKCD_PUBLIC_URL`` is set
+    """
+    return config.IMAGE_MODE == "reference" and bool(config.PUBLIC_URL)
+
+
+def image_reference_url(comic_number: int, variant: str = ORIGINAL) -> str:
+    """Get the public URL of a comic image (or one of its variants) served by the /img route."""
+    url = f"{config.PUBLIC_URL}/img/{comic_number}"
+    return url if variant == ORIGINAL else f"{url}?variant={variant}"
+
+
+def image_variant_key(img_url: str, variant: str) -> str:
+    """Get the cache and store key of an image variant (the URL itself for the original)."""
+    return img_url if variant == ORIGINAL else f"{img_url}#{variant}"
+
+
+async def get_image_variant_bytes(img_url: str, variant: str = ORIGINAL) -> Tuple[bytes, str]:
+    """Get the bytes of an image variant, producing and storing it next to the original if missing.
+
+    Variants that cannot be produced (Pillow missing, or the original is already
+    small enough) fall back to the original bytes.
+
+    Args:
+        img_url: Image URL from comic metadata
+        variant: ``original`` or one of the resized variants (``capped``, ``thumb``)
+
+    Returns:
+        Tuple of (image bytes, MIME type)
+    """
+    if variant == ORIGINAL:
+        return await get_image_bytes(img_url)
+    if variant not in VARIANT_WIDTHS:
+        raise ValueError(f"Unknown image variant: {variant}")
+
+    key = image_variant_key(img_url, variant)
+    store = get_comic_store()
+    stored = store.get_image(key) if store is not None else None
+    if stored is None:
+        stored = _get_snapshot_image(key)
+    if stored is not None:
+        return stored
+
+    content, mime_type = await get_image_bytes(img_url)
+    rendition = await asyncio.to_thread(resize_image, content, mime_type, VARIANT_WIDTHS[variant])
+    if rendition is not None:
+        content, mime_type = rendition
+    if store is not None and (rendition is not None or variants_available()):
+        # Identical bytes share the original's content-addressed blob
+        store.put_image(key, content, mime_type)
+    return content, mime_type
+
+
+async def get_inline_image(img_url: str, variant: Optional[str] = None) -> Tuple[str, str]:
+    """Get the data URI to inline for an image, downsized to fit the inline image budget.
+
+    The first time an image is seen, the largest variant whose data URI fits
+    ``XKCD_INLINE_IMAGE_BUDGET`` is chosen and remembered.
+
+    Args:
+        img_url: Image URL from comic metadata
+        variant: Variant to use, or None to choose one by size
+
+    Returns:
+        Tuple of (data URI, variant name)
+    """
+    if variant is None:
+        variant = IMAGE_VARIANT_CHOICES.get(img_url)
+    if variant is None and get_snapshot() is not None:
+        entry = get_snapshot().get("variant_choices", img_url)
+        if entry is not None:
+            variant = entry[0].decode()
+            IMAGE_VARIANT_CHOICES.set(img_url, variant)
+    if variant is not None:
+        return await get_image_data_uri(img_url, variant), variant
+
+    variant = ORIGINAL
+    content, mime_type = await get_image_bytes(img_url)
+    if data_uri_length(len(content), mime_type) > config.INLINE_IMAGE_BUDGET and variants_available():
+        for variant in VARIANT_WIDTHS:
+            content, mime_type = await get_image_variant_bytes(img_url, variant)
+            if data_uri_length(len(content), mime_type) <= config.INLINE_IMAGE_BUDGET:
+                break
+    IMAGE_VARIANT_CHOICES.set(img_url, variant)
+
+    data_uri = encode_data_uri(content, mime_type)
+    IMAGE_CACHE.set(image_variant_key(img_url, variant), data_uri)
+    return data_uri, variant
+
+
+async def get_comic_image(comic_number: int, variant: str = ORIGINAL) -> Tuple[bytes, str, str]:
+    """Get a comic's image bytes for the /img route.
+
+    Args:
+        comic_number: Comic number
+        variant: Image variant to serve
+
+    Returns:
+        Tuple of (image bytes, MIME type, strong ETag)
+    """
+    comic_data = await get_comic_metadata(comic_number)
+    img_url = comic_data.get('img', '')
+    if not img_url:
+        raise LookupError(f"XKCD #{comic_number} has no image")
+
+    content, mime_type = await get_image_variant_bytes(img_url, variant)
+    key = image_variant_key(img_url, variant)
+    etag = IMAGE_ETAGS.get(key)
+    if etag is None:
+        etag = f'"{hashlib.sha256(content).hexdigest()}"'
+        IMAGE_ETAGS.set(key, etag)
+    return content, mime_type, etag
+
+
+def tile_base_url(comic_number: int) -> str:
+    """Get the public URL under which a comic's pyramid tiles are served."""
+    return f"{config.PUBLIC_URL}/img/{comic_number}/tiles"
+
+
+async def get_tile_manifest(img_url: str) -> Dict[str, Any]:
+    """Get the tile pyramid manifest of an image, building and storing the pyramid on first use.
+
+    Tiles live in the disk tier, so nothing is tiled when it is disabled.
+
+    Args:
+        img_url: Image URL from comic metadata
+
+    Returns:
+        Pyramid manifest; its ``levels`` list is empty if the image is not tiled
+    """
+    manifest = TILE_MANIFESTS.get(img_url)
+    if manifest is not None:
+        return manifest
+
+    store = get_comic_store()
+    if store is None:
+        return {"levels": []}
+    manifest = store.get_tile_manifest(img_url)
+    if manifest is None:
+        manifest = await TILE_BUILDS.run(img_url, lambda: _build_tile_pyramid(img_url))
+    TILE_MANIFESTS.set(img_url, manifest)
+    return manifest
+
+
+async def _build_tile_pyramid(img_url: str) -> Dict[str, Any]:
+    """Slice an image into tiles off the event loop and persist the pyramid."""
+    content, mime_type = await get_image_bytes(img_url)
+    pyramid = await asyncio.to_thread(build_tile_pyramid, content, mime_type, config.TILE_SIZE, config.TILE_MIN_SIZE)
+    manifest, tiles = pyramid if pyramid is not None else ({"levels": []}, {})
+    store = get_comic_store()
+    if store is not None and (pyramid is not None or variants_available()):
+        store.put_tile_pyramid(img_url, manifest, tiles)
+    return manifest
+
+
+async def get_comic_tile(comic_number: int, level: int, col: int, row: int) -> Tuple[bytes, str, str]:
+    """Get one tile of a comic's image pyramid for the tile route.
+
+    Args:
+        comic_number: Comic number
+        level: Pyramid level (0 is full resolution)
+        col: Tile column
+        row: Tile row
+
+    Returns:
+        Tuple of (tile bytes, MIME type, strong ETag)
+    """
+    comic_data = await get_comic_metadata(comic_number)
+    img_url = comic_data.get('img', '')
+    manifest = await get_tile_manifest(img_url) if img_url else {"levels": []}
+    store = get_comic_store()
+    tile = store.get_tile(img_url, level, col, row) if store is not None and manifest["levels"] else None
+    if tile is None:
+        raise LookupError(f"XKCD #{comic_number} has no tile {level}/{col}_{row}")
+    content, digest = tile
+    return content, manifest["mime_type"], f'"{digest}"'
+
+
+async def get_image_data_uri(img_url: str, variant: str = ORIGINAL) -> str:
+    """Get a comic image (or one of its variants) as a base64 data URI.
+
+    Checks the in-memory data URI cache, the cache snapshot, then the
+    content-addressed image bytes on disk, before downloading the image.
+
+    Args:
+        img_url: Image URL from comic metadata
+        variant: Image variant to encode
+
+    Returns:
+        Base64 data URI for the image
+    """
+    key = image_variant_key(img_url, variant)
+    data_uri = IMAGE_CACHE.get(key)
+    if data_uri is not None:
+        return data_uri
+
+    snapshot = get_snapshot()
+    entry = snapshot.get("data_uris", key) if snapshot is not None else None
+    if entry is not None:
+        data_uri = entry[0].decode("ascii")
+        IMAGE_CACHE.set(key, data_uri)
+        return data_uri
+
+    content, mime_type = await get_image_variant_bytes(img_url, variant)
+    data_uri = encode_data_uri(content, mime_type)
+    IMAGE_CACHE.set(key, data_uri)
+    return data_uri
+
+
+async def fetch_xkcd_comic(
+    comic_number: Optional[int] = None,
+    variant: Optional[str] = None,
+    deadline: Optional[Deadline] = None,
+) -> Dict[str, Any]:
     """Fetch XKCD comic data from the API.
 
+    Concurrent calls for the same comic share a single upstream fetch.
+
     Args:
         comic_number: Specific comic number, or None for the latest comic
+        variant: Image variant to embed, or None to pick one that fits the inline budget
+        deadline: Deadline of the tool call this load is part of, or None for a fresh ``XKCD_REQUEST_BUDGET``
 
     Returns:
         Dictionary containing comic data with base64 encoded image
     """
-    async with httpx.AsyncClient() as client:
-        if comic_number is None:
-            url = "https://xkcd.com/info.0.json"
-        else:
-            url = f"https://xkcd.com/{comic_number}/info.0.json"
+    key = (LATEST_KEY if comic_number is None else comic_number, variant)
+    comic_data = await COMIC_FETCHES.run(key, lambda: _load_comic(comic_number, variant=variant, deadline=deadline))
+    return dict(comic_data)
 
-        response = await client.get(url)
-        response.raise_for_status()
-        comic_data = response.json()
 
-        # Fetch the image and convert to base64 to bypass CSP restrictions
-        img_url = comic_data.get('img', '')
-        if img_url:
+async def load_comic_metadata(comic_number: Optional[int] = None, deadline: Optional[Deadline] = None) -> Dict[str, Any]:
+    """Get comic metadata within the request budget, sharing one lookup among concurrent callers.
+
+    This is the metadata-only counterpart of ``fetch_xkcd_comic``, for callers that
+    need the title before the image (progress reporting, metadata-first responses).
+
+    Args:
+        comic_number: Specific comic number, or None for the latest comic
+        deadline: Deadline of the tool call this load is part of, or None for a fresh ``XKCD_REQUEST_BUDGET``
+
+    Returns:
+        Comic metadata as returned by the XKCD API (shared, do not mutate)
+    """
+    key = ("metadata", LATEST_KEY if comic_number is None else comic_number)
+    return await COMIC_FETCHES.run(key, lambda: _within_budget(lambda: get_comic_metadata(comic_number), deadline))
+
+
+async def refresh_latest_comic() -> Dict[str, Any]:
+    """Revalidate the latest comic upstream now, ignoring its TTL, and warm its image.
+
+    Returns:
+        Dictionary containing the latest comic data with base64 encoded image
+    """
+    comic_data = await COMIC_FETCHES.run((LATEST_KEY, None), lambda: _load_comic(None, revalidate=True))
+    return dict(comic_data)
+
+
+async def _load_comic(
+    comic_number: Optional[int],
+    revalidate: bool = False,
+    variant: Optional[str] = None,
+    deadline: Optional[Deadline] = None,
+) -> Dict[str, Any]:
+    """Load comic metadata and its embedded image through every cache tier, within the request budget."""
+    return await _within_budget(lambda: _load_comic_data(comic_number, revalidate, variant), deadline)
+
+
+async def _within_budget(
+    load: Callable[[], Awaitable[Dict[str, Any]]],
+    deadline: Optional[Deadline] = None,
+) -> Dict[str, Any]:
+    """Run a load under a deadline for its upstream requests.
+
+    The deadline is the one given, else the one already set for this task, else a
+    fresh ``XKCD_REQUEST_BUDGET``. A tool call's later steps thus only get what its
+    earlier steps left.
+    """
+    token = _deadline.set(deadline or _deadline.get() or Deadline(config.REQUEST_BUDGET))
+    try:
+        return await load()
+    finally:
+        _deadline.reset(token)
+
+
+async def _load_comic_data(comic_number: Optional[int], revalidate: bool, variant: Optional[str]) -> Dict[str, Any]:
+    """Load comic metadata and attach its image by reference or inline."""
+    if comic_number is None:
+        comic_data = dict(await _get_latest_metadata(revalidate=revalidate))
+    else:
+        comic_data = dict(await get_comic_metadata(comic_number))
+
+    img_url = comic_data.get('img', '')
+    if img_url and images_by_reference():
+        # Link to our own cached /img route; the bytes are stored now so it serves instantly
+        variant = variant or ORIGINAL
+        try:
+            await get_image_variant_bytes(img_url, variant)
+            comic_data['img_src'] = image_reference_url(comic_data['num'], variant)
+            comic_data['img_variant'] = variant
+        except Exception:
+            comic_data['img_src'] = img_url
+        comic_data['img_original'] = img_url
+        if variant == ORIGINAL:
+            # Giant comics are viewed through their tile pyramid, loading only visible tiles
             try:
-                img_response = await client.get(img_url)
-                img_response.raise_for_status()
-                img_base64 = base64.b64encode(img_response.content).decode('utf-8')
-
-                # Determine image type from URL
-                if img_url.endswith('.png'):
-                    mime_type = 'image/png'
-                elif img_url.endswith('.jpg') or img_url.endswith('.jpeg'):
-                    mime_type = 'image/jpeg'
-                elif img_url.endswith('.gif'):
-                    mime_type = 'image/gif'
-                else:
-                    mime_type = 'image/png'
-
-                comic_data['img_base64'] = f"data:{mime_type};base64,{img_base64}"
-                comic_data['img_original'] = img_url
+                manifest = await get_tile_manifest(img_url)
             except Exception:
-                # If image fetch fails, keep the original URL
-                comic_data['img_base64'] = img_url
-                comic_data['img_original'] = img_url
+                manifest = {"levels": []}
+            if manifest["levels"]:
+                comic_data['img_tiles'] = {**manifest, "url": tile_base_url(comic_data['num'])}
+    elif img_url:
+        # Embed the image as base64 to bypass CSP restrictions, downsized if over budget
+        try:
+            comic_data['img_base64'], comic_data['img_variant'] = await get_inline_image(img_url, variant)
+        except Exception:
+            # If image fetch fails, keep the original URL
+            comic_data['img_base64'] = img_url
+        comic_data['img_original'] = img_url
 
-        return comic_data
+    return comic_data
+
+
+async def fetch_xkcd_comics(
+    comic_numbers: List[int],
+    concurrency: int = config.GALLERY_CONCURRENCY,
+    variant: Optional[str] = None,
+    on_fetched: Optional[Callable[[int], Awaitable[None]]] = None,
+) -> List[Union[Dict[str, Any], Exception]]:
+    """Fetch several comics concurrently through every cache layer.
+
+    Args:
+        comic_numbers: Comic numbers to fetch
+        concurrency: Maximum number of comics fetched at once
+        variant: Image variant to embed for every comic
+        on_fetched: Optional callback awaited with the number of comics finished so far
+            (successfully or not) each time one finishes
+
+    Returns:
+        Comic data or the raised exception for each requested number, in order
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+    finished = 0
+
+    async def fetch(comic_number: int) -> Dict[str, Any]:
+        nonlocal finished
+        try:
+            async with semaphore:
+                return await fetch_xkcd_comic(comic_number, variant=variant)
+        finally:
+            finished += 1
+            if on_fetched is not None:
+                await on_fetched(finished)
+
+    return await asyncio.gather(*(fetch(num) for num in comic_numbers), return_exceptions=True)
+
+
+def save_cache_snapshot(path: Optional[Union[str, Path]] = None) -> int:
+    """Write the hot in-memory caches to the cache snapshot file.
+
+    The snapshot holds the comics, data URIs and variant choices in memory, the
+    latest-comic pointer and the raw bytes of every image in memory, so the next
+    process can serve them without the disk tier or upstream.
+
+    Args:
+        path: Snapshot file, or None to use ``XKCD_SNAPSHOT_PATH``
+
+    Returns:
+        Number of entries written (0 if snapshots are disabled)
+    """
+    path = Path(path) if path is not None else snapshot_path()
+    if path is None:
+        return 0
+
+    writer = SnapshotWriter()
+    for comic_number, comic_data in METADATA_CACHE.items():
+        if comic_number != LATEST_KEY:
+            writer.add("comics", str(comic_number), json.dumps(comic_data).encode())
+    latest = _get_latest_record()
+    if latest is not None:
+        writer.add("meta", LATEST_KEY, json.dumps(latest).encode())
+    for img_url, variant in IMAGE_VARIANT_CHOICES.items():
+        writer.add("variant_choices", img_url, variant.encode())
+
+    store = get_comic_store()
+    previous = get_snapshot()
+    image_keys = dict.fromkeys(key for key, _ in IMAGE_CACHE.items())
+    image_keys.update(dict.fromkeys(key for key, _ in IMAGE_ETAGS.items()))
+    for key in image_keys:
+        image = store.get_image(key) if store is not None else None
+        if image is None and previous is not None:
+            image = previous.get("images", key)
+        if image is not None:
+            writer.add("images", key, image[0], image[1])
+    for key, data_uri in IMAGE_CACHE.items():
+        writer.add("data_uris", key, data_uri.encode("ascii"))
+
+    size = writer.write(path)
+    logger.info("Wrote %s cache entries (%s bytes) to %s", len(writer), size, path)
+    return len(writer)
@@ -0,0 +1,82 @@
+"""Shared pytest fixtures."""
+
+from typing import Dict, List
+
+import httpx
+import pytest
+import pytest_asyncio
+
+from src.xkcd_app import config
+from src.xkcd_app.archive import reset_comic_archive
+from src.xkcd_app.handlers import PENDING_HYDRATIONS, WIDGET_HTML_CACHE
+from src.xkcd_app.html_generator import ERROR_HTML_CACHE, HTML_CACHE
+from src.xkcd_app.navigation import reset_navigation
+from src.xkcd_app.search import reset_search_index
+from src.xkcd_app.snapshot import close_snapshot
+from src.xkcd_app.store import close_comic_store, open_comic_store
+from src.xkcd_app.xkcd_client import close_http_client, open_http_client, reset_caches
+
+
+class FakeUpstream:
+    """In-process stand-in for xkcd.com and its image CDN."""
+
+    def __init__(self, latest: int = 327, missing=(404,)):
+        self.latest = latest
+        self.missing = set(missing)
+        self.requests: List[str] = []
+        self.images: Dict[int, bytes] = {}
+
+    def handle(self, request: httpx.Request) -> httpx.Response:
+        self.requests.append(str(request.url))
+        if request.url.host == "imgs.xkcd.com":
+            num = int(request.url.path.rsplit("_", 1)[-1].split(".")[0])
+            content = self.images.get(num, b"\x89PNG fake image " + request.url.path.encode())
+            return httpx.Response(200, content=content)
+        parts = request.url.path.strip("/").split("/")
+        num = int(parts[0]) if len(parts) > 1 else self.latest
+        if num in self.missing or num > self.latest:
+            return httpx.Response(404)
+        return httpx.Response(200, json={
+            "num": num,
+            "title": f"Comic {num}",
+            "safe_title": f"Comic {num}",
+            "alt": f"Alt text for comic {num}",
+            "transcript": "",
+            "img": f"https://imgs.xkcd.com/comics/comic_{num}.png",
+            "year": "2020",
+            "month": "3",
+            "day": "14",
+        })
+
+
+def reset_memory_state():
+    """Drop every process-wide in-memory cache."""
+    reset_caches()
+    reset_search_index()
+    reset_comic_archive()
+    reset_navigation()
+    WIDGET_HTML_CACHE.clear()
+    PENDING_HYDRATIONS.clear()
+    HTML_CACHE.clear()
+    ERROR_HTML_CACHE.clear()
+
+
+@pytest.fixture(autouse=True)
+def isolated_caches(tmp_path, monkeypatch):
+    """Give every test empty memory caches, a private on-disk store and a private snapshot path."""
+    reset_memory_state()
+    monkeypatch.setattr(config, "SNAPSHOT_PATH", str(tmp_path / "snapshot.bin"))
+    store = open_comic_store(tmp_path / "xkcd.sqlite3")
+    yield store
+    close_snapshot()
+    close_comic_store()
+    reset_memory_state()
+
+
+@pytest_asyncio.fixture
+async def fake_upstream():
+    """Route the shared HTTP client to a FakeUpstream for the duration of a test."""
+    upstream = FakeUpstream()
+    await open_http_client(httpx.AsyncClient(transport=httpx.MockTransport(upstream.handle)))
+    yield upstream
+    await close_http_client()
@@ -0,0 +1,80 @@
+"""Tests for the columnar comic catalog."""
+
+import pytest
+
+from src.xkcd_app.archive import ComicArchive, get_comic_archive, parse_archive_query
+from src.xkcd_app.handlers import handle_call_tool
+
+from .test_handlers import MIME_TYPE, call_tool_request
+
+
+ROWS = [
+    (700, "2010", "2", "26", "Instruction Manual", "Alt about Physics."),
+    (710, "2010", "3", "19", "Collatz Conjecture", "The Collatz Conjecture states..."),
+    (711, "2010", "3", "22", "Mu", "Nothing about physics here."),
+    (1466, "2014", "12", "31", "Last of 2014", ""),
+    (1467, "2015", "1", "2", "Email", "Email physics."),
+    (1609, "2015", "12", "30", "Food Combinations", ""),
+]
+
+
+def test_parse_archive_query():
+    """Test that dates and alt text filters are recognized and plain number ranges are not."""
+    assert parse_archive_query("comics from March 2010") == {"dates": (20100300, 20100399)}
+    assert parse_archive_query("last comic of 2015") == {"dates": (20150000, 20159999), "newest_first": True}
+    assert parse_archive_query("comics 700-711 with alt text mentioning physics") == {
+        "alt_text": "physics",
+        "numbers": (700, 711),
+    }
+    assert parse_archive_query("comics from 2000 to 2010") is None
+    assert parse_archive_query("#327") is None
+
+
+def test_archive_answers_date_range_and_text_queries():
+    """Test month, year and alt text selections, including comics added after loading."""
+    archive = ComicArchive.from_rows(ROWS)
+
+    assert archive.select(dates=(20100300, 20100399)) == [710, 711]
+    assert archive.select(dates=(20150000, 20159999), limit=1) == [1467]
+    assert archive.select(dates=(20150000, 20159999), newest_first=True, limit=1) == [1609]
+    assert archive.select(numbers=(700, 711), alt_text="PHYSICS") == [700, 711]
+
+    archive.add({"num": 705, "year": "2010", "month": "3", "day": "8", "title": "Added", "alt": "More physics"})
+    assert archive.select(dates=(20100300, 20100399)) == [705, 710, 711]
+    assert archive.select(alt_text="physics") == [700, 705, 711, 1467]
+    assert archive.date_of(705) == "2010-03-08"
+
+
+def test_archive_loads_from_store(isolated_caches):
+    """Test that the catalog is loaded from the comic store in one query."""
+    for num, year, month, day, title, alt in ROWS:
+        isolated_caches.put_comic({"num": num, "year": year, "month": month, "day": day, "title": title, "alt": alt})
+
+    archive = get_comic_archive()
+
+    assert len(archive) == len(ROWS)
+    assert archive.date_of(1466) == "2014-12-31"
+
+
+@pytest.mark.asyncio
+async def test_gallery_and_viewer_answer_date_queries(fake_upstream):
+    """Test that the tools resolve date queries through the catalog instead of reading years as comic numbers."""
+    fake_upstream.latest = 3000
+    await handle_call_tool(call_tool_request("xkcd-gallery", userQuery="#300-#302"), MIME_TYPE)
+
+    result = await handle_call_tool(call_tool_request("xkcd-gallery", userQuery="comics from March 2020"), MIME_TYPE)
+    assert [comic["comic_number"] for comic in result.root.structuredContent["comics"]] == [300, 301, 302]
+
+    result = await handle_call_tool(call_tool_request("xkcd-viewer", userQuery="the last comic of 2020"), MIME_TYPE)
+    assert result.root.structuredContent["comic_number"] == 302
+
+    result = await handle_call_tool(call_tool_request("xkcd-gallery", userQuery="comics from 2015"), MIME_TYPE)
+    assert "error" in result.root.structuredContent
+
+    # The viewer falls through to search instead of failing, and never reads the year as a comic number
+    result = await handle_call_tool(call_tool_request("xkcd-viewer", userQuery="first comic of 2015"), MIME_TYPE)
+    assert "error" not in result.root.structuredContent
+    assert result.root.structuredContent["comic_number"] != 2015
+
+    result = await handle_call_tool(call_tool_request("xkcd-viewer", userQuery="comic #1337 from 2014"), MIME_TYPE)
+    assert result.root.structuredContent["comic_number"] == 1337
@@ -0,0 +1,35 @@
+"""Tests for background cache warm-up tasks."""
+
+import asyncio
+
+import pytest
+
+from src.xkcd_app import xkcd_client
+from src.xkcd_app.background import poll_latest_comic, warm_comics
+
+
+@pytest.mark.asyncio
+async def test_warm_comics_fills_caches(fake_upstream):
+    """Test that warmed comics are served without touching the network."""
+    warmed = await warm_comics([300, 404, 1053], concurrency=2)
+    fake_upstream.requests.clear()
+    fake_upstream.latest = 2000
+    await xkcd_client.fetch_xkcd_comic(300)
+
+    assert warmed == 1
+    assert fake_upstream.requests == []
+
+
+@pytest.mark.asyncio
+async def test_poller_picks_up_new_latest_comic(fake_upstream):
+    """Test that the poller revalidates the latest comic despite its TTL."""
+    await xkcd_client.fetch_xkcd_comic(None)
+    fake_upstream.latest = 328
+
+    poller = asyncio.create_task(poll_latest_comic(interval=60))
+    await asyncio.sleep(0.05)
+    poller.cancel()
+    latest = await xkcd_client.fetch_xkcd_comic(None)
+
+    assert latest["num"] == 328
+    assert "https://imgs.xkcd.com/comics/comic_328.png" in fake_upstream.requests
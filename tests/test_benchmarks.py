@@ -0,0 +1,19 @@
+"""Smoke test for the benchmark harness."""
+
+import pytest
+
+from benchmarks.harness import UpstreamProfile, compare, run_benchmark
+
+
+@pytest.mark.asyncio
+async def test_benchmark_reports_every_scenario():
+    """Test that a tiny run of each scenario produces a comparable report."""
+    profile = UpstreamProfile(latency_ms=0, jitter_ms=0, image_bytes=2000)
+    report = await run_benchmark(["call_tool", "read_resource", "http_call_tool"], 6, 3, 3, profile)
+
+    assert [result["scenario"] for result in report["results"]] == ["call_tool", "read_resource", "http_call_tool"]
+    for result in report["results"]:
+        assert result["errors"] == 0
+        assert result["bytes_per_response"] > 0
+        assert result["latency_ms"]["p50"] <= result["latency_ms"]["p99"]
+    assert len(compare(report, report)) == 3
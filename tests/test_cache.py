@@ -0,0 +1,91 @@
+"""Tests for the in-memory cache primitives."""
+
+import asyncio
+import time
+
+import pytest
+
+from src.xkcd_app.cache import LRUCache, SingleFlight
+
+
+def test_lru_evicts_least_recently_used():
+    """Test that the least recently used entry is evicted first."""
+    cache = LRUCache(max_entries=2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1
+    cache.set("c", 3)
+
+    assert "b" not in cache
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+    assert cache.stats.evictions == 1
+
+
+def test_lru_ttl_and_stats():
+    """Test per-entry expiry and hit/miss counters."""
+    cache = LRUCache(max_entries=10)
+    cache.set("fresh", "x", ttl=60)
+    cache.set("stale", "y", ttl=0)
+    time.sleep(0.001)
+
+    assert cache.get("fresh") == "x"
+    assert cache.get("stale") is None
+    assert cache.get("missing", "default") == "default"
+    assert cache.stats.hits == 1
+    assert cache.stats.misses == 2
+    assert cache.stats.as_dict()["hit_ratio"] == 0.3333
+
+
+def test_lru_byte_budget():
+    """Test eviction by total size rather than entry count."""
+    cache = LRUCache(max_bytes=10)
+    cache.set("a", "12345")
+    cache.set("b", "1234")
+    cache.set("c", "123")
+
+    assert "a" not in cache
+    assert cache.total_bytes == 7
+    cache.set("huge", "x" * 11)
+    assert "huge" not in cache
+    assert cache.total_bytes == 7
+
+
+@pytest.mark.asyncio
+async def test_single_flight_coalesces_and_shares_errors():
+    """Test that concurrent callers share one call, including its failure."""
+    flight = SingleFlight()
+    calls = []
+
+    async def failing():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        raise RuntimeError("upstream down")
+
+    results = await asyncio.gather(
+        *(flight.run("latest", failing) for _ in range(5)),
+        return_exceptions=True,
+    )
+
+    assert len(calls) == 1
+    assert all(isinstance(result, RuntimeError) for result in results)
+    assert flight.coalesced == 4
+    assert len(flight) == 0
+
+
+@pytest.mark.asyncio
+async def test_single_flight_survives_cancelled_caller():
+    """Test that cancelling one waiter does not cancel the shared call."""
+    flight = SingleFlight()
+
+    async def slow():
+        await asyncio.sleep(0.01)
+        return 327
+
+    first = asyncio.ensure_future(flight.run(327, slow))
+    second = asyncio.ensure_future(flight.run(327, slow))
+    await asyncio.sleep(0)
+    first.cancel()
+
+    assert await second == 327
+    assert first.cancelled()
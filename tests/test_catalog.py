@@ -0,0 +1,44 @@
+"""Tests for the prebuilt MCP catalog."""
+
+import httpx
+import mcp.types as types
+import pytest
+
+from main import MIME_TYPE, app, list_tools
+from src.xkcd_app import config
+from src.xkcd_app.catalog import VERSION_META_KEY, get_catalog
+
+
+@pytest.mark.asyncio
+async def test_listing_reuses_prebuilt_result():
+    """Test that repeated tools/list requests return the same prebuilt result."""
+    request = types.ListToolsRequest(method="tools/list")
+    first = await list_tools(request)
+    second = await list_tools(request)
+
+    assert first is second
+    assert [tool.name for tool in first.root.tools] == ["xkcd-viewer", "xkcd-gallery"]
+    assert first.root.meta[VERSION_META_KEY] == get_catalog(MIME_TYPE).version
+
+
+def test_catalog_rebuilds_when_tool_metadata_changes(monkeypatch):
+    """Test that settings which change tool metadata produce a new catalog version."""
+    inline = get_catalog(MIME_TYPE)
+    monkeypatch.setattr(config, "IMAGE_MODE", "reference")
+    monkeypatch.setattr(config, "PUBLIC_URL", "https://xkcd-app.example.com")
+    reference = get_catalog(MIME_TYPE)
+
+    assert reference.version != inline.version
+    assert "openai/widgetCSP" in reference.tools.root.tools[0].meta
+
+
+@pytest.mark.asyncio
+async def test_catalog_route_revalidates_with_etag():
+    """Test that /catalog serves the serialized catalog and answers If-None-Match with 304."""
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        response = await client.get("/catalog")
+        revalidated = await client.get("/catalog", headers={"If-None-Match": response.headers["etag"]})
+
+    assert response.json()["tools"][0]["name"] == "xkcd-viewer"
+    assert revalidated.status_code == 304
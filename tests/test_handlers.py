@@ -0,0 +1,186 @@
+"""Tests for the MCP tool and resource handlers."""
+
+import asyncio
+import time
+
+import httpx
+import mcp.types as types
+import pytest
+from mcp.server.lowlevel.server import request_ctx
+from mcp.shared.context import RequestContext
+
+from src.xkcd_app import config
+from src.xkcd_app.handlers import PENDING_HYDRATIONS, handle_call_tool, handle_read_resource
+from src.xkcd_app.xkcd_client import open_http_client
+
+
+MIME_TYPE = "text/html+skybridge"
+
+
+def call_tool_request(name, session=None, progress_token=None, **arguments):
+    """Build a tools/call request for a widget tool."""
+    meta = {"openai/session": session} if session else {}
+    if progress_token is not None:
+        meta["progressToken"] = progress_token
+    meta = meta or None
+    return types.CallToolRequest(
+        method="tools/call",
+        params=types.CallToolRequestParams(name=name, arguments=arguments, _meta=meta),
+    )
+
+
+def read_resource_request(uri, session=None):
+    """Build a resources/read request for a widget template."""
+    meta = {"openai/session": session} if session else None
+    return types.ReadResourceRequest(
+        method="resources/read",
+        params=types.ReadResourceRequestParams(uri=uri, _meta=meta),
+    )
+
+
+@pytest.mark.asyncio
+async def test_viewer_renders_comic(fake_upstream):
+    """Test that the viewer tool returns structured content and widget HTML."""
+    result = await handle_call_tool(call_tool_request("xkcd-viewer", userQuery="#327"), MIME_TYPE)
+
+    assert result.root.structuredContent["comic_number"] == 327
+    assert result.root.structuredContent["date"] == "2020-03-14"
+    assert "#327 - Comic 327" in result.root.meta["openai.com/widget"]["resource"]["text"]
+
+
+@pytest.mark.asyncio
+async def test_gallery_fetches_range_concurrently(fake_upstream):
+    """Test that the gallery tool renders every comic in a range, reporting failures."""
+    fake_upstream.latest = 500
+    result = await handle_call_tool(call_tool_request("xkcd-gallery", session="dana", userQuery="#402-#405"), MIME_TYPE)
+    content = result.root.structuredContent
+
+    assert [comic["comic_number"] for comic in content["comics"]] == [402, 403, 405]
+    assert content["errors"][0]["comic_number"] == 404
+    assert result.root.content[0].text == "Displaying 3 of 4 XKCD comics"
+
+    resource = await handle_read_resource(read_resource_request("ui://widget/xkcd-gallery.html", session="dana"), MIME_TYPE)
+    assert "#404 unavailable" in resource.root.contents[0].text
+
+
+@pytest.mark.asyncio
+async def test_widget_html_is_scoped_per_session(fake_upstream):
+    """Test that concurrent sessions read back their own rendered comic."""
+    fake_upstream.latest = 500
+    await handle_call_tool(call_tool_request("xkcd-viewer", session="alice", userQuery="#100"), MIME_TYPE)
+    await handle_call_tool(call_tool_request("xkcd-viewer", session="bob", userQuery="#200"), MIME_TYPE)
+
+    uri = "ui://widget/xkcd-viewer.html"
+    alice = await handle_read_resource(read_resource_request(uri, session="alice"), MIME_TYPE)
+    bob = await handle_read_resource(read_resource_request(uri, session="bob"), MIME_TYPE)
+    carol = await handle_read_resource(read_resource_request(uri, session="carol"), MIME_TYPE)
+
+    assert "#100 - Comic 100" in alice.root.contents[0].text
+    assert "#200 - Comic 200" in bob.root.contents[0].text
+    assert "Ready to display XKCD comics!" in carol.root.contents[0].text
+
+
+@pytest.mark.asyncio
+async def test_anonymous_requests_share_no_widget(fake_upstream):
+    """Test that a request without session metadata never reads another anonymous client's comic."""
+    result = await handle_call_tool(call_tool_request("xkcd-viewer", userQuery="#100"), MIME_TYPE)
+    anonymous = await handle_read_resource(read_resource_request("ui://widget/xkcd-viewer.html"), MIME_TYPE)
+
+    assert "#100 - Comic 100" in result.root.meta["openai.com/widget"]["resource"]["text"]
+    assert "Ready to display XKCD comics!" in anonymous.root.contents[0].text
+
+
+class RecordingSession:
+    """Stand-in MCP session that records progress notifications."""
+
+    def __init__(self):
+        self.notifications = []
+
+    async def send_progress_notification(self, progress_token, progress, total=None, message=None, **kwargs):
+        self.notifications.append((progress_token, progress, total, message))
+
+
+@pytest.mark.asyncio
+async def test_viewer_reports_progress(fake_upstream):
+    """Test that a call with a progress token gets a notification per fetch and render step."""
+    session = RecordingSession()
+    token = request_ctx.set(RequestContext(request_id=7, meta=None, session=session, lifespan_context=None))
+    try:
+        await handle_call_tool(call_tool_request("xkcd-viewer", progress_token="p1", userQuery="#327"), MIME_TYPE)
+    finally:
+        request_ctx.reset(token)
+
+    assert [(progress, total) for _, progress, total, _ in session.notifications] == [(1, 3), (2, 3), (3, 3)]
+    assert session.notifications[0][0] == "p1"
+    assert session.notifications[0][3] == "Fetched XKCD #327: Comic 327"
+
+
+@pytest.mark.asyncio
+async def test_deferred_image_is_hydrated_on_resource_read(fake_upstream):
+    """Test that a metadata-first call skips the image download, which the resource read then waits for."""
+    result = await handle_call_tool(
+        call_tool_request("xkcd-viewer", session="carol", userQuery="#327", options={"deferImage": True}),
+        MIME_TYPE,
+    )
+
+    assert result.root.structuredContent["title"] == "Comic 327"
+    assert result.root.structuredContent["image_pending"] is True
+    assert "data:image" not in result.root.meta["openai.com/widget"]["resource"]["text"]
+    assert fake_upstream.requests == ["https://xkcd.com/327/info.0.json"]
+
+    resource = await handle_read_resource(read_resource_request("ui://widget/xkcd-viewer.html", session="carol"), MIME_TYPE)
+
+    assert "data:image/png;base64," in resource.root.contents[0].text
+    assert not PENDING_HYDRATIONS
+
+
+def slow_upstream(upstream, delay, image_delay=None):
+    """Wrap a FakeUpstream so every response takes ``delay`` seconds (images ``image_delay``, if given)."""
+    async def handle(request):
+        slow_image = image_delay is not None and request.url.host == "imgs.xkcd.com"
+        await asyncio.sleep(image_delay if slow_image else delay)
+        return upstream.handle(request)
+
+    return httpx.AsyncClient(transport=httpx.MockTransport(handle))
+
+
+@pytest.mark.asyncio
+async def test_concurrent_viewer_calls_share_one_metadata_fetch(fake_upstream):
+    """Test that concurrent tool calls for one comic make a single upstream JSON request."""
+    await open_http_client(slow_upstream(fake_upstream, 0.05))
+
+    results = await asyncio.gather(*(
+        handle_call_tool(call_tool_request("xkcd-viewer", userQuery="#327"), MIME_TYPE) for _ in range(10)
+    ))
+
+    assert all(result.root.structuredContent["comic_number"] == 327 for result in results)
+    assert fake_upstream.requests.count("https://xkcd.com/327/info.0.json") == 1
+
+
+@pytest.mark.asyncio
+async def test_viewer_metadata_step_respects_request_budget(fake_upstream, monkeypatch):
+    """Test that a slow upstream fails the tool call at the request budget, not the HTTP timeout."""
+    monkeypatch.setattr(config, "REQUEST_BUDGET", 0.5)
+    await open_http_client(slow_upstream(fake_upstream, 3.0))
+
+    started = time.perf_counter()
+    result = await handle_call_tool(call_tool_request("xkcd-viewer", userQuery="#327"), MIME_TYPE)
+
+    assert time.perf_counter() - started < 1.0
+    assert "error" in result.root.structuredContent
+
+
+@pytest.mark.asyncio
+async def test_viewer_image_step_gets_what_the_metadata_step_left(fake_upstream, monkeypatch):
+    """Test that the metadata and image steps share one budget, so a late image links upstream instead."""
+    monkeypatch.setattr(config, "REQUEST_BUDGET", 1.0)
+    await open_http_client(slow_upstream(fake_upstream, 0.35, image_delay=0.9))
+
+    started = time.perf_counter()
+    result = await handle_call_tool(call_tool_request("xkcd-viewer", userQuery="#327"), MIME_TYPE)
+
+    assert time.perf_counter() - started < 1.15
+    html = result.root.meta["openai.com/widget"]["resource"]["text"]
+    assert result.root.structuredContent["comic_number"] == 327
+    assert "data:image" not in html
+    assert "https://imgs.xkcd.com/comics/comic_327.png" in html
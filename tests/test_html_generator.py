@@ -0,0 +1,48 @@
+"""Tests for widget HTML generation."""
+
+from src.xkcd_app.html_generator import (
+    HTML_CACHE,
+    CompiledTemplate,
+    generate_comic_html,
+    generate_error_html,
+)
+
+
+COMIC = {
+    "num": 327,
+    "title": "Exploits of a <Mom>",
+    "alt": "Her daughter is named \"Help\"",
+    "img": "https://imgs.xkcd.com/comics/exploits_of_a_mom.png",
+    "img_base64": "data:image/png;base64,iVBORw0KGgo=",
+    "img_original": "https://imgs.xkcd.com/comics/exploits_of_a_mom.png",
+    "year": "2007",
+    "month": "10",
+    "day": "10",
+}
+
+
+def test_compiled_template_renders_placeholders():
+    """Test that compiled templates substitute every placeholder occurrence."""
+    template = CompiledTemplate("<p title='{a}'>{a} and {b}</p>")
+    assert template.render(a="x", b=1) == "<p title='x'>x and 1</p>"
+
+
+def test_comic_html_is_escaped_and_memoized():
+    """Test escaping and that repeat renders of a comic reuse the same output."""
+    first = generate_comic_html(COMIC)
+    second = generate_comic_html(dict(COMIC))
+
+    assert "#327 - Exploits of a &lt;Mom&gt;" in first
+    assert "Published: 2007-10-10" in first
+    assert 'src="data:image/png;base64,iVBORw0KGgo="' in first
+    assert second is first
+    assert HTML_CACHE.stats.hits == 1
+
+    fallback = generate_comic_html({**COMIC, "img_base64": COMIC["img"]})
+    assert 'src="https://imgs.xkcd.com/comics/exploits_of_a_mom.png"' in fallback
+
+
+def test_error_html_is_interned():
+    """Test that repeated errors return the same interned page."""
+    assert generate_error_html("404 <Not Found>") is generate_error_html("404 <Not Found>")
+    assert "404 &lt;Not Found&gt;" in generate_error_html("404 <Not Found>")
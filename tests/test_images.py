@@ -0,0 +1,85 @@
+"""Tests for image variant processing."""
+
+from io import BytesIO
+
+import pytest
+
+from src.xkcd_app import config
+from src.xkcd_app.html_generator import generate_comic_html
+from src.xkcd_app.images import build_tile_pyramid, data_uri_length, resize_image
+from src.xkcd_app.xkcd_client import encode_data_uri, fetch_xkcd_comic
+
+
+Image = pytest.importorskip("PIL.Image")
+ImageDraw = pytest.importorskip("PIL.ImageDraw")
+
+
+def make_png(width, height):
+    """Draw a line-art PNG of the given size."""
+    image = Image.new("RGB", (width, height), "white")
+    draw = ImageDraw.Draw(image)
+    for x in range(0, width, 37):
+        draw.line((x, 0, width - x, height), fill="black", width=2)
+    output = BytesIO()
+    image.save(output, "PNG")
+    return output.getvalue()
+
+
+def test_resize_caps_width_and_shrinks():
+    """Test that oversized images get a smaller rendition and small ones are left alone."""
+    original = make_png(3000, 400)
+    rendition, mime_type = resize_image(original, "image/png", 600)
+
+    with Image.open(BytesIO(rendition)) as image:
+        assert image.size == (600, 80)
+    assert mime_type == "image/png"
+    assert len(rendition) < len(original)
+    assert resize_image(make_png(300, 100), "image/png", 600) is None
+    assert resize_image(b"\x89PNG truncated", "image/png", 600) is None
+
+
+def test_data_uri_length_matches_encoding():
+    """Test the data URI size estimate used for budget checks."""
+    for size in (0, 1, 2, 3, 1000):
+        assert data_uri_length(size, "image/png") == len(encode_data_uri(b"x" * size, "image/png"))
+
+
+@pytest.mark.asyncio
+async def test_oversized_comic_inlines_a_variant(fake_upstream, monkeypatch):
+    """Test that a comic over the inline budget embeds a downsized variant with a full-size link."""
+    fake_upstream.latest = 1110
+    fake_upstream.images[1110] = make_png(4000, 2000)
+    monkeypatch.setattr(config, "INLINE_IMAGE_BUDGET", len(fake_upstream.images[1110]))
+
+    comic = await fetch_xkcd_comic(1110)
+
+    assert comic["img_variant"] in ("capped", "thumb")
+    assert len(comic["img_base64"]) <= config.INLINE_IMAGE_BUDGET
+    assert "View full size" in generate_comic_html(comic)
+
+
+def test_tile_pyramid_halves_down_to_one_tile():
+    """Test that pyramid levels halve the image until it fits in a single tile."""
+    manifest, tiles = build_tile_pyramid(make_png(2000, 600), "image/png", 512, 1000)
+
+    assert [(level["cols"], level["rows"]) for level in manifest["levels"]] == [(4, 2), (2, 1), (1, 1)]
+    assert len(tiles) == 4 * 2 + 2 + 1
+    with Image.open(BytesIO(tiles[0, 3, 1])) as tile:
+        assert tile.size == (2000 - 3 * 512, 600 - 512)
+    assert build_tile_pyramid(make_png(900, 600), "image/png", 512, 1000) is None
+
+
+@pytest.mark.asyncio
+async def test_giant_comic_renders_tiled_viewer(fake_upstream, monkeypatch):
+    """Test that reference mode shows giant comics through their tile pyramid."""
+    monkeypatch.setattr(config, "IMAGE_MODE", "reference")
+    monkeypatch.setattr(config, "PUBLIC_URL", "https://xkcd-app.example.com")
+    monkeypatch.setattr(config, "TILE_MIN_SIZE", 1000)
+    fake_upstream.images[300] = make_png(2000, 600)
+
+    comic = await fetch_xkcd_comic(300)
+    small = await fetch_xkcd_comic(327)
+
+    assert comic["img_tiles"]["url"] == "https://xkcd-app.example.com/img/300/tiles"
+    assert 'data-tiles="https://xkcd-app.example.com/img/300/tiles"' in generate_comic_html(comic)
+    assert "img_tiles" not in small
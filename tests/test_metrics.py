@@ -0,0 +1,76 @@
+"""Tests for the Prometheus metrics."""
+
+import httpx
+import pytest
+
+from main import app
+from src.xkcd_app.handlers import handle_call_tool
+from src.xkcd_app.metrics import (
+    STAGE_SECONDS,
+    TOOL_CALL_SECONDS,
+    TOOL_CALLS_IN_FLIGHT,
+    UPSTREAM_ERRORS,
+    Histogram,
+    reset_metrics,
+)
+from src.xkcd_app.xkcd_client import fetch_xkcd_comic
+from tests.test_handlers import MIME_TYPE, call_tool_request
+
+
+@pytest.fixture(autouse=True)
+def fresh_metrics():
+    """Start every test with no recorded samples."""
+    reset_metrics()
+    yield
+    reset_metrics()
+
+
+def test_histogram_renders_cumulative_buckets():
+    """Test the text exposition of a histogram."""
+    histogram = Histogram("demo_seconds", "Demo", ("stage",), buckets=(0.1, 1.0))
+    for value in (0.05, 0.5, 5.0):
+        histogram.observe(value, stage="fetch")
+
+    lines = histogram.render().splitlines()
+    assert 'demo_seconds_bucket{stage="fetch",le="0.1"} 1' in lines
+    assert 'demo_seconds_bucket{stage="fetch",le="1"} 2' in lines
+    assert 'demo_seconds_bucket{stage="fetch",le="+Inf"} 3' in lines
+    assert 'demo_seconds_count{stage="fetch"} 3' in lines
+
+
+@pytest.mark.asyncio
+async def test_comic_fetch_records_stages_and_errors(fake_upstream):
+    """Test that upstream fetches and encoding are timed and failures are counted."""
+    await fetch_xkcd_comic(327)
+    with pytest.raises(httpx.HTTPStatusError):
+        await fetch_xkcd_comic(404)
+
+    assert STAGE_SECONDS.count(stage="upstream_json") == 2
+    assert STAGE_SECONDS.count(stage="upstream_image") == 1
+    assert STAGE_SECONDS.count(stage="encode") == 1
+    assert UPSTREAM_ERRORS.value(kind="json", reason="404") == 1
+
+
+@pytest.mark.asyncio
+async def test_metrics_route_exposes_tool_and_cache_metrics(fake_upstream):
+    """Test that /metrics reports tool stages, HTTP sizes and cache hit ratios."""
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        await client.get("/img/327")
+        response = await client.get("/metrics")
+
+    assert response.headers["content-type"].startswith("text/plain")
+    assert 'xkcd_http_response_bytes_count{route="/img"} 1' in response.text
+    assert 'xkcd_cache_hit_ratio{cache="metadata_memory"}' in response.text
+    assert "# TYPE xkcd_stage_seconds histogram" in response.text
+
+
+@pytest.mark.asyncio
+async def test_tool_call_records_every_stage(fake_upstream):
+    """Test that a tool call times validation, rendering and serialization."""
+    await handle_call_tool(call_tool_request("xkcd-viewer", userQuery="#327"), MIME_TYPE)
+
+    for stage in ("validation", "upstream_json", "upstream_image", "encode", "render", "serialize"):
+        assert STAGE_SECONDS.count(stage=stage) == 1
+    assert TOOL_CALL_SECONDS.count(tool="xkcd-viewer", outcome="ok") == 1
+    assert TOOL_CALLS_IN_FLIGHT.value(tool="xkcd-viewer") == 0
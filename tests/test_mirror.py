@@ -0,0 +1,41 @@
+"""Tests for the bulk archive mirror."""
+
+import pytest
+
+from src.xkcd_app import xkcd_client
+from src.xkcd_app.mirror import mirror_archive
+
+
+@pytest.mark.asyncio
+async def test_mirror_is_resumable_and_incremental(fake_upstream, isolated_caches):
+    """Test that a second run only fetches comics published since the first."""
+    fake_upstream.latest = 5
+    fake_upstream.missing = {4}
+    first = await mirror_archive(concurrency=3)
+
+    assert first.fetched == 4
+    assert first.missing == [4]
+    assert isolated_caches.comic_numbers() == {1, 2, 3, 5}
+
+    fake_upstream.latest = 6
+    fake_upstream.requests.clear()
+    second = await mirror_archive(concurrency=3)
+
+    assert second.latest == 6
+    assert second.fetched == 1
+    assert second.skipped == 5
+    assert second.missing == []
+    assert not any("/4/" in url or "/5/" in url for url in fake_upstream.requests)
+
+
+@pytest.mark.asyncio
+async def test_fetch_serves_from_mirror(fake_upstream):
+    """Test that mirrored comics are served without any upstream request."""
+    await mirror_archive(latest=3)
+    xkcd_client.reset_caches()
+    fake_upstream.requests.clear()
+
+    comic = await xkcd_client.fetch_xkcd_comic(2)
+
+    assert comic["img_base64"].startswith("data:image/png;base64,")
+    assert fake_upstream.requests == []
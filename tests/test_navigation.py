@@ -0,0 +1,75 @@
+"""Tests for prev/next/random navigation and neighbour prefetching."""
+
+import asyncio
+
+import pytest
+
+from src.xkcd_app import config, xkcd_client
+from src.xkcd_app.handlers import handle_call_tool
+from src.xkcd_app.navigation import PREFETCHER, parse_navigation, step_comic
+
+from .test_handlers import MIME_TYPE, call_tool_request
+
+
+def test_parse_navigation_only_matches_whole_steps():
+    """Test that bare steps are recognized and descriptive queries are left to search."""
+    assert parse_navigation("next") == "next"
+    assert parse_navigation("Show me the previous one") == "previous"
+    assert parse_navigation("another random comic!") == "random"
+    assert parse_navigation("the one about random numbers") is None
+
+
+def test_step_comic_skips_unpublished_and_stops_at_the_ends():
+    """Test that stepping skips #404 and refuses to leave the archive."""
+    assert step_comic(403, "next", latest=500) == 405
+    assert step_comic(405, "previous", latest=500) == 403
+    with pytest.raises(ValueError):
+        step_comic(1, "previous", latest=500)
+    with pytest.raises(ValueError):
+        step_comic(500, "next", latest=500)
+
+
+@pytest.mark.asyncio
+async def test_next_is_served_from_prefetch(fake_upstream):
+    """Test that stepping to a neighbour lands on the comic prefetched in the background."""
+    await handle_call_tool(call_tool_request("xkcd-viewer", session="dave", userQuery="#326"), MIME_TYPE)
+    await asyncio.sleep(0.05)
+    fake_upstream.requests.clear()
+
+    result = await handle_call_tool(call_tool_request("xkcd-viewer", session="dave", userQuery="next one"), MIME_TYPE)
+
+    assert result.root.structuredContent["comic_number"] == 327
+    assert not any("/327/" in url or "comic_327" in url for url in fake_upstream.requests)
+    assert PREFETCHER.stats.hits == 1
+
+    result = await handle_call_tool(
+        call_tool_request("xkcd-viewer", session="dave", userQuery="go", navigate="previous"),
+        MIME_TYPE,
+    )
+    assert result.root.structuredContent["comic_number"] == 326
+
+
+@pytest.mark.asyncio
+async def test_prefetch_respects_concurrency_budget(fake_upstream, monkeypatch):
+    """Test that prefetches over the concurrency limit are skipped rather than queued."""
+    monkeypatch.setattr(config, "PREFETCH_CONCURRENCY", 1)
+    await handle_call_tool(call_tool_request("xkcd-viewer", session="erin", userQuery="#200"), MIME_TYPE)
+    await asyncio.sleep(0.05)
+
+    assert PREFETCHER.started == 1
+    assert PREFETCHER.skipped == 1
+    assert PREFETCHER.unshown_bytes > 0
+
+
+@pytest.mark.asyncio
+async def test_steps_use_the_known_latest_comic(fake_upstream, monkeypatch):
+    """Test that a step does not look the latest comic up again once its TTL has passed."""
+    await handle_call_tool(call_tool_request("xkcd-viewer", session="finn", userQuery="latest"), MIME_TYPE)
+    monkeypatch.setattr(config, "LATEST_TTL", 0.0)
+    xkcd_client.METADATA_CACHE.clear()
+    fake_upstream.requests.clear()
+
+    result = await handle_call_tool(call_tool_request("xkcd-viewer", session="finn", userQuery="previous"), MIME_TYPE)
+
+    assert result.root.structuredContent["comic_number"] == 326
+    assert "https://xkcd.com/info.0.json" not in fake_upstream.requests
@@ -0,0 +1,60 @@
+"""Tests for the opt-in request profiler."""
+
+import time
+
+import mcp.types as types
+
+from src.xkcd_app import config
+from src.xkcd_app.profiling import profile_request, prune_profiles, should_profile
+
+
+def busy_wait(seconds):
+    """Keep the current thread on CPU for a while."""
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        pass
+
+
+def tool_request(**arguments):
+    """Build a tools/call request."""
+    return types.CallToolRequest(
+        method="tools/call",
+        params=types.CallToolRequestParams(name="xkcd-viewer", arguments={"userQuery": "#327", **arguments}),
+    )
+
+
+def test_profiling_is_opt_in(monkeypatch):
+    """Test that only sampled requests, or ones asking for a profile when allowed to, are profiled."""
+    assert not should_profile(tool_request())
+    assert not should_profile(tool_request(options={"profile": True}))
+    monkeypatch.setattr(config, "PROFILE_ON_REQUEST", True)
+    assert should_profile(tool_request(options={"profile": True}))
+    assert not should_profile(tool_request())
+    monkeypatch.setattr(config, "PROFILE_SAMPLE_RATE", 1.0)
+    assert should_profile(tool_request())
+
+
+def test_profile_writes_collapsed_stacks(tmp_path, monkeypatch):
+    """Test that a profiled block produces flamegraph-compatible collapsed stacks."""
+    profile_dir = tmp_path / "profiles"
+    monkeypatch.setattr(config, "PROFILE_DIR", str(profile_dir))
+    monkeypatch.setattr(config, "PROFILE_INTERVAL", 0.001)
+
+    with profile_request("xkcd-viewer"):
+        busy_wait(0.05)
+
+    [profile] = profile_dir.glob("*-xkcd-viewer.collapsed")
+    lines = profile.read_text().splitlines()
+    assert any("busy_wait (" in line for line in lines)
+    assert all(line.rsplit(" ", 1)[1].isdigit() for line in lines)
+
+
+def test_prune_keeps_newest_profiles(tmp_path):
+    """Test that retention deletes the oldest profiles first."""
+    profile_dir = tmp_path / "profiles"
+    profile_dir.mkdir()
+    for stamp in ("20260101T000000", "20260102T000000", "20260103T000000"):
+        (profile_dir / f"{stamp}-000000000-tool.collapsed").write_text("main 1\n")
+
+    assert prune_profiles(profile_dir, 2) == 1
+    assert sorted(path.name[:8] for path in profile_dir.iterdir()) == ["20260102", "20260103"]
@@ -0,0 +1,109 @@
+"""Tests for the HTTP routes served next to the MCP endpoint."""
+
+import httpx
+import pytest
+
+from main import app
+from src.xkcd_app import config
+from src.xkcd_app.xkcd_client import close_http_client, fetch_xkcd_comic, open_http_client
+
+
+@pytest.mark.asyncio
+async def test_image_route_serves_cached_bytes_with_etag(fake_upstream):
+    """Test that /img serves image bytes with a strong ETag and honours If-None-Match."""
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        response = await client.get("/img/327")
+        etag = response.headers["etag"]
+        revalidated = await client.get("/img/327", headers={"If-None-Match": etag})
+        missing = await client.get("/img/404")
+
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "image/png"
+    assert "immutable" in response.headers["cache-control"]
+    assert response.content.startswith(b"\x89PNG")
+    assert revalidated.status_code == 304
+    assert missing.status_code == 404
+
+
+@pytest.mark.asyncio
+async def test_reference_mode_links_instead_of_inlining(fake_upstream, monkeypatch):
+    """Test that reference mode replaces the data URI with a link to the /img route."""
+    monkeypatch.setattr(config, "IMAGE_MODE", "reference")
+    monkeypatch.setattr(config, "PUBLIC_URL", "https://xkcd-app.example.com")
+
+    comic = await fetch_xkcd_comic(327)
+
+    assert comic["img_src"] == "https://xkcd-app.example.com/img/327"
+    assert "img_base64" not in comic
+
+
+@pytest.mark.asyncio
+async def test_image_route_answers_range_requests(fake_upstream):
+    """Test that /img serves byte ranges and rejects unsatisfiable ones."""
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        full = await client.get("/img/327")
+        partial = await client.get("/img/327", headers={"Range": "bytes=4-9"})
+        suffix = await client.get("/img/327", headers={"Range": "bytes=-3"})
+        beyond = await client.get("/img/327", headers={"Range": f"bytes={len(full.content)}-"})
+
+    assert partial.status_code == 206
+    assert partial.content == full.content[4:10]
+    assert partial.headers["content-range"] == f"bytes 4-9/{len(full.content)}"
+    assert suffix.content == full.content[-3:]
+    assert beyond.status_code == 416
+
+
+@pytest.mark.asyncio
+async def test_tile_routes_serve_pyramid(fake_upstream, monkeypatch):
+    """Test that giant comics expose a tile manifest and individually cacheable tiles."""
+    Image = pytest.importorskip("PIL.Image")
+    from io import BytesIO
+
+    monkeypatch.setattr(config, "TILE_MIN_SIZE", 1000)
+    image = BytesIO()
+    Image.new("RGB", (1500, 700), "white").save(image, "PNG")
+    fake_upstream.images[300] = image.getvalue()
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        manifest = await client.get("/img/300/tiles")
+        tile = await client.get("/img/300/tiles/0/2_1")
+        outside = await client.get("/img/300/tiles/0/9_9")
+        untiled = await client.get("/img/327/tiles")
+
+    assert manifest.json()["levels"][0] == {"width": 1500, "height": 700, "cols": 3, "rows": 2}
+    assert tile.status_code == 200
+    assert tile.headers["content-type"] == "image/png"
+    assert "immutable" in tile.headers["cache-control"]
+    assert outside.status_code == 404
+    assert untiled.status_code == 404
+
+
+@pytest.mark.asyncio
+async def test_image_route_answers_503_when_upstream_refuses_connections():
+    """Test that a transport error from the image CDN is a retryable 503, not a 500."""
+    def refuse(request):
+        raise httpx.ConnectError("Connection refused", request=request)
+
+    await open_http_client(httpx.AsyncClient(transport=httpx.MockTransport(refuse)))
+    try:
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+            response = await client.get("/img/2")
+    finally:
+        await close_http_client()
+
+    assert response.status_code == 503
+    assert "retry-after" in response.headers
+
+
+@pytest.mark.asyncio
+async def test_variant_of_undecodable_image_falls_back_to_original(fake_upstream):
+    """Test that a resized variant of an image Pillow cannot decode serves the original bytes."""
+    pytest.importorskip("PIL.Image")
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+        response = await client.get("/img/1?variant=thumb")
+
+    assert response.status_code == 200
+    assert response.content.startswith(b"\x89PNG fake image")
@@ -0,0 +1,100 @@
+"""Tests for the full-text comic search index."""
+
+import asyncio
+
+import pytest
+
+from src.xkcd_app import search
+from src.xkcd_app.handlers import resolve_comic_number
+from src.xkcd_app.models import ToolInput
+from src.xkcd_app.search import SearchIndex, comic_terms, find_comic_number, index_comic, load_search_index
+
+
+COMICS = [
+    {
+        "num": 327,
+        "title": "Exploits of a Mom",
+        "safe_title": "Exploits of a Mom",
+        "alt": "Her daughter is named Help I'm trapped in a driver's license factory.",
+        "transcript": "Did you really name your son Robert'); DROP TABLE Students;-- ? "
+                      "Oh, yes. Little Bobby Tables, we call him.",
+    },
+    {
+        "num": 149,
+        "title": "Sandwich",
+        "safe_title": "Sandwich",
+        "alt": "Proper User Policy apparently means Simon Says.",
+        "transcript": "Make me a sandwich. What? Make it yourself. Sudo make me a sandwich. Okay.",
+    },
+    {
+        "num": 1053,
+        "title": "Ten Thousand",
+        "safe_title": "Ten Thousand",
+        "alt": "Saying 'what kind of an idiot doesn't know about the Yellowstone supervolcano' "
+               "is so much more boring than telling someone about the Yellowstone supervolcano.",
+        "transcript": "",
+    },
+]
+
+
+def test_search_ranks_by_relevance():
+    """Test BM25 ranking across titles, alt text and transcripts."""
+    index = SearchIndex()
+    for comic in COMICS:
+        index.add(comic["num"], comic_terms(comic))
+
+    assert index.search("the one about Bobby Tables")[0][0] == 327
+    assert index.search("the sudo sandwich comic")[0][0] == 149
+    assert index.search("yellowstone")[0][0] == 1053
+    assert index.search("show me the latest xkcd") == []
+
+
+def test_index_is_persisted_incrementally(isolated_caches):
+    """Test that indexed terms are reloaded from the store instead of rebuilt."""
+    index_comic(COMICS[0])
+    isolated_caches.put_comic(COMICS[1])
+    search.reset_search_index()
+
+    assert find_comic_number("sudo sandwich") == 149
+    assert find_comic_number("bobby tables") == 327
+    assert dict(isolated_caches.iter_search_terms()).keys() == {327, 149}
+    assert find_comic_number("quantum chromodynamics") is None
+
+
+@pytest.mark.asyncio
+async def test_index_loads_off_the_event_loop(isolated_caches):
+    """Test that the background load answers queries as misses until done and keeps comics cached meanwhile."""
+    index_comic(COMICS[0])
+    isolated_caches.put_comic(COMICS[1])
+    search.reset_search_index()
+
+    loading = asyncio.create_task(load_search_index())
+    await asyncio.sleep(0)
+    assert find_comic_number("bobby tables") is None
+    index_comic(COMICS[2])
+    await loading
+
+    assert find_comic_number("bobby tables") == 327
+    assert find_comic_number("sudo sandwich") == 149
+    assert find_comic_number("yellowstone supervolcano") == 1053
+    assert dict(isolated_caches.iter_search_terms()).keys() == {327, 149, 1053}
+
+
+def test_latest_phrasings_do_not_match_comic_text(isolated_caches):
+    """Test that requests for the newest comic resolve to the latest comic, not to a text match."""
+    index_comic({"num": 500, "title": "Current Events", "alt": "Today is the most recent day yet."})
+
+    assert search.tokenize("What's the latest xkcd?") == []
+    for query in ("What's the latest xkcd?", "show me today's comic", "most recent one", "current xkcd"):
+        assert resolve_comic_number(ToolInput(userQuery=query)) is None
+
+
+def test_descriptive_queries_with_latest_words_are_searched(isolated_caches):
+    """Test that a query describing a comic is searched even if it contains a word like "current"."""
+    for comic in COMICS:
+        index_comic(comic)
+    index_comic({"num": 500, "title": "Current Events", "alt": "Today is the most recent day yet."})
+    index_comic({"num": 501, "title": "Alternating Current", "alt": "It changes its mind sixty times a second."})
+
+    assert resolve_comic_number(ToolInput(userQuery="the comic about alternating current")) == 501
+    assert not search.asks_for_latest("the one where the kid asks about today's date")
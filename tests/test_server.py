@@ -0,0 +1,56 @@
+"""Tests for the production launcher and cross-worker fetch leases."""
+
+import asyncio
+
+import pytest
+
+from src.xkcd_app import server, xkcd_client
+
+
+def test_uvicorn_options_fall_back_without_speedups(monkeypatch):
+    """Test that the launcher runs workers and uses pure-Python fallbacks when speedups are missing."""
+    monkeypatch.setattr(server.importlib.util, "find_spec", lambda name: None)
+
+    options = server.uvicorn_options("127.0.0.1", 9000, 4)
+
+    assert options["workers"] == 4
+    assert (options["loop"], options["http"]) == ("asyncio", "h11")
+    assert "reload" not in options
+    assert server.uvicorn_options("127.0.0.1", 9000, 4, reload=True)["reload"] is True
+
+
+def test_reload_rejects_multiple_workers():
+    """Test that development reload cannot be combined with several workers."""
+    with pytest.raises(SystemExit):
+        server.main(["--reload", "--workers", "2"])
+
+
+def test_store_lease_is_exclusive_until_released(isolated_caches):
+    """Test that a lease held by one process cannot be taken by another until released."""
+    assert isolated_caches.acquire_lease("comic:1", "worker-a", 10)
+    assert isolated_caches.acquire_lease("comic:1", "worker-a", 10)
+    assert not isolated_caches.acquire_lease("comic:1", "worker-b", 10)
+    isolated_caches.release_lease("comic:1", "worker-a")
+    assert isolated_caches.acquire_lease("comic:1", "worker-b", 10)
+    assert isolated_caches.acquire_lease("comic:2", "worker-a", 0)
+    assert isolated_caches.acquire_lease("comic:2", "worker-b", 10)
+
+
+@pytest.mark.asyncio
+async def test_worker_waits_for_lease_holder_instead_of_fetching(monkeypatch, isolated_caches, fake_upstream):
+    """Test that a comic being fetched by another worker is read from the store once it lands."""
+    monkeypatch.setattr(xkcd_client.config, "WORKERS", 2)
+    isolated_caches.acquire_lease("comic:5", "other-worker", 10)
+
+    async def other_worker_finishes():
+        await asyncio.sleep(0.1)
+        isolated_caches.put_comic({"num": 5, "title": "Stored by another worker", "img": ""})
+        isolated_caches.release_lease("comic:5", "other-worker")
+
+    finishing = asyncio.create_task(other_worker_finishes())
+    comic = await xkcd_client.get_comic_metadata(5)
+    await finishing
+
+    assert comic["title"] == "Stored by another worker"
+    assert fake_upstream.requests == []
+    assert xkcd_client.WORKER_LEASE_STATS.hits == 1
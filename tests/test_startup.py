@@ -0,0 +1,50 @@
+"""Tests for cold-start work: lazy package imports and the memory-mapped cache snapshot."""
+
+import subprocess
+import sys
+
+import pytest
+
+from src.xkcd_app import xkcd_client
+from src.xkcd_app.snapshot import get_snapshot, load_snapshot
+from src.xkcd_app.store import open_comic_store
+from src.xkcd_app.xkcd_client import fetch_xkcd_comic, save_cache_snapshot
+
+from .conftest import reset_memory_state
+
+
+def test_cli_modules_do_not_import_mcp():
+    """Test that the package exports are lazy, so the mirror CLI and launcher skip the MCP stack."""
+    code = "import sys, src.xkcd_app.mirror, src.xkcd_app.server; print('mcp' in sys.modules)"
+    output = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True).stdout
+
+    assert output.strip() == "False"
+
+
+@pytest.mark.asyncio
+async def test_snapshot_serves_warm_comics_without_store_or_upstream(tmp_path, fake_upstream):
+    """Test that a new process with an empty store serves snapshotted comics without going upstream."""
+    first = await fetch_xkcd_comic(327)
+    await xkcd_client.get_comic_metadata(None)
+    assert save_cache_snapshot(tmp_path / "snapshot.bin") > 0
+
+    # Simulate a fresh replica: empty memory caches and an empty disk tier
+    reset_memory_state()
+    open_comic_store(tmp_path / "fresh.sqlite3")
+    fake_upstream.requests.clear()
+    load_snapshot(tmp_path / "snapshot.bin")
+    warm = await fetch_xkcd_comic(327)
+
+    assert warm["img_base64"] == first["img_base64"]
+    assert fake_upstream.requests == []
+    assert xkcd_client._get_latest_record()["num"] == 327
+    assert get_snapshot().stats.hits >= 2
+
+
+def test_unreadable_snapshot_is_ignored(tmp_path):
+    """Test that a corrupt snapshot file leaves the caches empty instead of failing startup."""
+    path = tmp_path / "snapshot.bin"
+    path.write_bytes(b"not a snapshot at all")
+
+    assert load_snapshot(path) is None
+    assert get_snapshot() is None
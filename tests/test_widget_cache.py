@@ -0,0 +1,29 @@
+"""Tests for the session-scoped widget HTML cache backends."""
+
+import pytest
+
+from src.xkcd_app.widget_cache import create_widget_cache
+
+
+@pytest.mark.parametrize("backend", ["memory", "sqlite"])
+def test_widget_cache_scopes_and_budget(backend, monkeypatch):
+    """Test session isolation and byte-budget eviction for each backend."""
+    monkeypatch.setattr("src.xkcd_app.config.WIDGET_CACHE_BYTES", 10)
+    cache = create_widget_cache(backend)
+    cache.set("alice", "ui://widget/a.html", "aaaa")
+    cache.set("bob", "ui://widget/a.html", "bbbb")
+
+    assert cache.get("bob", "ui://widget/a.html") == "bbbb"
+    assert cache.get("alice", "ui://widget/a.html") == "aaaa"
+    assert cache.get("carol", "ui://widget/a.html") is None
+
+    cache.set("carol", "ui://widget/a.html", "cccc")
+    assert cache.get("bob", "ui://widget/a.html") is None
+    assert cache.get("alice", "ui://widget/a.html") == "aaaa"
+    assert cache.stats.evictions == 1
+
+
+def test_unknown_backend():
+    """Test that a misconfigured backend is rejected."""
+    with pytest.raises(ValueError):
+        create_widget_cache("redis")
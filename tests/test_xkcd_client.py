@@ -0,0 +1,260 @@
+"""Tests for the XKCD API client."""
+
+import asyncio
+
+import httpx
+import pytest
+
+from src.xkcd_app import xkcd_client
+from src.xkcd_app.resilience import CircuitOpen
+from src.xkcd_app.xkcd_client import (
+    close_http_client,
+    extract_comic_number,
+    fetch_xkcd_comic,
+    get_http_client,
+    open_http_client,
+)
+
+
+COMIC_327 = {
+    "num": 327,
+    "title": "Exploits of a Mom",
+    "safe_title": "Exploits of a Mom",
+    "alt": "Her daughter is named Help I'm trapped in a driver's license factory.",
+    "img": "https://imgs.xkcd.com/comics/exploits_of_a_mom.png",
+    "year": "2007",
+    "month": "10",
+    "day": "10",
+}
+
+
+def make_upstream(requests):
+    """Build a mock xkcd.com transport that records every request it serves."""
+    def handler(request: httpx.Request) -> httpx.Response:
+        requests.append(str(request.url))
+        if request.url.host == "imgs.xkcd.com":
+            return httpx.Response(200, content=b"\x89PNG fake image")
+        return httpx.Response(200, json=COMIC_327)
+
+    return httpx.MockTransport(handler)
+
+
+@pytest.mark.asyncio
+async def test_fetch_uses_injected_client():
+    """Test that fetches go through the shared, injectable client."""
+    requests = []
+    client = await open_http_client(httpx.AsyncClient(transport=make_upstream(requests)))
+    try:
+        assert get_http_client() is client
+        comic = await fetch_xkcd_comic(327)
+    finally:
+        await close_http_client()
+
+    assert comic["num"] == 327
+    assert comic["img_base64"].startswith("data:image/png;base64,")
+    assert requests == [
+        "https://xkcd.com/327/info.0.json",
+        "https://imgs.xkcd.com/comics/exploits_of_a_mom.png",
+    ]
+    assert client.is_closed
+    assert xkcd_client._http_client is None
+
+
+@pytest.mark.asyncio
+async def test_open_replaces_and_closes_previous_client():
+    """Test that installing a new client closes the old one."""
+    first = await open_http_client()
+    second = await open_http_client(httpx.AsyncClient(transport=make_upstream([])))
+    try:
+        assert first.is_closed
+        assert get_http_client() is second
+    finally:
+        await close_http_client()
+
+
+def test_extract_comic_number():
+    """Test comic number extraction from URLs and text."""
+    assert extract_comic_number("https://xkcd.com/327/") == 327
+    assert extract_comic_number("show me #1053") == 1053
+    assert extract_comic_number("show comic 2000") == 2000
+    assert extract_comic_number("show me the latest") is None
+
+
+@pytest.mark.asyncio
+async def test_numbered_comic_metadata_is_cached():
+    """Test that repeat requests for a numbered comic skip the JSON fetch."""
+    requests = []
+    await open_http_client(httpx.AsyncClient(transport=make_upstream(requests)))
+    try:
+        await fetch_xkcd_comic(327)
+        await fetch_xkcd_comic(327)
+    finally:
+        await close_http_client()
+
+    assert requests.count("https://xkcd.com/327/info.0.json") == 1
+    assert xkcd_client.METADATA_CACHE.stats.hits == 1
+
+
+@pytest.mark.asyncio
+async def test_disk_tier_survives_memory_loss(isolated_caches):
+    """Test that the on-disk tier serves comics after the memory tier is cleared."""
+    requests = []
+    await open_http_client(httpx.AsyncClient(transport=make_upstream(requests)))
+    try:
+        await fetch_xkcd_comic(None)
+        xkcd_client.reset_caches()
+        latest = await xkcd_client.get_comic_metadata(None)
+        numbered = await xkcd_client.get_comic_metadata(327)
+    finally:
+        await close_http_client()
+
+    assert latest["num"] == numbered["num"] == 327
+    assert requests.count("https://xkcd.com/info.0.json") == 1
+    assert "https://xkcd.com/327/info.0.json" not in requests
+    assert isolated_caches.stats.hits == 1
+
+
+@pytest.mark.asyncio
+async def test_latest_lookup_expires(monkeypatch):
+    """Test that the latest-comic lookup is refetched once its TTL has passed."""
+    requests = []
+    monkeypatch.setattr(xkcd_client.config, "LATEST_TTL", 0.0)
+    await open_http_client(httpx.AsyncClient(transport=make_upstream(requests)))
+    try:
+        await xkcd_client.get_comic_metadata(None)
+        await xkcd_client.get_comic_metadata(None)
+    finally:
+        await close_http_client()
+
+    assert requests.count("https://xkcd.com/info.0.json") == 2
+
+
+@pytest.mark.asyncio
+async def test_image_served_from_memory_then_disk(isolated_caches):
+    """Test that images are downloaded once and re-encoded only after memory eviction."""
+    requests = []
+    img_url = COMIC_327["img"]
+    await open_http_client(httpx.AsyncClient(transport=make_upstream(requests)))
+    try:
+        first = await fetch_xkcd_comic(327)
+        second = await fetch_xkcd_comic(327)
+        xkcd_client.IMAGE_CACHE.clear()
+        third = await fetch_xkcd_comic(327)
+    finally:
+        await close_http_client()
+
+    assert first["img_base64"] == second["img_base64"] == third["img_base64"]
+    assert requests.count(img_url) == 1
+    assert isolated_caches.image_stats.hits == 1
+
+
+@pytest.mark.asyncio
+async def test_latest_revalidated_with_validators(monkeypatch):
+    """Test that an expired latest lookup is revalidated and a 304 reuses the cached copy."""
+    conditional_headers = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        if request.url.host == "imgs.xkcd.com":
+            return httpx.Response(200, content=b"\x89PNG fake image")
+        conditional_headers.append(request.headers.get("if-none-match"))
+        if request.headers.get("if-none-match") == '"v1"':
+            return httpx.Response(304)
+        return httpx.Response(200, json=COMIC_327, headers={"ETag": '"v1"'})
+
+    monkeypatch.setattr(xkcd_client.config, "LATEST_TTL", 0.0)
+    await open_http_client(httpx.AsyncClient(transport=httpx.MockTransport(handler)))
+    try:
+        first = await xkcd_client.get_comic_metadata(None)
+        second = await xkcd_client.get_comic_metadata(None)
+    finally:
+        await close_http_client()
+
+    assert conditional_headers == [None, '"v1"']
+    assert second is first
+    assert xkcd_client.REVALIDATION_STATS.hits == 1
+
+
+@pytest.mark.asyncio
+async def test_slow_upstream_serves_stale_latest(monkeypatch):
+    """Test that a latest lookup past its budget serves the stale copy and revalidates in the background."""
+    slow = False
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        if request.url.host == "imgs.xkcd.com":
+            return httpx.Response(200, content=b"\x89PNG fake image")
+        if slow:
+            await asyncio.sleep(1)
+        return httpx.Response(200, json=COMIC_327, headers={"ETag": '"v1"'})
+
+    monkeypatch.setattr(xkcd_client.config, "LATEST_TTL", 0.0)
+    monkeypatch.setattr(xkcd_client.config, "REQUEST_BUDGET", 0.05)
+    await open_http_client(httpx.AsyncClient(transport=httpx.MockTransport(handler)))
+    try:
+        first = await fetch_xkcd_comic(None)
+        slow = True
+        stale = await fetch_xkcd_comic(None)
+        await xkcd_client._revalidation_task
+    finally:
+        await close_http_client()
+
+    assert stale["num"] == first["num"] == 327
+    assert xkcd_client.get_upstream_stats()["stale_latest_served"] == 1
+    assert xkcd_client.UPSTREAM_BREAKERS["json"].as_dict()["consecutive_failures"] == 2
+
+
+@pytest.mark.asyncio
+async def test_circuit_opens_after_repeated_failures(monkeypatch):
+    """Test that repeated upstream errors open the circuit and later requests fail fast."""
+    requests = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        requests.append(str(request.url))
+        return httpx.Response(503)
+
+    monkeypatch.setattr(xkcd_client.UPSTREAM_BREAKERS["json"], "failure_threshold", 2)
+    await open_http_client(httpx.AsyncClient(transport=httpx.MockTransport(handler)))
+    try:
+        for _ in range(2):
+            with pytest.raises(httpx.HTTPStatusError):
+                await xkcd_client.get_comic_metadata(327)
+        with pytest.raises(CircuitOpen):
+            await xkcd_client.get_comic_metadata(327)
+    finally:
+        await close_http_client()
+
+    assert len(requests) == 2
+    assert xkcd_client.get_upstream_stats()["breakers"]["json"]["state"] == "open"
+
+
+@pytest.mark.asyncio
+async def test_slow_request_is_hedged_within_budget(monkeypatch):
+    """Test that a request slower than the learned threshold is hedged and the faster copy wins."""
+    attempts = []
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        attempts.append(str(request.url))
+        if attempts.count(str(request.url)) == 1:
+            # The first attempt at each comic is stuck
+            await asyncio.sleep(1)
+        return httpx.Response(200, json={**COMIC_327, "num": int(request.url.path.split("/")[1])})
+
+    monkeypatch.setattr(xkcd_client.config, "HEDGE_ENABLED", True)
+    monkeypatch.setattr(xkcd_client.config, "HEDGE_MIN_SAMPLES", 5)
+    monkeypatch.setattr(xkcd_client.config, "HEDGE_MIN_DELAY", 0.01)
+    for _ in range(20):
+        xkcd_client.UPSTREAM_LATENCY["json"].observe(0.001)
+    xkcd_client.RETRY_BUDGET.tokens = 1.0
+
+    await open_http_client(httpx.AsyncClient(transport=httpx.MockTransport(handler)))
+    try:
+        comic = await asyncio.wait_for(xkcd_client.get_comic_metadata(1), 0.5)
+        # With the budget spent, a slow request is waited for rather than hedged
+        with pytest.raises(asyncio.TimeoutError):
+            await asyncio.wait_for(xkcd_client.get_comic_metadata(2), 0.1)
+    finally:
+        await close_http_client()
+
+    assert comic["num"] == 1
+    assert attempts == ["https://xkcd.com/1/info.0.json"] * 2 + ["https://xkcd.com/2/info.0.json"]
+    assert xkcd_client.HEDGED_REQUESTS.value(kind="json", result="won") == 1
+    assert xkcd_client.RETRY_BUDGET.denied == 1